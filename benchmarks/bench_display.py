@@ -0,0 +1,137 @@
+# Бенчмарк вывода на дисплей: байты на шине I2C и время show()
+# для полной передачи кадра, для частичной (области помечает программа)
+# и для сравнения с теневой копией кадра (diff), плюс время одного сравнения.
+# Время полного show() для программного SoftI2C и аппаратного I2C,
+# с отдельной транзакцией на каждую команду и с пакетной передачей команд.
+# Самая долгая пауза между шагами при передаче кадра по одной странице.
+# Запуск на ESP32 (файл скопировать на плату): import bench_display
+# На компьютере (из корня проекта): python benchmarks/bench_display.py - модули
+# machine и framebuf берутся из папки host (эмулятор дисплея на шине I2C).
+
+import sys
+
+try:
+    import machine  # MicroPython
+except ImportError:
+    sys.path.insert(0, 'host')  # На компьютере - замены machine и framebuf
+    import hostenv
+    hostenv.install()
+
+from machine import Pin, I2C, SoftI2C
+
+try:
+    from time import ticks_us, ticks_diff  # MicroPython
+except ImportError:
+    from time import perf_counter
+
+    def ticks_us():
+        return int(perf_counter() * 1000000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+sys.path.insert(0, '.')  # Модули калькулятора лежат в корне проекта
+
+import ssd1306
+
+W = 128
+H = 64
+FRAMES = 20  # Кадров в каждом замере
+FREQ = 400000  # Частота шины I2C в Гц
+
+
+def _draw(oled, digits):
+    """Рисует экран калькулятора с числом digits в основном поле"""
+    oled.fill(0)
+    oled.text("12+" + digits, 0, 2)
+    oled.fill_rect(40, 22, len(digits) * 8 + 8, 14, 1)
+    oled.text(digits, 44, 25, 0)
+    oled.fill_rect(W - 12, H - 10, 12, 10, 1)
+    oled.text("B", W - 10, H - 9, 0)
+
+
+def _measure(oled, partial, diff):
+    """Средние байты и микросекунды на кадр при вводе одной цифры"""
+    oled.partial = partial
+    oled.diff = diff
+    _draw(oled, "3")
+    oled.mark_all()
+    oled.show()
+    sent = oled.bytes_sent
+    start = ticks_us()
+    for i in range(FRAMES):
+        digits = "3" + str(i % 10)
+        _draw(oled, digits)
+        if partial:  # Изменились строка выражения и основное поле
+            oled.mark_dirty(24, 2, 16, 8)
+            oled.mark_dirty(40, 22, len(digits) * 8 + 8, 14)
+        oled.show()
+    elapsed = ticks_diff(ticks_us(), start)
+    return (oled.bytes_sent - sent) // FRAMES, elapsed // FRAMES
+
+
+def _compare_us(oled, changed):
+    """Микросекунды на одно сравнение кадра с теневой копией"""
+    oled.show()
+    if changed:
+        oled.pixel(W - 1, H - 1, 1)  # Худший случай для поиска: изменение в конце
+    oled.front[:] = oled.buffer  # Сравнивается снимок кадра, как в begin_flush()
+    start = ticks_us()
+    for _ in range(FRAMES):
+        oled.diff_frame()
+    elapsed = ticks_diff(ticks_us(), start)
+    oled.clear_dirty()
+    return elapsed // FRAMES
+
+
+def _show_us(oled):
+    """Микросекунды на полный show() (весь кадр одним окном)"""
+    oled.partial = False
+    oled.diff = False
+    start = ticks_us()
+    for _ in range(FRAMES):
+        oled.show()
+    return ticks_diff(ticks_us(), start) // FRAMES
+
+
+def _step_us(oled):
+    """Самый долгий шаг flush_step() (одна страница) при передаче полного кадра"""
+    oled.partial = False
+    oled.diff = False
+    longest = 0
+    for _ in range(FRAMES):
+        oled.begin_flush()
+        while True:
+            start = ticks_us()
+            sent = oled.flush_step()
+            longest = max(longest, ticks_diff(ticks_us(), start))
+            if not sent:
+                break
+    return longest
+
+
+def _bus(hardware):
+    """Шина I2C дисплея: аппаратная или программная"""
+    if hardware:
+        return I2C(0, scl=Pin(47), sda=Pin(21), freq=FREQ)
+    return SoftI2C(scl=Pin(47), sda=Pin(21), freq=FREQ)
+
+
+def main():
+    print("bus       commands  us/show")
+    for hardware in (False, True):
+        for batch in (False, True):
+            oled = ssd1306.SSD1306_I2C(W, H, _bus(hardware), batch=batch)
+            print("%-9s %-8s  %7d" % ("I2C" if hardware else "SoftI2C",
+                                      "batched" if batch else "single", _show_us(oled)))
+    oled = ssd1306.SSD1306_I2C(W, H, _bus(True))
+    print("mode      bytes/frame  us/frame")
+    for name, partial, diff in (("full", False, False), ("partial", True, False), ("diff", False, True)):
+        sent, us = _measure(oled, partial, diff)
+        print("%-9s %11d  %8d" % (name, sent, us))
+    print("compare, same frame:   %d us" % _compare_us(oled, False))
+    print("compare, one pixel:    %d us" % _compare_us(oled, True))
+    print("longest page step:     %d us (show: %d us)" % (_step_us(oled), _show_us(oled)))
+
+
+main()
@@ -0,0 +1,91 @@
+# Бенчмарк графических примитивов gfx.GFX: пикселей в секунду
+# "pixel" - GFX, которому передан только pixel (все примитивы рисуются
+# по точкам на Python), "buffer" - то же, но пакеты точек pixels()/spans()
+# пишутся прямо в буфер кадра, "native" - GFX.from_framebuf (line, rect
+# и fill_rect выполняет framebuf, закрашенные фигуры - отрезки hline).
+# Запуск на ESP32 (файлы скопировать на плату): import bench_gfx
+# На компьютере (из корня проекта): python benchmarks/bench_gfx.py - модуль
+# framebuf берется из папки host (hostenv.install).
+
+import sys
+
+try:
+    import framebuf  # MicroPython
+except ImportError:
+    sys.path.insert(0, 'host')  # На компьютере - замены machine и framebuf
+    import hostenv
+    hostenv.install()
+    import framebuf
+from array import array
+
+try:
+    from time import ticks_us, ticks_diff  # MicroPython
+except ImportError:
+    from time import perf_counter
+
+    def ticks_us():
+        return int(perf_counter() * 1000000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+sys.path.insert(0, '.')  # Модули калькулятора лежат в корне проекта
+
+from gfx import GFX
+
+W = 128
+H = 64
+REPEATS = 10  # Повторов каждого примитива в замере
+
+# Примитив -> аргументы (без цвета)
+PRIMITIVES = (
+    ("hline", (4, 30, 120)),
+    ("vline", (60, 2, 60)),
+    ("line", (0, 0, 127, 63)),
+    ("rect", (10, 5, 100, 50)),
+    ("fill_rect", (10, 5, 100, 50)),
+    ("circle", (64, 32, 30)),
+    ("fill_circle", (64, 32, 30)),
+    ("triangle", (5, 60, 64, 2, 122, 50)),
+    ("fill_triangle", (5, 60, 64, 2, 122, 50)),
+)
+
+# 64 точки по диагонали для пакетного pixels()
+POINTS = array('h', [i * 2 if j == 0 else i for i in range(64) for j in (0, 1)])
+
+
+def _lit(buf):
+    """Количество включенных пикселей в буфере"""
+    count = 0
+    for b in buf:
+        while b:
+            b &= b - 1
+            count += 1
+    return count
+
+
+def _rate(fb, buf, gfx, name, args):
+    """Пиксели в секунду для одного примитива"""
+    draw = getattr(gfx, name)
+    fb.fill(0)
+    draw(*args, 1)
+    pixels = _lit(buf)
+    start = ticks_us()
+    for _ in range(REPEATS):
+        draw(*args, 1)
+    elapsed = max(ticks_diff(ticks_us(), start), 1)
+    return pixels * REPEATS * 1000000 // elapsed
+
+
+def main():
+    buf = bytearray(W * H // 8)
+    fb = framebuf.FrameBuffer(buf, W, H, framebuf.MONO_VLSB)
+    modes = (GFX(W, H, fb.pixel), GFX(W, H, fb.pixel, buffer=buf),
+             GFX.from_framebuf(fb, W, H, buf))
+    print("primitive      pixel px/s  buffer px/s  native px/s")
+    for name, args in PRIMITIVES + (("pixels", (POINTS, 64)),):
+        rates = [_rate(fb, buf, gfx, name, args) for gfx in modes]
+        print("%-13s %11d %12d %12d" % (name, rates[0], rates[1], rates[2]))
+
+
+main()
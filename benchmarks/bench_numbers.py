@@ -0,0 +1,68 @@
+# Бенчмарк режимов чисел: операций в секунду для float и десятичной
+# фиксированной точки (fixedpoint.FixedDecimal) на 16, 32 и 64 знаках.
+# Запуск на компьютере (из корня проекта): python benchmarks/bench_numbers.py
+
+import sys
+
+try:
+    from time import ticks_us, ticks_diff  # MicroPython
+except ImportError:
+    from time import perf_counter
+
+    def ticks_us():
+        return int(perf_counter() * 1000000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+sys.path.insert(0, '.')  # Модули калькулятора лежат в корне проекта
+
+import calc_parser
+
+OPS = 5000     # Операций в каждом замере
+EXPRS = 300    # Вычислений выражения в каждом замере
+EXPRESSION = "(0.1+0.2)*3.7/1.3-2^10+sqrt(2)*(1.25-0.75)"
+
+
+def _rate(count, func, a, b):
+    """Операций в секунду для func(a, b)"""
+    start = ticks_us()
+    for _ in range(count):
+        func(a, b)
+    return count * 1000000 // max(ticks_diff(ticks_us(), start), 1)
+
+
+def _add(a, b):
+    return a + b
+
+
+def _mul(a, b):
+    return a * b
+
+
+def _div(a, b):
+    return a / b
+
+
+def _expr_rate():
+    """Выражений в секунду (каждый раз с компиляцией, без кэша)"""
+    start = ticks_us()
+    for _ in range(EXPRS):
+        calc_parser.run_program(calc_parser.compile_expression(EXPRESSION))
+    return EXPRS * 1000000 // max(ticks_diff(ticks_us(), start), 1)
+
+
+def main():
+    print("number mode benchmark (ops/s)")
+    print("%-6s %10s %10s %10s %10s" % ("mode", "add", "mul", "div", "expr"))
+    for mode in calc_parser.NUMBER_MODES:
+        calc_parser.set_number_mode(mode)
+        a = calc_parser.evaluate_expression("1/3")
+        b = calc_parser.evaluate_expression("22/7")
+        print("%-6s %10d %10d %10d %10d" % (
+            mode, _rate(OPS, _add, a, b), _rate(OPS, _mul, a, b),
+            _rate(OPS, _div, a, b), _expr_rate()))
+    calc_parser.set_number_mode('FLOAT')
+
+
+main()
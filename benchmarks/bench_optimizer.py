@@ -0,0 +1,70 @@
+# Бенчмарк оптимизатора выражений: количество узлов программы до и после
+# свертки констант и упрощений, а также время выполнения программ.
+# Запуск на компьютере (из корня проекта): python benchmarks/bench_optimizer.py
+
+import sys
+
+try:
+    from time import ticks_us, ticks_diff  # MicroPython
+except ImportError:
+    from time import perf_counter
+
+    def ticks_us():
+        return int(perf_counter() * 1000000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+sys.path.insert(0, '.')  # calc_parser.py лежит в корне проекта
+
+import calc_parser
+
+ROUNDS = 2000  # Сколько раз выполняется каждая программа
+
+# Типичные выражения, которые собирают handle_parenthesis и научные функции
+CORPUS = (
+    "2*(3+4)",
+    "3.14159265359*2",
+    "2.71828182846^2",
+    "(5+3)*2-1",
+    "2^3^2",
+    "(2+3)*4-1",
+    "1*(7-2)+0",
+    "((1+2)*(3+4))^2",
+    "-(-(5))*1",
+    "(12.5+7.5)/1*3^1",
+    "100/(2*(3+(4*(5+6))))",
+    "(1.5+2.5)^3-(-2)^4",
+)
+
+
+def _run_time(programs):
+    """Время (мкс) ROUNDS прогонов всех программ"""
+    start = ticks_us()
+    for _ in range(ROUNDS):
+        for program in programs:
+            calc_parser.run_program(program)
+    return max(ticks_diff(ticks_us(), start), 1)
+
+
+def main():
+    print("calc_parser optimizer benchmark")
+    print("%-28s %6s %6s" % ("expression", "before", "after"))
+    plain = []
+    optimized = []
+    for text in CORPUS:
+        p0 = calc_parser.compile_expression(text, optimize=False)
+        p1 = calc_parser.optimize_program(p0)
+        plain.append(p0)
+        optimized.append(p1)
+        print("%-28s %6d %6d" % (text, calc_parser.node_count(p0), calc_parser.node_count(p1)))
+    before = sum(calc_parser.node_count(p) for p in plain)
+    after = sum(calc_parser.node_count(p) for p in optimized)
+    print("total nodes: %d -> %d" % (before, after))
+    t0 = _run_time(plain)
+    t1 = _run_time(optimized)
+    count = ROUNDS * len(CORPUS)
+    print("evaluate: %d -> %d ns/expr (x%.1f)" % (t0 * 1000 // count, t1 * 1000 // count, t0 / t1))
+
+
+main()
@@ -0,0 +1,105 @@
+# Бенчмарк парсера выражений: сколько выражений в секунду
+# компилируется и вычисляется для входов длиной 20-200 символов,
+# а также скорость повторного вычисления через LRU-кэш.
+# Запуск на компьютере (из корня проекта): python benchmarks/bench_parser.py
+# Запуск на ESP32: скопировать рядом с calc_parser.py и выполнить import bench_parser
+
+import sys
+
+try:
+    from time import ticks_us, ticks_diff  # MicroPython
+except ImportError:
+    from time import perf_counter
+
+    def ticks_us():
+        return int(perf_counter() * 1000000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+sys.path.insert(0, '.')  # calc_parser.py лежит в корне проекта
+
+import calc_parser
+
+LENGTHS = (20, 50, 100, 150, 200)  # Длины выражений
+BATCH = 200                        # Выражений каждой длины
+ROUNDS = 5                         # Повторов для усреднения
+
+
+def make_expression(length, seed):
+    """Строит детерминированное выражение примерно заданной длины"""
+    state = seed
+    ops = '+-*/^'
+    parts = []
+    size = 0
+    opened = 0
+    while size < length:
+        state = (state * 1103515245 + 12345) & 0x7fffffff
+        op = ''
+        if parts:
+            op = ops[state % 5]
+            parts.append(op)
+            size += 1
+        if op != '^' and state % 7 == 0 and opened < 4:
+            parts.append('(')
+            opened += 1
+            size += 1
+        if op == '^':
+            number = str(2 + state % 2)  # Малый показатель, чтобы не было overflow
+        else:
+            number = str((state >> 8) % 1000 + 1)
+            if state % 3 == 0:
+                number += '.' + str(state % 100)
+        parts.append(number)
+        size += len(number)
+        if opened and state % 5 == 0:
+            parts.append(')')
+            opened -= 1
+            size += 1
+    parts.append(')' * opened)
+    return ''.join(parts)
+
+
+def _best_time(exprs, func):
+    """Лучшее время (мкс) из ROUNDS прогонов func по всем выражениям"""
+    best = None
+    for _ in range(ROUNDS):
+        start = ticks_us()
+        for text in exprs:
+            func(text)
+        elapsed = ticks_diff(ticks_us(), start)
+        if best is None or elapsed < best:
+            best = elapsed
+    return max(best, 1)
+
+
+def _cold(text):
+    """Полный путь без кэша: токенизация, компиляция, выполнение"""
+    try:
+        calc_parser.run_program(calc_parser.compile_expression(text))
+    except Exception:
+        pass
+
+
+def bench(length):
+    """Возвращает (средняя длина, выражений/с без кэша, выражений/с из кэша)"""
+    exprs = [make_expression(length, i + 1) for i in range(BATCH)]
+    cold = _best_time(exprs, _cold)
+    # Повторное "=" на одном и том же выражении - попадание в LRU-кэш
+    calc_parser.cache_clear()
+    repeat = [exprs[0]] * BATCH
+    cached = _best_time(repeat, calc_parser.evaluate_expression)
+    avg_len = sum(len(e) for e in exprs) // len(exprs)
+    return avg_len, BATCH * 1000000 // cold, BATCH * 1000000 // cached
+
+
+def main():
+    print("calc_parser benchmark: compile + evaluate")
+    print("length  avg_chars  cold expr/s  cached expr/s")
+    for length in LENGTHS:
+        avg_len, cold, cached = bench(length)
+        print("%6d  %9d  %11d  %13d" % (length, avg_len, cold, cached))
+    print("cache:", calc_parser.cache_stats())
+
+
+main()
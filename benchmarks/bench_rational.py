@@ -0,0 +1,66 @@
+# Бенчмарк режима точных дробей (FRAC) на длинных цепочках + - * /
+# по сравнению с float: время вычисления, ошибка float и момент,
+# когда дробь переходит на float из-за роста числителя/знаменателя.
+# Запуск на компьютере (из корня проекта): python benchmarks/bench_rational.py
+
+import sys
+
+try:
+    from time import ticks_us, ticks_diff  # MicroPython
+except ImportError:
+    from time import perf_counter
+
+    def ticks_us():
+        return int(perf_counter() * 1000000)
+
+    def ticks_diff(a, b):
+        return a - b
+
+sys.path.insert(0, '.')  # Модули калькулятора лежат в корне проекта
+
+import calc_parser
+from rational import Rational
+
+TERMS = (5, 10, 15, 20, 25, 30)  # Слагаемых в цепочке (до MAX_TOKENS токенов)
+ROUNDS = 50                  # Повторов каждого вычисления
+
+
+PRIMES = (101, 103, 107, 109, 113, 127, 131, 137, 139, 149, 151, 157, 163, 167, 173, 179, 181, 191, 193, 197)
+
+
+def make_chain(terms):
+    """Цепочка вида 1/101+2/103-3/107... (простые знаменатели растят дробь)"""
+    parts = []
+    for i in range(terms):
+        if parts:
+            parts.append('+-'[i % 2])
+        parts.append(str(i % 9 + 1) + '/' + str(PRIMES[i % len(PRIMES)]))
+    return ''.join(parts)
+
+
+def _time(text):
+    """Среднее время (мкс) компиляции и вычисления выражения"""
+    start = ticks_us()
+    for _ in range(ROUNDS):
+        value = calc_parser.run_program(calc_parser.compile_expression(text))
+    return ticks_diff(ticks_us(), start) // ROUNDS, value
+
+
+def main():
+    print("FRAC vs FLOAT on chained expressions")
+    print("%5s %6s %9s %9s %6s %9s %12s" % ("terms", "chars", "float us", "frac us", "exact", "den digs", "float error"))
+    for terms in TERMS:
+        text = make_chain(terms)
+        calc_parser.set_number_mode('FLOAT')
+        float_us, float_value = _time(text)
+        calc_parser.set_number_mode('FRAC')
+        frac_us, frac_value = _time(text)
+        exact = isinstance(frac_value, Rational)
+        error = abs(float_value - frac_value.to_float()) if exact else 0.0
+        den_digits = len(str(frac_value.den)) if exact else 0  # 0 - уже float
+        print("%5d %6d %9d %9d %6s %9d %12.3g" % (
+            terms, len(text), float_us, frac_us, exact, den_digits, error))
+    calc_parser.set_number_mode('FLOAT')
+
+
+main()
@@ -0,0 +1,94 @@
+# Крупный шрифт для строки результата: цифры в 2 и 3 раза больше
+# Глифы получены масштабированием шрифта 5x7 и хранятся готовыми
+# столбцами в формате MONO_VLSB (как буфер дисплея) в литералах bytes.
+# Такие таблицы можно заморозить в прошивке: импорт не занимает кучу.
+
+import framebuf
+
+CHARS = "0123456789.-+eEro"  # Символы шрифта (хватает на числа и "Error")
+BASE_WIDTH = 5               # Ширина глифа в исходной сетке 5x7
+BASE_HEIGHT = 7              # Высота глифа в исходной сетке
+# Ширина символа в исходной сетке (точка узкая), перед следующим - 1 точка
+ADVANCE = b'\x05\x05\x05\x05\x05\x05\x05\x05\x05\x05\x02\x05\x05\x05\x05\x05\x05'
+SCALES = (3, 2)              # Доступные увеличения, от большего к меньшему
+
+GLYPHS2 = (
+    b'\xfc\xfc\x03\x03\xc3\xc3\x33\x33\xfc\xfc\x0f\x0f\x33\x33\x30\x30\x30\x30\x0f\x0f',  # 0
+    b'\x00\x00\x0c\x0c\xff\xff\x00\x00\x00\x00\x00\x00\x30\x30\x3f\x3f\x30\x30\x00\x00',  # 1
+    b'\x0c\x0c\x03\x03\x03\x03\xc3\xc3\x3c\x3c\x30\x30\x3c\x3c\x33\x33\x30\x30\x30\x30',  # 2
+    b'\x03\x03\x03\x03\x33\x33\xcf\xcf\x03\x03\x0c\x0c\x30\x30\x30\x30\x30\x30\x0f\x0f',  # 3
+    b'\xc0\xc0\x30\x30\x0c\x0c\xff\xff\x00\x00\x03\x03\x03\x03\x03\x03\x3f\x3f\x03\x03',  # 4
+    b'\x3f\x3f\x33\x33\x33\x33\x33\x33\xc3\xc3\x0c\x0c\x30\x30\x30\x30\x30\x30\x0f\x0f',  # 5
+    b'\xf0\xf0\xcc\xcc\xc3\xc3\xc3\xc3\x00\x00\x0f\x0f\x30\x30\x30\x30\x30\x30\x0f\x0f',  # 6
+    b'\x03\x03\x03\x03\xc3\xc3\x33\x33\x0f\x0f\x00\x00\x3f\x3f\x00\x00\x00\x00\x00\x00',  # 7
+    b'\x3c\x3c\xc3\xc3\xc3\xc3\xc3\xc3\x3c\x3c\x0f\x0f\x30\x30\x30\x30\x30\x30\x0f\x0f',  # 8
+    b'\x3c\x3c\xc3\xc3\xc3\xc3\xc3\xc3\xfc\xfc\x00\x00\x30\x30\x30\x30\x0c\x0c\x03\x03',  # 9
+    b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x3c\x3c\x3c\x3c\x00\x00\x00\x00\x00\x00',  # .
+    b'\xc0\xc0\xc0\xc0\xc0\xc0\xc0\xc0\xc0\xc0\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00',  # -
+    b'\xc0\xc0\xc0\xc0\xfc\xfc\xc0\xc0\xc0\xc0\x00\x00\x00\x00\x0f\x0f\x00\x00\x00\x00',  # +
+    b'\xc0\xc0\x30\x30\x30\x30\x30\x30\xc0\xc0\x0f\x0f\x33\x33\x33\x33\x33\x33\x03\x03',  # e
+    b'\xff\xff\xc3\xc3\xc3\xc3\xc3\xc3\x03\x03\x3f\x3f\x30\x30\x30\x30\x30\x30\x30\x30',  # E
+    b'\xf0\xf0\xc0\xc0\x30\x30\x30\x30\xc0\xc0\x3f\x3f\x00\x00\x00\x00\x00\x00\x00\x00',  # r
+    b'\xc0\xc0\x30\x30\x30\x30\x30\x30\xc0\xc0\x0f\x0f\x30\x30\x30\x30\x30\x30\x0f\x0f',  # o
+)
+
+GLYPHS3 = (
+    b'\xf8\xf8\xf8\x07\x07\x07\x07\x07\x07\xc7\xc7\xc7\xf8\xf8\xf8\xff\xff\xff\x70\x70\x70\x0e\x0e\x0e\x01\x01\x01\xff\xff\xff\x03\x03\x03\x1c\x1c\x1c\x1c\x1c\x1c\x1c\x1c\x1c\x03\x03\x03',  # 0
+    b'\x00\x00\x00\x38\x38\x38\xff\xff\xff\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\xff\xff\xff\x00\x00\x00\x00\x00\x00\x00\x00\x00\x1c\x1c\x1c\x1f\x1f\x1f\x1c\x1c\x1c\x00\x00\x00',  # 1
+    b'\x38\x38\x38\x07\x07\x07\x07\x07\x07\x07\x07\x07\xf8\xf8\xf8\x00\x00\x00\x80\x80\x80\x70\x70\x70\x0e\x0e\x0e\x01\x01\x01\x1c\x1c\x1c\x1f\x1f\x1f\x1c\x1c\x1c\x1c\x1c\x1c\x1c\x1c\x1c',  # 2
+    b'\x07\x07\x07\x07\x07\x07\xc7\xc7\xc7\x3f\x3f\x3f\x07\x07\x07\x80\x80\x80\x00\x00\x00\x01\x01\x01\x0e\x0e\x0e\xf0\xf0\xf0\x03\x03\x03\x1c\x1c\x1c\x1c\x1c\x1c\x1c\x1c\x1c\x03\x03\x03',  # 3
+    b'\x00\x00\x00\xc0\xc0\xc0\x38\x38\x38\xff\xff\xff\x00\x00\x00\x7e\x7e\x7e\x71\x71\x71\x70\x70\x70\xff\xff\xff\x70\x70\x70\x00\x00\x00\x00\x00\x00\x00\x00\x00\x1f\x1f\x1f\x00\x00\x00',  # 4
+    b'\xff\xff\xff\xc7\xc7\xc7\xc7\xc7\xc7\xc7\xc7\xc7\x07\x07\x07\x81\x81\x81\x01\x01\x01\x01\x01\x01\x01\x01\x01\xfe\xfe\xfe\x03\x03\x03\x1c\x1c\x1c\x1c\x1c\x1c\x1c\x1c\x1c\x03\x03\x03',  # 5
+    b'\xc0\xc0\xc0\x38\x38\x38\x07\x07\x07\x07\x07\x07\x00\x00\x00\xff\xff\xff\x0e\x0e\x0e\x0e\x0e\x0e\x0e\x0e\x0e\xf0\xf0\xf0\x03\x03\x03\x1c\x1c\x1c\x1c\x1c\x1c\x1c\x1c\x1c\x03\x03\x03',  # 6
+    b'\x07\x07\x07\x07\x07\x07\x07\x07\x07\xc7\xc7\xc7\x3f\x3f\x3f\x00\x00\x00\xf0\xf0\xf0\x0e\x0e\x0e\x01\x01\x01\x00\x00\x00\x00\x00\x00\x1f\x1f\x1f\x00\x00\x00\x00\x00\x00\x00\x00\x00',  # 7
+    b'\xf8\xf8\xf8\x07\x07\x07\x07\x07\x07\x07\x07\x07\xf8\xf8\xf8\xf1\xf1\xf1\x0e\x0e\x0e\x0e\x0e\x0e\x0e\x0e\x0e\xf1\xf1\xf1\x03\x03\x03\x1c\x1c\x1c\x1c\x1c\x1c\x1c\x1c\x1c\x03\x03\x03',  # 8
+    b'\xf8\xf8\xf8\x07\x07\x07\x07\x07\x07\x07\x07\x07\xf8\xf8\xf8\x01\x01\x01\x0e\x0e\x0e\x0e\x0e\x0e\x8e\x8e\x8e\x7f\x7f\x7f\x00\x00\x00\x1c\x1c\x1c\x1c\x1c\x1c\x03\x03\x03\x00\x00\x00',  # 9
+    b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x80\x80\x80\x80\x80\x80\x00\x00\x00\x00\x00\x00\x00\x00\x00\x1f\x1f\x1f\x1f\x1f\x1f\x00\x00\x00\x00\x00\x00\x00\x00\x00',  # .
+    b'\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x0e\x0e\x0e\x0e\x0e\x0e\x0e\x0e\x0e\x0e\x0e\x0e\x0e\x0e\x0e\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00',  # -
+    b'\x00\x00\x00\x00\x00\x00\xf8\xf8\xf8\x00\x00\x00\x00\x00\x00\x0e\x0e\x0e\x0e\x0e\x0e\xff\xff\xff\x0e\x0e\x0e\x0e\x0e\x0e\x00\x00\x00\x00\x00\x00\x03\x03\x03\x00\x00\x00\x00\x00\x00',  # +
+    b'\x00\x00\x00\xc0\xc0\xc0\xc0\xc0\xc0\xc0\xc0\xc0\x00\x00\x00\xfe\xfe\xfe\x71\x71\x71\x71\x71\x71\x71\x71\x71\x7e\x7e\x7e\x03\x03\x03\x1c\x1c\x1c\x1c\x1c\x1c\x1c\x1c\x1c\x00\x00\x00',  # e
+    b'\xff\xff\xff\x07\x07\x07\x07\x07\x07\x07\x07\x07\x07\x07\x07\xff\xff\xff\x0e\x0e\x0e\x0e\x0e\x0e\x0e\x0e\x0e\x00\x00\x00\x1f\x1f\x1f\x1c\x1c\x1c\x1c\x1c\x1c\x1c\x1c\x1c\x1c\x1c\x1c',  # E
+    b'\xc0\xc0\xc0\x00\x00\x00\xc0\xc0\xc0\xc0\xc0\xc0\x00\x00\x00\xff\xff\xff\x0e\x0e\x0e\x01\x01\x01\x01\x01\x01\x0e\x0e\x0e\x1f\x1f\x1f\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00\x00',  # r
+    b'\x00\x00\x00\xc0\xc0\xc0\xc0\xc0\xc0\xc0\xc0\xc0\x00\x00\x00\xfe\xfe\xfe\x01\x01\x01\x01\x01\x01\x01\x01\x01\xfe\xfe\xfe\x03\x03\x03\x1c\x1c\x1c\x1c\x1c\x1c\x1c\x1c\x1c\x03\x03\x03',  # o
+)
+GLYPHS = {2: GLYPHS2, 3: GLYPHS3}
+
+# Один буфер и FrameBuffer на каждое увеличение: глиф копируется в него
+# перед blit, поэтому вывод текста не выделяет новых буферов
+_scratch = {}
+for _scale in SCALES:
+    _buf = bytearray(((BASE_HEIGHT * _scale + 7) // 8) * BASE_WIDTH * _scale)
+    _scratch[_scale] = (_buf, framebuf.FrameBuffer(_buf, BASE_WIDTH * _scale,
+                                                   BASE_HEIGHT * _scale, framebuf.MONO_VLSB))
+
+
+def supports(text):
+    """True, если все символы текста есть в крупном шрифте"""
+    for ch in text:
+        if ch not in CHARS:
+            return False
+    return True
+
+
+def height(scale):
+    """Высота символов в пикселях при увеличении scale"""
+    return BASE_HEIGHT * scale
+
+
+def width(text, scale):
+    """Ширина текста в пикселях при увеличении scale"""
+    total = 0
+    for ch in text:
+        total += (ADVANCE[CHARS.index(ch)] + 1) * scale
+    return total - scale if total else 0  # После последнего символа отступ не нужен
+
+
+def text(target, s, x, y, scale):
+    """Рисует строку s белым цветом в target (фон не меняется)"""
+    buf, fb = _scratch[scale]
+    table = GLYPHS[scale]
+    for ch in s:
+        i = CHARS.index(ch)
+        buf[:] = table[i]
+        target.blit(fb, x, y, 0)
+        x += (ADVANCE[i] + 1) * scale
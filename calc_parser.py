@@ -1,739 +1,1081 @@
-# Импортируем необходимые модули
-from machine import Pin, SoftI2C, Timer  # Для работы с пинами, I2C и таймерами
-import ssd1306  # Для работы с OLED дисплеем
-import time  # Для работы со временем
-import math  # Для математических функций
-import re  # Для регулярных выражений
-from calc_parser import evaluate_expression  # Наш парсер математических выражений
-
-# ВЕРСИЯ 7.1 - ИСПРАВЛЕННО ОТОБРАЖЕНИЕ КОНСТАНТ
-
-# ===== НАСТРОЙКА ДИСПЛЕЯ =====
-# Создаем I2C интерфейс на пинах 47 (SCL) и 21 (SDA)
-i2c = SoftI2C(scl=Pin(47), sda=Pin(21))
-W = 128  # Ширина дисплея в пикселях
-H = 64   # Высота дисплея в пикселях
-oled = ssd1306.SSD1306_I2C(W, H, i2c)  # Создаем объект дисплея
-
-# ===== НАСТРОЙКА GPIO =====
-# Создаем список пинов для строк матричной клавиатуры (выходы)
-rows = [
-    Pin(15, Pin.OUT),  # Строка 0
-    Pin(16, Pin.OUT),  # Строка 1  
-    Pin(17, Pin.OUT),  # Строка 2
-    Pin(18, Pin.OUT)   # Строка 3
-]
-
-# Создаем список пинов для столбцов матричной клавиатуры (входы с подтяжкой к питанию)
-cols = [
-    Pin(35, Pin.IN, Pin.PULL_UP),  # Столбец 0
-    Pin(36, Pin.IN, Pin.PULL_UP),  # Столбец 1
-    Pin(37, Pin.IN, Pin.PULL_UP),  # Столбец 2
-    Pin(39, Pin.IN, Pin.PULL_UP),  # Столбец 3
-    Pin(40, Pin.IN, Pin.PULL_UP),  # Столбец 4
-    Pin(41, Pin.IN, Pin.PULL_UP)   # Столбец 5
-]
-
-# Создаем словарь для навигационных кнопок
-nav_buttons = {
-    'up':    Pin(42, Pin.IN, Pin.PULL_UP),    # Кнопка ВВЕРХ
-    'down':  Pin(43, Pin.IN, Pin.PULL_UP),    # Кнопка ВНИЗ
-    'left':  Pin(44, Pin.IN, Pin.PULL_UP),    # Кнопка ВЛЕВО
-    'right': Pin(45, Pin.IN, Pin.PULL_UP),    # Кнопка ВПРАВО
-    'enter': Pin(46, Pin.IN, Pin.PULL_UP)     # Кнопка ВВОД
-}
-
-# Инициализация строк - устанавливаем все в высокий уровень (1)
-for r in rows:
-    r.value(1)
-
-# ===== РАСКЛАДКА КЛАВИАТУРЫ =====
-# Обычная раскладка (базовый режим)
-keymap_normal = [
-    ['7', '8', '9', '/', 'C', 'BS'],     # Ряд 1: цифры 7-9, деление, очистка, backspace
-    ['4', '5', '6', '*', '(', ')'],      # Ряд 2: цифры 4-6, умножение, скобки
-    ['1', '2', '3', '-', '=', 'SHIFT'],  # Ряд 3: цифры 1-3, минус, равно, переключение режима
-    ['0', '.', '%', '+', '^', 'MENU']    # Ряд 4: ноль, точка, процент, плюс, степень, меню
-]
-
-# Альтернативная раскладка (научный режим)
-# ЗАМЕНИЛИ 'sqr' на 'sqrt' для ясности и убрали неиспользуемые '[' и ']'
-keymap_shift = [
-    ['sin', 'cos', 'tan', 'log', 'ln', 'BS'],     # Ряд 1: тригонометрия, логарифмы, backspace
-    ['pi', 'e', 'sqrt', '!', '(', ')'],           # Ряд 2: константы, корень, факториал, скобки
-    ['1/x', 'x²', 'x³', '±', '=', 'SHIFT'],       # Ряд 3: обратное, квадрат, куб, смена знака, равно, переключение
-    ['0', '.', '%', '+', '^', 'MENU']             # Ряд 4: ноль, точка, процент, плюс, степень, меню
-]
-
-# ===== ГЛОБАЛЬНЫЕ ПЕРЕМЕННЫЕ =====
-stable_matrix_keys = []  # Стабильное состояние клавиш матрицы (после устранения дребезга)
-last_matrix_keys = []    # Предыдущее состояние клавиш матрицы
-stable_nav_keys = []     # Стабильное состояние навигационных кнопок
-last_nav_keys = []       # Предыдущее состояние навигационных кнопок
-pressed_keys_history = set()  # История нажатых клавиш (для обнаружения новых нажатий)
-pressed_nav_history = set()   # История нажатых навигационных кнопок
-
-scan_flag = bytearray(1)  # Флаг для синхронизации сканирования клавиатуры
-display_tick = 0          # Счетчик для обновления дисплея
-
-# Переменные калькулятора
-expression = ""      # Полное математическое выражение (например: "789+1")
-current_input = "0"  # Текущее вводимое число
-result = ""          # Результат вычислений
-shift_mode = False   # Режим научного калькулятора (True - научный, False - базовый)
-menu_mode = False    # Режим меню (True - открыто меню, False - калькулятор)
-menu_position = 0    # Текущая позиция в меню
-last_nav_action = 0  # Время последнего нажатия навигационной кнопки
-reset_on_next_input = False  # Флаг сброса при следующем вводе
-
-# Режим "О программе"
-about_mode = False   # Режим просмотра информации о программе
-about_page = 0       # Текущая страница в режиме "О программе"
-about_pages = [      # Страницы с информацией
-    # Убрали строку "Firmware: 7.1" как просили
-    ["CALCULATOR v7.1", "Author: VLAD", "ESP32-S3", ""],  # Страница 1: основная информация
-    ["FIXED CONSTANTS:", "pi and e display", "shorter values", "fits screen"],  # Страница 2: о константах
-    ["HOW TO USE:", "Use 2*(-3)", "for negative", "multiplication"],  # Страница 3: инструкция
-    ["NAVIGATION:", "UP/DOWN=Scroll", "ENTER=Select", "MENU=Exit"]   # Страница 4: управление
-]
-
-# Математические константы (укороченные для лучшего отображения на экране)
-PI = 3.14159265358979   # Число π с 14 знаками после запятой
-E = 2.718281828459045   # Число e с 15 знаками после запятой
-
-DEBUG = False  # Режим отладки (вывод дополнительной информации)
-
-# ===== ФУНКЦИИ ДЛЯ РАБОТЫ С ДИСПЛЕЕМ =====
-def center_text(text, y):
-    """Выравнивает текст по центру экрана на заданной высоте y"""
-    x = (W - len(text) * 8) // 2  # Вычисляем позицию x для центрирования (8 пикселей на символ)
-    if x < 0:  # Если текст слишком длинный, начинаем с левого края
-        x = 0
-    oled.text(text, x, y)  # Выводим текст на дисплей
-
-def draw_inverted_box(text, x, y):
-    """Рисует текст в инвертированном прямоугольнике (белый фон, черный текст)"""
-    width = len(text) * 8 + 4  # Ширина прямоугольника (8 пикселей на символ + отступы)
-    height = 10  # Высота прямоугольника
-    # Рисуем белый прямоугольник (заливаем область)
-    oled.fill_rect(x, y, width, height, 1)
-    # Рисуем черный текст поверх белого прямоугольника
-    oled.text(text, x + 2, y + 1, 0)
-
-def draw_large_inverted_result(text, y):
-    """Рисует крупный инвертированный результат по центру экрана"""
-    text_width = len(text) * 8  # Ширина текста в пикселях
-    box_width = text_width + 8  # Ширина прямоугольника с отступами
-    box_height = 14  # Высота прямоугольника
-    x_pos = (W - box_width) // 2  # Позиция x для центрирования
-    
-    # Рисуем белый прямоугольник
-    oled.fill_rect(x_pos, y, box_width, box_height, 1)
-    # Рисуем черный текст поверх с отступами
-    oled.text(text, x_pos + 4, y + 3, 0)
-
-def update_display():
-    """Обновляет содержимое дисплея в зависимости от текущего режима"""
-    oled.fill(0)  # Очищаем дисплей (заполняем черным)
-    
-    if about_mode:
-        # Режим "О программе"
-        page = about_pages[about_page]  # Получаем текущую страницу
-        for i, line in enumerate(page):
-            if i < 4:  # Выводим до 4 строк на странице
-                center_text(line, 5 + i * 12)  # Центрируем каждую строку
-        # Отображаем номер страницы и подсказку по управлению
-        oled.text(f"Page {about_page + 1}/{len(about_pages)}", 0, 55)
-        oled.text("UP/DOWN=MENU", 70, 55)
-        
-    elif menu_mode:
-        # Режим меню
-        center_text("MAIN MENU", 0)  # Заголовок меню по центру
-        menu_items = ["Basic Calc", "Scientific", "Settings", "About"]  # Пункты меню
-        
-        # Отображаем все пункты меню
-        for i, item in enumerate(menu_items):
-            if i == menu_position:
-                # Текущий выбранный пункт выделяем стрелкой
-                oled.text(f"> {item}", 10, 15 + i * 10)
-            else:
-                # Остальные пункты без выделения
-                oled.text(f"  {item}", 10, 15 + i * 10)
-        oled.text("ENTER=Select", 0, 55)  # Подсказка внизу экрана
-        
-    else:
-        # ОСНОВНОЙ РЕЖИМ КАЛЬКУЛЯТОРА (в стиле Windows Calculator)
-        
-        # 1. Верхняя строка - полное выражение с текущим вводом
-        display_expr = expression  # Начинаем с основного выражения
-        
-        # Добавляем текущий ввод к выражению, если он не нулевой
-        if current_input != "0" and current_input != "Error":
-            display_expr += current_input
-        
-        # Добавляем знак "=" если есть результат вычислений
-        if result:
-            display_expr += "="
-        
-        # Обрезаем выражение если оно слишком длинное
-        if display_expr:
-            if len(display_expr) > 20:
-                display_expr = "..." + display_expr[-17:]  # Показываем последние 17 символов
-            oled.text(display_expr, 0, 2)  # Выводим выражение в верхней части
-        
-        # 2. Основное поле - инвертированный результат или обычный текущий ввод
-        display_text = result if result else current_input  # Что показывать: результат или ввод
-        
-        if display_text:
-            # Обрезаем текст если он слишком длинный
-            if len(display_text) > 16:
-                display_text = display_text[-16:]  # Показываем последние 16 символов
-            
-            # ИНВЕРТИРОВАННЫЙ РЕЗУЛЬТАТ ДЛЯ ВСЕХ РЕЖИМОВ
-            if result or (not expression and current_input != "0" and current_input != "Error"):
-                # Показываем результат вычислений ИЛИ прямое вычисление научной функции
-                draw_large_inverted_result(display_text, 22)  # Крупный инвертированный текст
-            else:
-                # Текущий ввод в выражении - обычный текст по центру
-                text_width = len(display_text) * 8
-                x_pos = (W - text_width) // 2
-                oled.text(display_text, x_pos, 25)  # Обычный текст
-        
-        # 3. Инвертированный индикатор режима в правом нижнем углу
-        mode_text = "S" if shift_mode else "B"  # S - научный, B - базовый
-        draw_inverted_box(mode_text, W - 12, H - 10)  # Маленький инвертированный квадрат
-    
-    try:
-        oled.show()  # Обновляем дисплей (выводим буфер на экран)
-    except OSError:
-        pass  # Игнорируем ошибки вывода (например, если дисплей отключен)
-
-# ===== СКАНИРОВАНИЕ КЛАВИАТУРЫ =====
-def fast_scan_matrix():
-    """Быстро сканирует матричную клавиатуру и возвращает нажатые клавиши"""
-    pressed_keys = []  # Список нажатых клавиш
-    
-    # Проходим по всем строкам матрицы
-    for row_num, row_pin in enumerate(rows):
-        row_pin.value(0)  # Активируем текущую строку (устанавливаем в 0)
-        time.sleep_us(80)  # Короткая задержка для стабилизации
-        
-        # Проверяем все столбцы в активированной строке
-        for col_num, col_pin in enumerate(cols):
-            if col_pin.value() == 0:  # Если клавиша нажата (сигнал 0)
-                time.sleep_us(50)  # Задержка для устранения дребезга
-                if col_pin.value() == 0:  # Подтверждаем нажатие
-                    # Определяем символ клавиши в зависимости от режима
-                    if shift_mode:
-                        key_char = keymap_shift[row_num][col_num]  # Научный режим
-                    else:
-                        key_char = keymap_normal[row_num][col_num]  # Базовый режим
-                    pressed_keys.append((row_num, col_num, key_char))  # Добавляем в список
-        
-        row_pin.value(1)  # Деактивируем строку
-        time.sleep_us(40)  # Короткая задержка
-    
-    return pressed_keys  # Возвращаем список нажатых клавиш
-
-def fast_scan_nav():
-    """Сканирует навигационные кнопки и возвращает нажатые"""
-    pressed_nav = []  # Список нажатых навигационных кнопок
-    for name, button in nav_buttons.items():  # Проходим по всем кнопкам
-        try:
-            if button.value() == 0:  # Если кнопка нажата
-                time.sleep_us(50)  # Задержка для устранения дребезга
-                if button.value() == 0:  # Подтверждаем нажатие
-                    pressed_nav.append(name)  # Добавляем имя кнопки в список
-        except:
-            pass  # Игнорируем ошибки чтения (для надежности работы)
-    return pressed_nav  # Возвращаем список нажатых кнопок
-
-def debounce_keys(current_matrix, current_nav):
-    """Устраняет дребезг контактов, сравнивая текущее и предыдущее состояние"""
-    global last_matrix_keys, last_nav_keys, stable_matrix_keys, stable_nav_keys
-    
-    # Преобразуем текущие и предыдущие состояния в множества для сравнения
-    current_set = set((r, c, k) for r, c, k in current_matrix)
-    last_set = set((r, c, k) for r, c, k in last_matrix_keys)
-    
-    # Если текущее состояние совпадает с предыдущим - клавиши стабильны
-    if current_set == last_set:
-        stable_matrix_keys = current_matrix
-    else:
-        stable_matrix_keys = []  # Иначе - состояние нестабильно
-    
-    # Аналогично для навигационных кнопок
-    if set(current_nav) == set(last_nav_keys):
-        stable_nav_keys = current_nav
-    else:
-        stable_nav_keys = []
-    
-    # Сохраняем текущее состояние как предыдущее для следующего вызова
-    last_matrix_keys = current_matrix
-    last_nav_keys = current_nav
-
-# ===== ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ =====
-def round_result(value):
-    """Округляет числовое значение для устранения погрешностей вычислений"""
-    # Сначала проверяем, не является ли значение ошибкой
-    if isinstance(value, str) and value == "Error":
-        return "Error"
-    
-    try:
-        # Преобразуем значение в число, если оно строковое
-        if isinstance(value, str):
-            num_value = float(value)
-        else:
-            num_value = value
-            
-        # Округляем до 12 знаков после запятой для точности
-        rounded = round(num_value, 12)
-        
-        # Если число очень близко к целому - делаем его целым
-        if abs(rounded - round(rounded)) < 1e-10:
-            rounded = round(rounded)
-        
-        # Если число целое - убираем .0
-        if rounded == int(rounded):
-            return str(int(rounded))
-        else:
-            # Форматируем с минимальным количеством знаков
-            result_str = f"{rounded:.10g}"
-            # Убираем лишние нули в конце дробной части
-            if '.' in result_str:
-                result_str = result_str.rstrip('0').rstrip('.')
-            return result_str
-            
-    except:
-        return str(value)  # В случае ошибки возвращаем строковое представление
-
-# ===== УЛУЧШЕННАЯ ЛОГИКА КАЛЬКУЛЯТОРА =====
-def handle_digit_input(digit):
-    """Обрабатывает ввод цифр"""
-    global current_input, reset_on_next_input, result
-    
-    # Если текущий ввод "0" или "Error", или нужен сброс - заменяем текущий ввод
-    if current_input == "0" or current_input == "Error" or reset_on_next_input:
-        current_input = digit
-        reset_on_next_input = False
-        result = ""  # Сбрасываем результат при новом вводе
-    else:
-        # Добавляем цифру к текущему вводу (если не превышен лимит)
-        if len(current_input) < 20:
-            current_input += digit
-        result = ""  # Сбрасываем результат при продолжении ввода
-
-def handle_decimal_point():
-    """Обрабатывает ввод десятичной точки"""
-    global current_input, reset_on_next_input, result
-    
-    # Если текущий ввод "0" или нужен сброс - начинаем с "0."
-    if current_input == "0" or current_input == "Error" or reset_on_next_input:
-        current_input = "0."
-        reset_on_next_input = False
-        result = ""
-    # Если точки еще нет в числе - добавляем ее
-    elif '.' not in current_input:
-        current_input += '.'
-        result = ""
-
-def handle_backspace():
-    """Обрабатывает удаление последнего символа (Backspace)"""
-    global current_input, expression, reset_on_next_input, result
-    
-    if current_input == "Error":
-        # Если была ошибка - полностью сбрасываем калькулятор
-        current_input = "0"
-        expression = ""
-        result = ""
-        reset_on_next_input = False
-    elif len(current_input) > 1:
-        # Удаляем последний символ
-        current_input = current_input[:-1]
-    else:
-        # Если остался один символ - сбрасываем на "0"
-        current_input = "0"
-    reset_on_next_input = False
-    result = ""  # Сбрасываем результат при редактировании
-
-def handle_clear():
-    """Обрабатывает полную очистку калькулятора (C)"""
-    global current_input, expression, reset_on_next_input, result
-    current_input = "0"
-    expression = ""
-    result = ""
-    reset_on_next_input = False
-
-def handle_operation(op):
-    """Обрабатывает ввод математических операций (+, -, *, /)"""
-    global current_input, expression, reset_on_next_input, result
-    
-    if current_input != "Error":  # Если нет ошибки
-        reset_on_next_input = False
-        result = ""  # Сбрасываем результат при новом вводе
-        
-        # Специальная обработка для унарного минуса (отрицательные числа)
-        if op == '-' and current_input == "0":
-            current_input = "-"  # Начинаем ввод отрицательного числа
-            return
-            
-        # Обычная обработка операторов
-        if expression and expression[-1] == ')':
-            # Если выражение заканчивается скобкой - добавляем оператор
-            expression += op
-            current_input = "0"
-        elif current_input != "0" and current_input != "-":
-            # Если есть текущее число - добавляем его и оператор к выражению
-            expression += current_input + op
-            current_input = "0"
-        elif expression and expression[-1] in ['+', '-', '*', '/', '^']:
-            # Заменяем последний оператор на новый
-            expression = expression[:-1] + op
-        else:
-            # Просто добавляем оператор к выражению
-            expression += op
-
-def handle_equals():
-    """Обрабатывает вычисление выражения (=)"""
-    global current_input, expression, reset_on_next_input, result
-    
-    # Если есть выражение или текущий ввод не "0"
-    if (expression or current_input != "0") and current_input != "Error":
-        full_expression = expression  # Начинаем с основного выражения
-        
-        # Добавляем текущее число к выражению
-        if current_input != "0" or (expression and expression[-1] in ['+', '-', '*', '/', '^', '(']):
-            full_expression += current_input
-        
-        # Вычисляем результат с помощью нашего парсера
-        calculated_result = evaluate_expression(full_expression)
-        
-        # Округляем результат для красивого отображения
-        calculated_result = round_result(calculated_result)
-            
-        result = calculated_result  # Сохраняем результат
-        # expression сохраняем для отображения в верхней строке
-        reset_on_next_input = True  # Следующий ввод начнет новое выражение
-
-def handle_percent():
-    """ПРОСТАЯ РЕАЛИЗАЦИЯ ПРОЦЕНТА: x% = x / 100 (вариант A)"""
-    global current_input, reset_on_next_input, result
-    try:
-        value = float(current_input)  # Преобразуем текущий ввод в число
-        # Просто делим на 100 - это самый понятный и надежный способ
-        current_input = str(round_result(value / 100.0))
-        reset_on_next_input = True
-        result = current_input  # Показываем результат
-    except:
-        current_input = "Error"  # В случае ошибки (например, нечисловой ввод)
-        reset_on_next_input = False
-
-def handle_power():
-    """Обрабатывает возведение в степень (^)"""
-    global reset_on_next_input, result
-    reset_on_next_input = False
-    result = ""  # Сбрасываем результат
-    handle_operation('^')  # Используем общую функцию для операций
-
-def handle_parenthesis(parenthesis):
-    """Обрабатывает ввод скобок"""
-    global current_input, expression, reset_on_next_input, result
-    
-    reset_on_next_input = False
-    result = ""  # Сбрасываем результат
-    
-    if parenthesis == '(':
-        # Открывающая скобка
-        if current_input != "0" and current_input != "Error":
-            # Если есть текущее число - добавляем умножение перед скобкой
-            expression += current_input + '*'
-            current_input = "0"
-        expression += '('  # Добавляем открывающую скобку
-    else:
-        # Закрывающая скобка
-        if current_input != "0" and current_input != "Error":
-            # Если есть текущее число - добавляем его и закрываем скобку
-            expression += current_input + ')'
-            current_input = "0"
-        elif expression and expression[-1] == '(':
-            # Нельзя закрыть пустую скобку - ошибка
-            current_input = "Error"
-        else:
-            # Просто добавляем закрывающую скобку
-            expression += ')'
-
-def handle_shift():
-    """Переключает между базовым и научным режимом"""
-    global shift_mode, reset_on_next_input
-    shift_mode = not shift_mode  # Инвертируем режим
-    reset_on_next_input = False
-
-def handle_menu():
-    """Открывает/закрывает главное меню"""
-    global menu_mode, menu_position, reset_on_next_input
-    menu_mode = not menu_mode  # Инвертируем состояние меню
-    menu_position = 0  # Сбрасываем позицию в меню на первую
-    reset_on_next_input = False
-
-def handle_scientific_function(func):
-    """Обрабатывает научные функции (sin, cos, tan, log, и т.д.)"""
-    global current_input, reset_on_next_input, result, expression
-    
-    try:
-        # ОСОБАЯ ОБРАБОТКА ДЛЯ КОНСТАНТ pi и e
-        if func in ['pi', 'e']:
-            # Для констант создаем выражение вида "pi" или "e"
-            expression = func
-            if func == 'pi':
-                result = "3.14159265359"  # 13 знаков (укороченный pi)
-            elif func == 'e':
-                result = "2.71828182846"  # 12 знаков (укороченный e)
-            reset_on_next_input = True
-            current_input = "0"  # Сбрасываем ввод
-            return
-            
-        # Для остальных функций преобразуем текущий ввод в число
-        input_value = current_input
-        if current_input == "0" or current_input == "" or current_input == "-":
-            value = 0  # Если ввод пустой или "0", используем 0
-            input_value = "0"
-        else:
-            value = float(current_input)  # Преобразуем в число
-            
-        calculated_result = None  # Здесь будет результат вычисления
-        
-        # Создаем выражение для отображения в верхней строке
-        if func == 'sin':
-            expression = f"sin({input_value})"  # Синус угла в градусах
-            calculated_result = math.sin(math.radians(value))  # Переводим в радианы и вычисляем
-        elif func == 'cos':
-            expression = f"cos({input_value})"  # Косинус угла в градусах
-            calculated_result = math.cos(math.radians(value))
-        elif func == 'tan':
-            expression = f"tan({input_value})"  # Тангенс угла в градусах
-            calculated_result = math.tan(math.radians(value))
-        elif func == 'log':
-            expression = f"log({input_value})"  # Десятичный логарифм
-            calculated_result = math.log10(value) if value > 0 else float('nan')  # Только для положительных чисел
-        elif func == 'ln':
-            expression = f"ln({input_value})"  # Натуральный логарифм
-            calculated_result = math.log(value) if value > 0 else float('nan')  # Только для положительных чисел
-        elif func == 'sqrt':  # ИЗМЕНИЛИ 'sqr' на 'sqrt' для ясности
-            expression = f"sqrt({input_value})"  # Квадратный корень
-            calculated_result = math.sqrt(value) if value >= 0 else float('nan')  # Только для неотрицательных
-        elif func == '!':
-            expression = f"fact({input_value})"  # Факториал
-            # ДОБАВИЛИ ОГРАНИЧЕНИЕ: факториал только для целых чисел от 0 до 20
-            if value >= 0 and value == int(value) and value <= 20:
-                calculated_result = math.factorial(int(value))
-            else:
-                result = "Error"  # Ошибка для дробных, отрицательных или слишком больших чисел
-                return
-        elif func == '1/x':
-            expression = f"1/({input_value})"  # Обратная величина
-            if value != 0:
-                calculated_result = 1 / value
-            else:
-                result = "Error"  # Деление на ноль
-                return
-        elif func == 'x²':
-            expression = f"({input_value})²"  # Квадрат числа
-            calculated_result = value ** 2
-        elif func == 'x³':
-            expression = f"({input_value})³"  # Куб числа
-            calculated_result = value ** 3
-        elif func == '±':
-            expression = f"-({input_value})"  # Смена знака
-            calculated_result = -value
-        
-        # Если вычисление прошло успешно
-        if calculated_result is not None:
-            # Проверяем на NaN (Not a Number)
-            if calculated_result != calculated_result:  # Особенность NaN: он не равен самому себе
-                result = "Error"
-            else:
-                result = str(round_result(calculated_result))  # Округляем и преобразуем в строку
-            reset_on_next_input = True
-            current_input = "0"  # Сбрасываем ввод для следующей операции
-            
-    except Exception as e:
-        result = "Error"  # В случае любой ошибки
-        reset_on_next_input = False
-
-# ===== ОБРАБОТКА МЕНЮ =====
-def handle_about_navigation():
-    """Обрабатывает навигацию в режиме 'О программе'"""
-    global about_page, about_mode, last_nav_action
-    
-    current_time = time.ticks_ms()
-    # Защита от слишком быстрых нажатий (не чаще чем раз в 300 мс)
-    if time.ticks_diff(current_time, last_nav_action) > 300:
-        nav_keys = fast_scan_nav()  # Сканируем навигационные кнопки
-        if 'up' in nav_keys:
-            about_page = (about_page - 1) % len(about_pages)  # Предыдущая страница
-            last_nav_action = current_time
-        elif 'down' in nav_keys:
-            about_page = (about_page + 1) % len(about_pages)  # Следующая страница
-            last_nav_action = current_time
-        elif 'enter' in nav_keys:
-            about_mode = False  # Выход из режима "О программе"
-            last_nav_action = current_time
-
-def handle_menu_selection():
-    """Обрабатывает выбор пункта в главном меню"""
-    global menu_mode, about_mode, shift_mode, menu_position, about_page
-    
-    if menu_position == 0:
-        # "Basic Calc" - базовый режим калькулятора
-        shift_mode = False
-        menu_mode = False
-    elif menu_position == 1:
-        # "Scientific" - научный режим калькулятора
-        shift_mode = True
-        menu_mode = False
-    elif menu_position == 2:
-        # "Settings" - настройки (пока не реализовано)
-        menu_mode = False
-    elif menu_position == 3:
-        # "About" - информация о программе
-        about_mode = True
-        about_page = 0  # Начинаем с первой страницы
-
-def handle_key_events():
-    """Обрабатывает все события клавиатуры и навигации"""
-    global pressed_keys_history, pressed_nav_history, menu_position, last_nav_action
-    
-    # Получаем текущие нажатые клавиши
-    current_keys = set([key for _, _, key in stable_matrix_keys])
-    current_nav = set(stable_nav_keys)
-
-    # Находим новые нажатия (которые не были нажаты в предыдущем цикле)
-    new_key_presses = current_keys - pressed_keys_history
-
-    # Обработка в зависимости от текущего режима
-    if about_mode:
-        # Режим "О программе" - обрабатываем навигацию
-        handle_about_navigation()
-                
-    elif menu_mode:
-        # Режим меню - обрабатываем навигацию по меню
-        current_time = time.ticks_ms()
-        for nav in current_nav:
-            # Защита от слишком быстрых нажатий
-            if time.ticks_diff(current_time, last_nav_action) > 300:
-                if nav == 'up':
-                    menu_position = (menu_position - 1) % 4  # Вверх по меню
-                    last_nav_action = current_time
-                elif nav == 'down':
-                    menu_position = (menu_position + 1) % 4  # Вниз по меню
-                    last_nav_action = current_time
-                elif nav == 'enter':
-                    handle_menu_selection()  # Выбор текущего пункта
-                    last_nav_action = current_time
-                
-    else:
-        # ОСНОВНОЙ РЕЖИМ КАЛЬКУЛЯТОРА - обрабатываем нажатия клавиш
-        for key in new_key_presses:
-            if key in '0123456789':  # Цифры
-                handle_digit_input(key)
-            elif key == '.':  # Десятичная точка
-                handle_decimal_point()
-            elif key == 'C':  # Очистка
-                handle_clear()
-            elif key == 'BS':  # Backspace
-                handle_backspace()
-            elif key in ['+', '-', '*', '/']:  # Основные операции
-                handle_operation(key)
-            elif key == '=':  # Вычисление
-                handle_equals()
-            elif key == '%':  # Проценты (ТЕПЕРЬ ПРОСТАЯ РЕАЛИЗАЦИЯ)
-                handle_percent()
-            elif key == '^':  # Степень
-                handle_power()
-            elif key in ['(', ')']:  # Скобки
-                handle_parenthesis(key)
-            elif key == 'SHIFT':  # Переключение режима
-                handle_shift()
-            elif key == 'MENU':  # Открытие меню
-                handle_menu()
-            else:
-                # Все остальные клавиши - научные функции
-                handle_scientific_function(key)
-
-        # Обработка навигационных кнопок в основном режиме
-        for nav in stable_nav_keys:
-            if nav == 'enter':
-                handle_equals()  # ENTER работает как =
-
-    # Сохраняем текущее состояние для следующего цикла
-    pressed_keys_history = current_keys
-    pressed_nav_history = current_nav
-
-# ===== ТАЙМЕР =====
-def timer_irq(t):
-    """Прерывание таймера - устанавливает флаг сканирования"""
-    scan_flag[0] = 1
-
-def init_keyboard_timer():
-    """Инициализирует таймер для регулярного сканирования клавиатуры"""
-    keyboard_timer = Timer(0)  # Создаем таймер 0
-    keyboard_timer.init(period=50, mode=Timer.PERIODIC, callback=timer_irq)  # Период 50 мс
-    return keyboard_timer
-
-# ===== ГЛАВНАЯ ФУНКЦИЯ =====
-def main():
-    """Главная функция программы"""
-    global display_tick
-    
-    # Выводим информацию о версии при запуске
-    print("=" * 50)
-    print("CALCULATOR v7.1 - FIXED CONSTANTS DISPLAY")
-    print("=" * 50)
-    print("UI Improvements:")
-    print("- Shorter pi and e values for display") 
-    print("- pi: 3.14159265359 (13 chars)")
-    print("- e: 2.71828182846 (12 chars)") 
-    print("- Fits perfectly on screen")
-    print("=" * 50)
-    print("KEY IMPROVEMENTS:")
-    print("- Simple percent: x% = x/100")
-    print("- Factorial limited to 0-20")
-    print("- 'sqr' renamed to 'sqrt' for clarity")
-    print("=" * 50)
-    
-    # Инициализируем таймер клавиатуры
-    init_keyboard_timer()
-    # Первоначальное обновление дисплея
-    update_display()
-    
-    # Главный цикл программы
-    while True:
-        # Ждем флага сканирования от таймера
-        if scan_flag[0] == 0:
-            time.sleep_ms(1)  # Короткая пауза для экономии энергии
-            continue
-
-        scan_flag[0] = 0  # Сбрасываем флаг
-
-        try:
-            # Сканируем клавиатуру и навигационные кнопки
-            current_matrix = fast_scan_matrix()
-            current_nav = fast_scan_nav()
-            # Устраняем дребезг контактов
-            debounce_keys(current_matrix, current_nav)
-            # Обрабатываем события клавиш
-            handle_key_events()
-            
-            # Обновляем дисплей каждые 3 цикла (примерно 150 мс)
-            display_tick += 1
-            if display_tick >= 3:
-                update_display()
-                display_tick = 0
-                
-        except Exception as e:
-            print(f"Error: {e}")  # Выводим ошибки в консоль
-            time.sleep_ms(50)  # Защита от забивания консоли при бесконечных ошибках
-
-# Запуск программы при непосредственном выполнении файла
-if __name__ == "__main__":
-    main()
+# Парсер математических выражений для калькулятора
+# Токенизатор + разбор с приоритетами операций (алгоритм сортировочной станции).
+# Выражение компилируется в компактную постфиксную программу и затем
+# выполняется на стеке фиксированного размера. Без eval() и без модуля re.
+
+try:
+    from micropython import const  # На ESP32 константы встраиваются в байткод
+except ImportError:
+    def const(value):  # На компьютере (CPython) просто возвращаем значение
+        return value
+
+import math
+from lru import LRUCache
+from fixedpoint import FixedDecimal, PI_TEXT, E_TEXT
+from rational import Rational
+
+# ===== ОГРАНИЧЕНИЯ (ограниченное время и память на ESP32-S3) =====
+MAX_EXPR_LEN = const(256)  # Максимальная длина выражения в символах
+MAX_TOKENS = const(128)    # Максимальное количество токенов
+MAX_DEPTH = const(32)      # Максимальная вложенность скобок
+CACHE_ENTRIES = const(24)  # Кэш скомпилированных выражений: максимум записей
+CACHE_BYTES = const(6144)  # ... и максимум байт (оценка)
+MAX_POWI = const(16)       # x^n с целым n до 16 заменяется умножениями
+FACT_LIMIT = const(1000)   # Максимальный аргумент факториала (точное целое)
+MAX_INT_BITS = const(8704)  # Предел точных целых (1000! - 8530 бит): x² и x*y не растут без конца
+FACT_TABLE_SIZE = const(21)  # Таблица 0!..20! строится при импорте
+FACT_STEP = const(50)      # Шаг сохраняемых больших факториалов: 50!, 100!, ...
+FUNC_CACHE_ENTRIES = const(64)  # Кэш значений sin/cos/tan/log/ln и степеней
+FUNC_CACHE_BYTES = const(3072)  # ... и его объем в байтах (оценка)
+FUNC_ENTRY_SIZE = const(48)     # Оценка размера одной записи: ключ и float
+
+# ===== КОДЫ ОПЕРАЦИЙ ПОСТФИКСНОЙ ПРОГРАММЫ =====
+OP_PUSH = const(0)  # Положить следующую константу на стек
+OP_ADD = const(1)   # a + b
+OP_SUB = const(2)   # a - b
+OP_MUL = const(3)   # a * b
+OP_DIV = const(4)   # a / b
+OP_POW = const(5)   # a ^ b
+OP_NEG = const(6)   # -a (унарный минус)
+OP_DUP = const(7)   # Дублировать вершину стека (для x^n через умножения)
+OP_VAR = const(8)   # Положить значение переменной (x в графиках функций)
+OP_FUNC = const(16) # Коды от 16 и выше - вызов FUNC_TABLE[код - OP_FUNC]
+
+# ===== ТИПЫ ТОКЕНОВ =====
+T_NUM = const(0)   # Число
+T_OP = const(1)    # Бинарный оператор
+T_LPAR = const(2)  # Открывающая скобка
+T_RPAR = const(3)  # Закрывающая скобка
+T_FUNC = const(4)  # Имя функции (за ним обязательно идет скобка)
+T_POST = const(5)  # Постфиксная функция: 5!, 3², 2³
+T_VAR = const(6)   # Переменная (только в compile_function)
+
+# Бинарные операторы: символ -> (приоритет, код операции, правая ассоциативность)
+BINARY_OPS = {
+    '+': (1, OP_ADD, False),
+    '-': (1, OP_SUB, False),
+    '*': (2, OP_MUL, False),
+    '/': (2, OP_DIV, False),
+    '^': (4, OP_POW, True),  # 2^3^2 = 2^(3^2)
+}
+NEG_PRECEDENCE = const(3)  # Унарный минус: -2^2 = -(2^2), но -2*3 = (-2)*3
+LPAR_MARK = const(255)     # Отметка открывающей скобки в стеке операторов
+
+DIGITS = '0123456789'
+LETTERS = 'abcdefghijklmnopqrstuvwxyz'
+
+
+class CalcError(Exception):
+    """Ошибка разбора или вычисления выражения"""
+    pass
+
+
+# ===== ПРЕОБРАЗОВАНИЯ МЕЖДУ РЕЖИМАМИ ЧИСЕЛ =====
+def _to_float(x):
+    """Значение числа любого режима в виде float"""
+    if isinstance(x, (FixedDecimal, Rational)):
+        return x.to_float()
+    return x
+
+
+def _like(x, value):
+    """Возвращает float-значение value в том же режиме, что и аргумент x.
+    Для дробей результат остается float: иррациональные числа неточны."""
+    return FixedDecimal.from_float(value) if isinstance(x, FixedDecimal) else value
+
+
+INT_LIMIT = 1 << MAX_INT_BITS
+
+
+def _check_int(value):
+    """Проверяет, что точное целое (факториал и его произведения) не вышло за MAX_INT_BITS"""
+    if type(value) is int and (value > INT_LIMIT or -value > INT_LIMIT):
+        raise CalcError("number too large")
+    return value
+
+
+def _int_value(x):
+    """Целое значение числа или None, если число дробное"""
+    if isinstance(x, (FixedDecimal, Rational)):
+        return x.to_int()
+    return int(x) if x == int(x) else None
+
+
+# ===== ТАБЛИЦЫ И КЭШ ДЛЯ НАУЧНЫХ ФУНКЦИЙ =====
+# Факториалы 0!..20! считаются один раз при импорте. Большие факториалы
+# досчитываются от ближайшего сохраненного значения, каждый FACT_STEP-й
+# запоминается. Значения sin/cos/tan/log/ln и float-степеней хранятся в
+# LRU-кэше по значению аргумента, общем для клавиш и для выражений.
+_fact_table = [1] * FACT_TABLE_SIZE
+for _i in range(2, FACT_TABLE_SIZE):
+    _fact_table[_i] = _fact_table[_i - 1] * _i
+_fact_saved = {FACT_TABLE_SIZE - 1: _fact_table[-1]}  # n -> n! для n кратных FACT_STEP
+_fact_top = FACT_TABLE_SIZE - 1  # Самый большой сохраненный аргумент
+
+_func_cache = LRUCache(FUNC_CACHE_ENTRIES, FUNC_CACHE_BYTES)
+
+
+def factorial(n):
+    """Точный факториал целого 0 <= n <= FACT_LIMIT (из таблицы или досчетом)"""
+    global _fact_top
+    if n < FACT_TABLE_SIZE:
+        return _fact_table[n]
+    if n >= _fact_top:
+        start = _fact_top
+    else:
+        start = max(FACT_TABLE_SIZE - 1, n - n % FACT_STEP)  # Ближайшее сохраненное снизу
+    value = _fact_saved[start]
+    for i in range(start + 1, n + 1):
+        value *= i
+        if i % FACT_STEP == 0 and i not in _fact_saved:
+            _fact_saved[i] = value
+            if i > _fact_top:
+                _fact_top = i
+    return value
+
+
+def _memo(name, func, x):
+    """Значение float-функции func(x) из кэша или с вычислением и сохранением"""
+    key = (name, x)
+    value = _func_cache.get(key)
+    if value is None:
+        value = func(x)
+        _func_cache.put(key, value, FUNC_ENTRY_SIZE)
+    return value
+
+
+def func_cache_clear():
+    """Очищает кэш значений функций и его счетчики"""
+    _func_cache.clear()
+
+
+def func_cache_stats():
+    """Статистика кэша значений функций: записи, байты, попадания, промахи"""
+    return _func_cache.stats()
+
+
+# ===== НАУЧНЫЕ ФУНКЦИИ =====
+# Тригонометрия работает в градусах, как на клавиатуре калькулятора.
+# Трансцендентные функции в десятичном режиме считаются через float.
+def _sin_deg(x):
+    return math.sin(math.radians(x))
+
+
+def _cos_deg(x):
+    return math.cos(math.radians(x))
+
+
+def _tan_deg(x):
+    return math.tan(math.radians(x))
+
+
+def _sin(x):
+    return _like(x, _memo('sin', _sin_deg, _to_float(x)))
+
+
+def _cos(x):
+    return _like(x, _memo('cos', _cos_deg, _to_float(x)))
+
+
+def _tan(x):
+    return _like(x, _memo('tan', _tan_deg, _to_float(x)))
+
+
+def _log(x):
+    if x <= 0:
+        raise CalcError("log of non-positive")  # Только для положительных чисел
+    return _like(x, _memo('log', math.log10, _to_float(x)))
+
+
+def _ln(x):
+    if x <= 0:
+        raise CalcError("ln of non-positive")
+    return _like(x, _memo('ln', math.log, _to_float(x)))
+
+
+def _sqrt(x):
+    if x < 0:
+        raise CalcError("sqrt of negative")  # Только для неотрицательных
+    if isinstance(x, (FixedDecimal, Rational)):
+        return x.sqrt()  # Корень с полной точностью режима
+    return math.sqrt(x)
+
+
+def _fact(x):
+    # Факториал только для целых неотрицательных чисел (точное целое до FACT_LIMIT)
+    n = _int_value(x)
+    if n is None or n < 0 or n > FACT_LIMIT:
+        raise CalcError("bad factorial")
+    value = factorial(n)
+    if isinstance(x, FixedDecimal):
+        return FixedDecimal.from_int(value)  # Больше MAX_INT_DIGITS цифр - ошибка
+    if isinstance(x, Rational):
+        return Rational.from_int(value)  # Точная дробь или float, если слишком велико
+    return value
+
+
+def _sqr(x):
+    return _check_int(x * x)
+
+
+def _cube(x):
+    return _check_int(_check_int(x * x) * x)
+
+
+# Таблица функций строится один раз при импорте: имя -> код операции.
+# Выполнение вызывает функцию по индексу, без цепочки сравнений строк.
+# Третий столбец - float-версия для пакетного счета графиков: без кэша
+# значений (128 разных x только вытеснили бы из него полезные записи).
+FUNCTIONS = (
+    ('sin', _sin, _sin_deg),
+    ('cos', _cos, _cos_deg),
+    ('tan', _tan, _tan_deg),
+    ('log', _log, math.log10),
+    ('ln', _ln, math.log),
+    ('sqrt', _sqrt, math.sqrt),
+    ('fact', _fact, _fact),
+    ('sqr', _sqr, _sqr),
+    ('cube', _cube, _cube),
+)
+FUNC_TABLE = tuple(func for _, func, _ in FUNCTIONS)
+BATCH_TABLE = tuple(func for _, _, func in FUNCTIONS)
+FUNC_CODES = dict((name, OP_FUNC + i) for i, (name, _, _) in enumerate(FUNCTIONS))
+# Постфиксные обозначения: 5! = fact(5), 3² = sqr(3), 2³ = cube(2)
+POSTFIX_CODES = {'!': FUNC_CODES['fact'], '²': FUNC_CODES['sqr'], '³': FUNC_CODES['cube']}
+CONSTANTS = {'pi': math.pi, 'e': math.e}
+
+# ===== РЕЖИМЫ ЧИСЕЛ =====
+# FLOAT - обычные float, DECxx - десятичная фиксированная точка на целых,
+# FRAC - точные дроби (с переходом на float при слишком больших числах)
+NUMBER_MODES = ('FLOAT', 'DEC16', 'DEC32', 'DEC64', 'FRAC')
+DECIMAL_DIGITS = {'DEC16': 16, 'DEC32': 32, 'DEC64': 64}
+
+_number_mode = 'FLOAT'  # Текущий режим
+_make_number = float    # Текст числа -> значение в текущем режиме
+_constants = CONSTANTS  # pi и e в текущем режиме
+
+
+class Program:
+    """Скомпилированное выражение: байткод, константы и нужная глубина стека"""
+    __slots__ = ('codes', 'consts', 'depth')
+
+    def __init__(self, codes, consts, depth):
+        self.codes = codes    # bytearray с кодами операций
+        self.consts = consts  # tuple с числами для OP_PUSH (по порядку)
+        self.depth = depth    # Максимальная глубина стека при выполнении
+
+
+# ===== ТОКЕНИЗАТОР =====
+def _scan_number(text, i, n, make=None):
+    """Читает число, начиная с позиции i. Возвращает (значение, новая позиция).
+    make - функция текст -> число (по умолчанию текущий режим чисел)"""
+    start = i
+    while i < n and text[i] in DIGITS:
+        i += 1
+    if i < n and text[i] == '.':
+        i += 1
+        while i < n and text[i] in DIGITS:
+            i += 1
+    if i - start == 1 and text[start] == '.':
+        raise CalcError("lonely point")
+    # Экспонента вида 1e-05 (так round_result форматирует очень малые числа)
+    if i < n and text[i] in 'eE':
+        j = i + 1
+        if j < n and text[j] in '+-':
+            j += 1
+        if j < n and text[j] in DIGITS:
+            while j < n and text[j] in DIGITS:
+                j += 1
+            i = j
+    return (make or _make_number)(text[start:i]), i
+
+
+def tokenize(text, variable=None, floats=False):
+    """Разбивает строку выражения на список токенов (тип, значение).
+    variable - имя переменной (для графиков), floats - числа всегда float"""
+    make = float if floats else _make_number
+    constants = CONSTANTS if floats else _constants
+    n = len(text)
+    if n > MAX_EXPR_LEN:
+        raise CalcError("expression too long")
+    tokens = []
+    i = 0
+    while i < n:
+        ch = text[i]
+        if ch == ' ':
+            i += 1
+            continue
+        if ch in DIGITS or ch == '.':
+            value, i = _scan_number(text, i, n, make)
+            tokens.append((T_NUM, value))
+        elif ch in LETTERS:
+            start = i
+            while i < n and text[i] in LETTERS:
+                i += 1
+            name = text[start:i]
+            if name == variable:
+                tokens.append((T_VAR, 0))
+            elif name in constants:
+                tokens.append((T_NUM, constants[name]))
+            elif name in FUNC_CODES:
+                tokens.append((T_FUNC, FUNC_CODES[name]))
+            else:
+                raise CalcError("unknown name")
+        else:
+            if ch in BINARY_OPS:
+                tokens.append((T_OP, ch))
+            elif ch == '(':
+                tokens.append((T_LPAR, ch))
+            elif ch == ')':
+                tokens.append((T_RPAR, ch))
+            elif ch in POSTFIX_CODES:
+                tokens.append((T_POST, POSTFIX_CODES[ch]))
+            else:
+                raise CalcError("bad symbol")
+            i += 1
+        if len(tokens) > MAX_TOKENS:
+            raise CalcError("too many tokens")
+    return tokens
+
+
+# ===== КОМПИЛЯТОР (сортировочная станция -> постфиксная запись) =====
+def _emit_op(code, codes, depth):
+    """Добавляет операцию в программу и пересчитывает глубину стека"""
+    codes.append(code)
+    if code != OP_NEG and code < OP_FUNC:
+        depth -= 1  # Бинарная операция снимает два значения и кладет одно
+    return depth
+
+
+def compile_tokens(tokens):
+    """Компилирует список токенов в постфиксную программу"""
+    codes = bytearray()
+    consts = []
+    ops = []             # Стек операторов: (приоритет, код, правая ассоциативность)
+    depth = 0            # Текущая глубина стека значений
+    max_depth = 0
+    parens = 0           # Текущая вложенность скобок
+    expect_operand = True
+    func = 0             # Функция, ожидающая открывающую скобку
+
+    for kind, value in tokens:
+        if func and kind != T_LPAR:
+            raise CalcError("( expected after function")
+        if expect_operand:
+            if kind == T_NUM:
+                codes.append(OP_PUSH)
+                consts.append(value)
+                depth += 1
+                if depth > max_depth:
+                    max_depth = depth
+                expect_operand = False
+            elif kind == T_VAR:
+                codes.append(OP_VAR)
+                depth += 1
+                if depth > max_depth:
+                    max_depth = depth
+                expect_operand = False
+            elif kind == T_LPAR:
+                parens += 1
+                if parens > MAX_DEPTH:
+                    raise CalcError("too deep")
+                # Скобка функции помнит код функции и вызывает ее при закрытии
+                ops.append((LPAR_MARK, func, False))
+                func = 0
+            elif kind == T_FUNC:
+                func = value
+            elif kind == T_OP and value == '-':
+                # Унарный минус - префиксный оператор, ничего не выталкивает
+                ops.append((NEG_PRECEDENCE, OP_NEG, True))
+            elif kind == T_OP and value == '+':
+                pass  # Унарный плюс ничего не делает
+            else:
+                raise CalcError("operand expected")
+        else:
+            if kind == T_OP:
+                prec, code, right = BINARY_OPS[value]
+                # Выталкиваем операторы с большим приоритетом (или равным для левых)
+                while ops:
+                    top_prec = ops[-1][0]
+                    if top_prec == LPAR_MARK:
+                        break
+                    if top_prec > prec or (top_prec == prec and not right):
+                        depth = _emit_op(ops.pop()[1], codes, depth)
+                    else:
+                        break
+                ops.append((prec, code, right))
+                expect_operand = True
+            elif kind == T_RPAR:
+                while ops and ops[-1][0] != LPAR_MARK:
+                    depth = _emit_op(ops.pop()[1], codes, depth)
+                if not ops:
+                    raise CalcError("unbalanced )")
+                code = ops.pop()[1]  # Убираем открывающую скобку
+                if code:
+                    codes.append(code)  # sin(...) - вызов функции
+                parens -= 1
+            elif kind == T_POST:
+                codes.append(value)  # Постфиксная функция применяется сразу
+            else:
+                raise CalcError("operator expected")
+
+    if expect_operand:
+        raise CalcError("incomplete expression")
+    # Незакрытые скобки закрываем автоматически, как на обычном калькуляторе
+    while ops:
+        prec, code, _ = ops.pop()
+        if prec != LPAR_MARK or code:
+            depth = _emit_op(code, codes, depth)
+
+    return Program(codes, tuple(consts), max_depth)
+
+
+def compile_expression(text, optimize=True):
+    """Компилирует строку выражения в постфиксную программу"""
+    program = compile_tokens(tokenize(text))
+    if optimize:
+        program = optimize_program(program)
+    return program
+
+
+def compile_function(text, variable='x'):
+    """Компилирует выражение с переменной (например, "sin(x)*x") в float-программу
+    для run_batch. Числа всегда float, независимо от режима чисел.
+    CalcError - если константа (например, свернутый fact(200)) не помещается во float"""
+    program = optimize_program(compile_tokens(tokenize(normalize_expression(text), variable, True)))
+    try:
+        program.consts = tuple(float(value) for value in program.consts)
+    except OverflowError:
+        raise CalcError("constant out of float range")
+    return program
+
+
+# ===== ОПТИМИЗАЦИЯ ПРОГРАММЫ =====
+# Проход по постфиксной программе с символьным стеком: для каждого значения
+# на стеке помним, где начинается его код и константа ли это.
+def node_count(program):
+    """Количество узлов (операций) в программе"""
+    return len(program.codes)
+
+
+def _is_const(span, value):
+    """Проверяет, что операнд - константа с заданным значением"""
+    return span[1] and span[2] == value
+
+
+def _emit_powi(n, out):
+    """Добавляет x^n как цепочку DUP/MUL (возведение через квадраты)"""
+    if n == 1:
+        return
+    if n % 2 == 0:
+        _emit_powi(n // 2, out)
+        out.append((OP_DUP, 0))
+        out.append((OP_MUL, 0))
+    else:
+        out.append((OP_DUP, 0))
+        _emit_powi(n - 1, out)
+        out.append((OP_MUL, 0))
+
+
+def optimize_program(program):
+    """Сворачивает константы и упрощает x*1, x+0, x^1, x^n -> умножения"""
+    out = []    # Новая программа: список (код, константа)
+    spans = []  # Символьный стек: (начало кода в out, константа?, значение)
+    consts = program.consts
+    ci = 0
+    for code in program.codes:
+        if code == OP_PUSH:
+            value = consts[ci]
+            ci += 1
+            spans.append((len(out), True, value))
+            out.append((OP_PUSH, value))
+            continue
+        if code == OP_VAR:
+            spans.append((len(out), False, 0))
+            out.append((OP_VAR, 0))
+            continue
+        if code == OP_NEG or code >= OP_FUNC:
+            start, is_const, value = spans.pop()
+            if is_const:
+                try:
+                    value = _check_result(_apply_unary(code, value))
+                except (CalcError, ZeroDivisionError, OverflowError, ValueError):
+                    is_const = False  # Ошибку оставляем на время выполнения
+            if is_const:
+                out[start] = (OP_PUSH, value)
+                spans.append((start, True, value))
+                continue
+            if code == OP_NEG and out[-1][0] == OP_NEG:
+                out.pop()  # -(-x) = x
+            else:
+                out.append((code, 0))
+            spans.append((start, False, 0))
+            continue
+
+        b = spans.pop()
+        a = spans.pop()
+        start = a[0]
+        failed = False  # Обе части - константы, но свернуть не удалось
+        if a[1] and b[1]:
+            # Обе части - константы: вычисляем при компиляции
+            try:
+                value = _check_result(_apply_binary(code, a[2], b[2]))
+            except (CalcError, ZeroDivisionError, OverflowError, ValueError):
+                value = None  # Ошибку оставляем на время выполнения
+            if value is not None:
+                del out[start:]
+                out.append((OP_PUSH, value))
+                spans.append((start, True, value))
+                continue
+            failed = True
+        if failed:
+            out.append((code, 0))  # Ошибка повторится при выполнении как есть
+        elif (_is_const(b, 1) and code in (OP_MUL, OP_DIV, OP_POW)) or \
+                (_is_const(b, 0) and code in (OP_ADD, OP_SUB)):
+            del out[b[0]:]  # x*1, x/1, x^1, x+0, x-0 -> x
+        elif (_is_const(a, 1) and code == OP_MUL) or (_is_const(a, 0) and code == OP_ADD):
+            del out[start]  # 1*x, 0+x -> x
+        elif code == OP_POW and b[1] and 2 <= (_int_value(b[2]) or 0) <= MAX_POWI:
+            del out[b[0]:]  # x^n -> x*x*...*x
+            _emit_powi(_int_value(b[2]), out)
+        else:
+            out.append((code, 0))
+        spans.append((start, False, 0))
+
+    return _pack_program(out)
+
+
+def _pack_program(items):
+    """Собирает Program из списка (код, константа), считая глубину стека"""
+    codes = bytearray(len(items))
+    consts = []
+    depth = 0
+    max_depth = 0
+    for i, (code, value) in enumerate(items):
+        codes[i] = code
+        if code == OP_PUSH or code == OP_DUP or code == OP_VAR:
+            if code == OP_PUSH:
+                consts.append(value)
+            depth += 1
+            if depth > max_depth:
+                max_depth = depth
+        elif code != OP_NEG and code < OP_FUNC:
+            depth -= 1
+    return Program(codes, tuple(consts), max_depth)
+
+
+# ===== ВЫПОЛНЕНИЕ ПРОГРАММЫ =====
+def run_program(program):
+    """Выполняет постфиксную программу на стеке фиксированного размера"""
+    stack = [0.0] * program.depth  # Память выделяется один раз
+    consts = program.consts
+    sp = 0  # Указатель стека
+    ci = 0  # Индекс следующей константы
+    for code in program.codes:
+        if code == OP_PUSH:
+            stack[sp] = consts[ci]
+            ci += 1
+            sp += 1
+        elif code == OP_NEG:
+            stack[sp - 1] = -stack[sp - 1]
+        elif code >= OP_FUNC:
+            stack[sp - 1] = FUNC_TABLE[code - OP_FUNC](stack[sp - 1])
+        elif code == OP_DUP:
+            stack[sp] = stack[sp - 1]
+            sp += 1
+        else:
+            sp -= 1
+            b = stack[sp]
+            a = stack[sp - 1]
+            if code == OP_ADD:
+                a = a + b
+            elif code == OP_SUB:
+                a = a - b
+            elif code == OP_MUL:
+                a = a * b
+                if type(a) is int:
+                    _check_int(a)  # Точные целые от факториала
+            else:
+                a = _apply_binary(code, a, b)  # Деление и степень с проверками
+            stack[sp - 1] = a
+    return stack[0]
+
+
+def run_batch(program, xs):
+    """Выполняет программу с переменной сразу для всех значений xs.
+    Байткод проходится один раз, каждая операция обрабатывает весь столбец
+    значений. Возвращает список float; там, где значения нет (деление на
+    ноль, логарифм отрицательного числа), - nan."""
+    n = len(xs)
+    nan = float('nan')
+    columns = [[0.0] * n for _ in range(program.depth)]  # Стек столбцов
+    consts = program.consts
+    sp = 0
+    ci = 0
+    for code in program.codes:
+        if code == OP_PUSH:
+            value = consts[ci]  # compile_function уже привел константы к float
+            ci += 1
+            col = columns[sp]
+            for i in range(n):
+                col[i] = value
+            sp += 1
+        elif code == OP_VAR:
+            columns[sp][:] = xs
+            sp += 1
+        elif code == OP_DUP:
+            columns[sp][:] = columns[sp - 1]
+            sp += 1
+        elif code == OP_NEG:
+            col = columns[sp - 1]
+            for i in range(n):
+                col[i] = -col[i]
+        elif code >= OP_FUNC:
+            func = BATCH_TABLE[code - OP_FUNC]
+            col = columns[sp - 1]
+            for i in range(n):
+                try:
+                    col[i] = float(func(col[i]))
+                except (CalcError, ValueError, OverflowError, ZeroDivisionError):
+                    col[i] = nan  # Точка вне области определения
+        else:
+            sp -= 1
+            a = columns[sp - 1]
+            b = columns[sp]
+            # Сложение, вычитание и умножение float не бросают исключений:
+            # nan и бесконечности просто переходят в результат
+            if code == OP_ADD:
+                for i in range(n):
+                    a[i] = a[i] + b[i]
+            elif code == OP_SUB:
+                for i in range(n):
+                    a[i] = a[i] - b[i]
+            elif code == OP_MUL:
+                for i in range(n):
+                    a[i] = a[i] * b[i]
+            elif code == OP_DIV:
+                for i in range(n):
+                    a[i] = a[i] / b[i] if b[i] != 0 else nan
+            else:
+                for i in range(n):
+                    a[i] = _batch_power(a[i], b[i], nan)
+    return columns[0]
+
+
+def _batch_power(a, b, nan):
+    """Float-степень для run_batch: nan вместо ошибки или комплексного числа"""
+    try:
+        if a < 0 and b != int(b):
+            return nan
+        return a ** b
+    except (ValueError, OverflowError, ZeroDivisionError):
+        return nan
+
+
+def _apply_unary(code, a):
+    """Выполняет унарную операцию: минус или функцию из таблицы"""
+    if code == OP_NEG:
+        return -a
+    return FUNC_TABLE[code - OP_FUNC](a)
+
+
+def _apply_binary(code, a, b):
+    """Выполняет одну бинарную операцию"""
+    if code == OP_ADD:
+        return a + b
+    if code == OP_SUB:
+        return a - b
+    if code == OP_MUL:
+        return _check_int(a * b)
+    if code == OP_DIV:
+        if b == 0:
+            raise CalcError("division by zero")
+        return a / b
+    return _power(a, b)
+
+
+def _power(a, b):
+    """Возведение в степень только для вещественных результатов"""
+    if isinstance(a, FixedDecimal):
+        return _decimal_power(a, b)
+    if isinstance(a, Rational) and _int_value(b) is not None:
+        if a == 0 and b < 0:
+            raise CalcError("division by zero")
+        return a.power(_int_value(b))  # Целая степень дроби - точно
+    a = _to_float(a)
+    b = _to_float(b)
+    if a < 0 and b != int(b):
+        raise CalcError("complex result")  # (-8)^0.5 - комплексное число
+    if a == 0 and b < 0:
+        raise CalcError("division by zero")
+    return _memo_power(float(a), b)  # Float-степень всегда вычисляется за ограниченное время
+
+
+def _float_power(ab):
+    return ab[0] ** ab[1]
+
+
+def _memo_power(a, b):
+    """a ** b через общий кэш значений функций"""
+    return _memo('^', _float_power, (a, b))
+
+
+def _decimal_power(a, b):
+    """Степень в десятичном режиме: целая - точно, дробная - через float"""
+    n = _int_value(b)
+    if n is not None:
+        if a == 0 and n < 0:
+            raise CalcError("division by zero")
+        return a.power(n)
+    if a < 0:
+        raise CalcError("complex result")
+    return FixedDecimal.from_float(a.to_float() ** b.to_float())
+
+
+def _check_result(value):
+    """Проверяет, что результат - конечное число"""
+    if isinstance(value, float) and (value != value or value in (float('inf'), float('-inf'))):
+        raise CalcError("not finite")
+    return value
+
+
+def set_number_mode(mode):
+    """Переключает режим чисел (один из NUMBER_MODES)"""
+    global _number_mode, _make_number, _constants
+    if mode == 'FLOAT':
+        _make_number = float
+        _constants = CONSTANTS
+    elif mode in DECIMAL_DIGITS:
+        FixedDecimal.set_precision(DECIMAL_DIGITS[mode])
+        _make_number = FixedDecimal.from_text
+        _constants = {'pi': FixedDecimal.from_text(PI_TEXT), 'e': FixedDecimal.from_text(E_TEXT)}
+    elif mode == 'FRAC':
+        _make_number = Rational.from_text
+        _constants = CONSTANTS  # pi и e иррациональны - остаются float
+    else:
+        raise ValueError("unknown number mode")
+    _number_mode = mode
+    _cache.clear()  # Значения в кэше посчитаны в старом режиме
+
+
+def get_number_mode():
+    """Текущий режим чисел"""
+    return _number_mode
+
+
+# ===== КЭШ СКОМПИЛИРОВАННЫХ ВЫРАЖЕНИЙ =====
+# Повторное нажатие "=" или ENTER на том же выражении не разбирает его заново:
+# нормализованный текст -> (программа, итоговое значение)
+_cache = LRUCache(CACHE_ENTRIES, CACHE_BYTES)
+
+
+def normalize_expression(text):
+    """Приводит текст выражения к ключу кэша (без пробелов)"""
+    if ' ' in text:
+        text = text.replace(' ', '')
+    return text
+
+
+def _entry_size(key, program):
+    """Грубая оценка памяти, занимаемой записью кэша, в байтах"""
+    size = 48 + len(key)  # Кортеж записи и строка ключа
+    if program is not None:
+        size += 32 + len(program.codes) + 8 * len(program.consts)
+    return size
+
+
+def cache_configure(max_entries=None, max_bytes=None):
+    """Меняет лимиты кэша выражений по количеству записей и байтам"""
+    _cache.configure(max_entries, max_bytes)
+
+
+def cache_clear():
+    """Очищает кэш выражений и счетчики попаданий"""
+    _cache.clear()
+
+
+def cache_stats():
+    """Статистика кэша: записи, байты, попадания, промахи"""
+    return _cache.stats()
+
+
+def evaluate_expression(text):
+    """Вычисляет выражение. Возвращает число или строку "Error" при ошибке"""
+    key = normalize_expression(text)
+    entry = _cache.get(key)
+    if entry is not None:
+        return entry[1]  # O(1): выражение уже вычислялось
+
+    program = None
+    try:
+        program = compile_expression(key)
+        value = _check_result(run_program(program))
+    except (CalcError, ZeroDivisionError, OverflowError, ValueError, MemoryError):
+        value = "Error"  # Ошибки тоже кэшируем - результат не изменится
+    _cache.put(key, (program, value), _entry_size(key, program))
+    return value
+
+
+# ===== ИНКРЕМЕНТАЛЬНЫЙ РАЗБОР (предварительный результат при вводе) =====
+class LiveParser:
+    """Разбирает выражение посимвольно по мере ввода и умеет откатывать символы.
+
+    Операторы сворачиваются сразу, как только позволяет приоритет, поэтому
+    добавление символа стоит O(1) (амортизированно), а предварительный
+    результат считается только по несвернутому хвосту стеков.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """Сбрасывает состояние к пустому выражению"""
+        self._chars = []      # Уже разобранные символы
+        self._head = ""       # Начало текста из последнего sync()
+        self._tail = ""       # Хвост текста из последнего sync()
+        self._vals = []       # Стек значений
+        self._ops = []        # Стек операторов (как в compile_tokens)
+        self._num = ""        # Число, которое сейчас вводится
+        self._word = ""       # Имя функции или константы, которое сейчас вводится
+        self._expect = True   # Ожидается операнд (а не оператор)
+        self._parens = 0      # Текущая вложенность скобок
+        self._journal = []    # Записи для отката каждого символа
+        self._bad = 0         # Сколько символов введено после ошибки
+
+    @property
+    def text(self):
+        """Уже разобранный текст"""
+        return "".join(self._chars)
+
+    def sync(self, head, tail=""):
+        """Приводит состояние к тексту head + tail, откатывая и добавляя только
+        разницу. Пока head - тот же объект строки, что в прошлый раз, сравнивается
+        только короткий tail (вводимое число), без прохода по всему выражению"""
+        if head is self._head and len(self._chars) == len(head) + len(self._tail):
+            start = len(head)
+            old = self._tail
+            self._tail = tail
+        else:
+            start = 0
+            old = self.text
+            self._head = head
+            self._tail = tail
+            tail = head + tail
+        if tail == old:
+            return
+        # Общее начало старого и нового текста
+        if tail.startswith(old):
+            common = len(old)
+        else:
+            common = 0
+            limit = min(len(old), len(tail))
+            while common < limit and old[common] == tail[common]:
+                common += 1
+        chars = self._chars
+        while len(chars) > start + common:
+            self.pop()
+        for i in range(len(chars) - start, len(tail)):
+            self.push(tail[i])
+
+    def push(self, ch):
+        """Добавляет один символ выражения"""
+        self._chars.append(ch)
+        if self._bad:
+            self._bad += 1
+            return
+        num = self._num
+        word = self._word
+        if ch in DIGITS or ch == '.' or (num and self._in_exponent(ch)):
+            if word or (not self._expect and not num):
+                self._bad = 1  # Число сразу после ")" или имени - ошибка
+                return
+            if ch == '.' and ('.' in num or 'e' in num or 'E' in num):
+                self._bad = 1  # Вторая точка или точка в экспоненте - как в _scan_number
+                return
+            self._num = num + ch
+            self._journal.append(None)  # Откат цифры - просто укоротить _num
+            return
+        if ch in LETTERS:
+            if num or not self._expect:
+                self._bad = 1  # Имя сразу после числа - ошибка
+                return
+            self._word = word + ch
+            self._journal.append(True)  # Откат буквы - укоротить _word
+            return
+
+        vals = self._vals
+        ops = self._ops
+        # Запись отката: (число, имя, ожидание, скобки, граница значений,
+        # снятые значения, граница операторов, снятые операторы)
+        record = [num, word, self._expect, self._parens, len(vals), [], len(ops), []]
+        try:
+            if num:
+                vals.append(_scan_number(num, 0, len(num))[0])
+                self._num = ""
+                self._expect = False
+            if word:
+                self._word = ""
+                if word in _constants:
+                    vals.append(_constants[word])
+                    self._expect = False
+                elif word in FUNC_CODES and ch == '(':
+                    self._open(FUNC_CODES[word])
+                    self._journal.append(record)
+                    return
+                else:
+                    raise CalcError("unknown name")
+            self._apply_symbol(ch, record)
+        except (CalcError, ZeroDivisionError, OverflowError, ValueError, KeyError):
+            self._rollback(record)
+            self._bad = 1
+            return
+        self._journal.append(record)
+
+    def _in_exponent(self, ch):
+        """Проверяет, продолжает ли символ экспоненту числа (1e-05)"""
+        num = self._num
+        if ch in 'eE':
+            return 'e' not in num and 'E' not in num and num != '.'
+        return ch in '+-' and num[-1] in 'eE'
+
+    def _pop_val(self, record):
+        """Снимает значение со стека, запоминая исходные значения для отката"""
+        vals = self._vals
+        value = vals.pop()
+        if len(vals) < record[4]:
+            record[4] = len(vals)
+            record[5].append(value)
+        return value
+
+    def _pop_op(self, record):
+        """Снимает оператор со стека, запоминая исходные операторы для отката"""
+        ops = self._ops
+        op = ops.pop()
+        if len(ops) < record[6]:
+            record[6] = len(ops)
+            record[7].append(op)
+        return op
+
+    def _open(self, func):
+        """Открывает скобку (func - код функции или 0 для обычной скобки)"""
+        if self._parens >= MAX_DEPTH:
+            raise CalcError("too deep")
+        self._parens += 1
+        self._ops.append((LPAR_MARK, func, False))
+
+    def _reduce(self, record):
+        """Применяет верхний оператор стека к значениям"""
+        code = self._pop_op(record)[1]
+        if code == OP_NEG:
+            self._vals.append(-self._pop_val(record))
+        else:
+            b = self._pop_val(record)
+            a = self._pop_val(record)
+            self._vals.append(_apply_binary(code, a, b))
+
+    def _apply_symbol(self, ch, record):
+        """Обрабатывает оператор или скобку (логика как в compile_tokens)"""
+        ops = self._ops
+        if self._expect:
+            if ch == '(':
+                self._open(0)
+            elif ch == '-':
+                ops.append((NEG_PRECEDENCE, OP_NEG, True))
+            elif ch != '+':
+                raise CalcError("operand expected")
+        elif ch == ')':
+            while ops and ops[-1][0] != LPAR_MARK:
+                self._reduce(record)
+            if not ops:
+                raise CalcError("unbalanced )")
+            code = self._pop_op(record)[1]
+            if code:
+                self._vals.append(_apply_unary(code, self._pop_val(record)))
+            self._parens -= 1
+        elif ch in POSTFIX_CODES:
+            code = POSTFIX_CODES[ch]
+            self._vals.append(_apply_unary(code, self._pop_val(record)))
+        else:
+            prec, code, right = BINARY_OPS[ch]
+            while ops:
+                top_prec = ops[-1][0]
+                if top_prec == LPAR_MARK:
+                    break
+                if top_prec > prec or (top_prec == prec and not right):
+                    self._reduce(record)
+                else:
+                    break
+            ops.append((prec, code, right))
+            self._expect = True
+
+    def _rollback(self, record):
+        """Возвращает стеки в состояние до символа по записи отката"""
+        num, word, expect, parens, val_mark, vals_removed, op_mark, ops_removed = record
+        del self._vals[val_mark:]
+        while vals_removed:
+            self._vals.append(vals_removed.pop())
+        del self._ops[op_mark:]
+        while ops_removed:
+            self._ops.append(ops_removed.pop())
+        self._num = num
+        self._word = word
+        self._expect = expect
+        self._parens = parens
+
+    def pop(self):
+        """Откатывает последний введенный символ (для Backspace)"""
+        if not self._chars:
+            return
+        self._chars.pop()
+        if self._bad:
+            self._bad -= 1
+            return
+        record = self._journal.pop()
+        if record is None:
+            self._num = self._num[:-1]
+        elif record is True:
+            self._word = self._word[:-1]
+        else:
+            self._rollback(record)
+
+    def value(self):
+        """Предварительный результат или None, если его пока нельзя посчитать"""
+        if self._bad:
+            return None
+        stack = self._vals[:]
+        num = self._num
+        if num:
+            try:
+                stack.append(_scan_number(num, 0, len(num))[0])
+            except (CalcError, ValueError, OverflowError):
+                num = ""  # Незаконченная экспонента "1e" - игнорируем
+        if self._word:
+            if self._word not in _constants:
+                return None  # Имя функции без скобки или переменная x - значения нет
+            num = self._word
+            stack.append(_constants[num])
+        ops = self._ops
+        i = len(ops) - 1
+        if self._expect and not num:
+            # Выражение кончается оператором ("2+3*"): отбрасываем хвост
+            while i >= 0 and ops[i][0] in (LPAR_MARK, NEG_PRECEDENCE):
+                i -= 1
+            i -= 1  # Бинарный оператор, ожидающий правый операнд
+        if not stack:
+            return None
+        try:
+            while i >= 0:
+                code = ops[i][1]
+                if ops[i][0] == LPAR_MARK:
+                    # Незакрытые скобки закрываются автоматически
+                    if code:
+                        stack[-1] = _apply_unary(code, stack[-1])
+                elif code == OP_NEG:
+                    stack[-1] = -stack[-1]
+                else:
+                    b = stack.pop()
+                    stack[-1] = _apply_binary(code, stack[-1], b)
+                i -= 1
+            return _check_result(stack[-1])
+        except (CalcError, ZeroDivisionError, OverflowError, ValueError, IndexError):
+            return None
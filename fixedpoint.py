@@ -0,0 +1,250 @@
+# Десятичные числа с фиксированной точкой на целых числах
+# Значение хранится как целое v, а число равно v / 10**digits.
+# Сложение и вычитание точные, умножение и деление округляются до
+# заданного количества знаков после запятой (округление половины от нуля).
+
+DEFAULT_DIGITS = 32   # Знаков после запятой по умолчанию
+MAX_INT_DIGITS = 400  # Максимум цифр в целой части (200! еще помещается)
+
+# Константы с запасом точности для режима 64 знака
+PI_TEXT = "3.14159265358979323846264338327950288419716939937510582097494459230781640628620899"
+E_TEXT = "2.71828182845904523536028747135266249775724709369995957496696762772407663035354759"
+
+
+class DecimalOverflow(OverflowError):
+    """Число вышло за пределы MAX_INT_DIGITS"""
+    pass
+
+
+def _div_round(n, d):
+    """Целочисленное деление n / d с округлением половины от нуля"""
+    if d < 0:
+        n, d = -n, -d
+    q, r = divmod(-n if n < 0 else n, d)
+    if 2 * r >= d:
+        q += 1
+    return -q if n < 0 else q
+
+
+def isqrt(n):
+    """Целая часть квадратного корня для больших целых (метод Ньютона)"""
+    if n < 2:
+        return n
+    x = 10 ** ((len(str(n)) + 1) // 2)  # Начальное приближение не меньше корня
+    while True:
+        y = (x + n // x) // 2
+        if y >= x:
+            return x
+        x = y
+
+
+class FixedDecimal:
+    """Десятичное число с фиксированной точностью (общей для всех чисел)"""
+    __slots__ = ('v',)
+
+    digits = DEFAULT_DIGITS
+    scale = 10 ** DEFAULT_DIGITS
+    limit = 10 ** (DEFAULT_DIGITS + MAX_INT_DIGITS)
+
+    def __init__(self, v):
+        if v > FixedDecimal.limit or -v > FixedDecimal.limit:
+            raise DecimalOverflow()
+        self.v = v
+
+    @staticmethod
+    def set_precision(digits):
+        """Задает количество знаков после запятой для всех чисел"""
+        FixedDecimal.digits = digits
+        FixedDecimal.scale = 10 ** digits
+        FixedDecimal.limit = 10 ** (digits + MAX_INT_DIGITS)
+
+    # ===== СОЗДАНИЕ И ПРЕОБРАЗОВАНИЕ =====
+    @staticmethod
+    def from_text(text):
+        """Точно разбирает строку вида 12.5, .5, 5., 1e-05"""
+        exp = 0
+        for mark in 'eE':
+            if mark in text:
+                text, exp_text = text.split(mark)
+                exp = int(exp_text)
+        negative = text.startswith('-')
+        if negative or text.startswith('+'):
+            text = text[1:]
+        if '.' in text:
+            whole, frac = text.split('.')
+        else:
+            whole, frac = text, ''
+        if not (whole or frac):
+            raise ValueError("empty number")
+        mantissa = int((whole + frac) or '0')
+        shift = FixedDecimal.digits - len(frac) + exp
+        if shift > FixedDecimal.digits + MAX_INT_DIGITS:
+            if mantissa:
+                raise DecimalOverflow()  # 1e99999 - не вычисляем огромную степень
+            v = 0
+        elif shift >= 0:
+            v = mantissa * 10 ** shift
+        elif -shift > len(whole + frac) + 1:
+            v = 0  # Число меньше младшего разряда
+        else:
+            v = _div_round(mantissa, 10 ** -shift)
+        return FixedDecimal(-v if negative else v)
+
+    @staticmethod
+    def from_int(n):
+        """Создает число из целого"""
+        return FixedDecimal(n * FixedDecimal.scale)
+
+    @staticmethod
+    def from_float(f):
+        """Создает число из float (через его десятичную запись)"""
+        if f != f or f in (float('inf'), float('-inf')):
+            raise DecimalOverflow()
+        return FixedDecimal.from_text('%.17g' % f)
+
+    def to_float(self):
+        """Приблизительное значение в виде float"""
+        return self.v / FixedDecimal.scale
+
+    def to_int(self):
+        """Целое значение, если число целое, иначе None"""
+        q, r = divmod(self.v, FixedDecimal.scale)
+        return None if r else q
+
+    # ===== АРИФМЕТИКА =====
+    def __add__(self, other):
+        return FixedDecimal(self.v + _coerce(other).v)
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return FixedDecimal(self.v - _coerce(other).v)
+
+    def __rsub__(self, other):
+        return FixedDecimal(_coerce(other).v - self.v)
+
+    def __mul__(self, other):
+        return FixedDecimal(_div_round(self.v * _coerce(other).v, FixedDecimal.scale))
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        d = _coerce(other).v
+        if d == 0:
+            raise ZeroDivisionError()
+        return FixedDecimal(_div_round(self.v * FixedDecimal.scale, d))
+
+    def __rtruediv__(self, other):
+        return _coerce(other) / self
+
+    def __neg__(self):
+        return FixedDecimal(-self.v)
+
+    def sqrt(self):
+        """Квадратный корень с полной точностью (только для v >= 0)"""
+        return FixedDecimal(isqrt(self.v * FixedDecimal.scale))
+
+    def power(self, n):
+        """Возведение в целую степень n (возведение через квадраты)"""
+        result = FixedDecimal(FixedDecimal.scale)
+        base = self
+        k = -n if n < 0 else n
+        while k:
+            if k & 1:
+                result = result * base
+            k >>= 1
+            if k:
+                base = base * base
+        if n < 0:
+            result = FixedDecimal(FixedDecimal.scale) / result
+        return result
+
+    # ===== СРАВНЕНИЯ =====
+    def __eq__(self, other):
+        if isinstance(other, float) and (other != other or other in (float('inf'), float('-inf'))):
+            return False
+        if not isinstance(other, (FixedDecimal, int, float)):
+            return False  # Например, сравнение со строкой "Error"
+        return self.v == _coerce(other).v
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __lt__(self, other):
+        return self.v < _coerce(other).v
+
+    def __le__(self, other):
+        return self.v <= _coerce(other).v
+
+    def __gt__(self, other):
+        return self.v > _coerce(other).v
+
+    def __ge__(self, other):
+        return self.v >= _coerce(other).v
+
+    def __hash__(self):
+        return hash(self.v)
+
+    # ===== ВЫВОД =====
+    def format(self, width=16):
+        """Строка для экрана не длиннее width символов (без лишних нулей)"""
+        return format_scaled(self.v, FixedDecimal.digits, width)
+
+    def __str__(self):
+        return self.format(FixedDecimal.digits + MAX_INT_DIGITS)
+
+    def __repr__(self):
+        return 'FixedDecimal(' + str(self) + ')'
+
+
+def format_scaled(v, digits, width):
+    """Форматирует число v / 10**digits в строку не длиннее width символов"""
+    sign = '-' if v < 0 else ''
+    whole = str((-v if v < 0 else v) // 10 ** digits)
+    room = width - len(sign) - len(whole) - 1  # Место под дробную часть
+    if room < 1:
+        return _format_exponent(v, digits, width)
+    room = min(room, digits)
+    q = _div_round(v, 10 ** (digits - room))  # Округляем до room знаков
+    q_abs = -q if q < 0 else q
+    text = str(q_abs)
+    if len(text) <= room:
+        text = '0' * (room - len(text) + 1) + text
+    whole, frac = text[:-room], text[-room:].rstrip('0')
+    if len(sign) + len(whole) > width:
+        return _format_exponent(v, digits, width)
+    if q == 0:
+        if v:
+            return _format_exponent(v, digits, width)  # 1e-20: не 0
+        sign = ''
+    return sign + whole + ('.' + frac if frac else '')
+
+
+def _format_exponent(v, digits, width):
+    """Запись числа в виде 1.234e+56, не длиннее width символов"""
+    sign = '-' if v < 0 else ''
+    text = str(-v if v < 0 else v)
+    exp = len(text) - 1 - digits
+    tail = _exponent_tail(exp)
+    room = max(width - len(sign) - len(tail) - 1, 1)  # Цифр мантиссы
+    mantissa = str(_div_round(int((text + '0' * room)[:room + 1]), 10))
+    if len(mantissa) > room:  # Округление дало лишний разряд (9.99 -> 10.0)
+        exp += 1
+        tail = _exponent_tail(exp)
+        mantissa = mantissa[:room]
+    frac = mantissa[1:].rstrip('0')
+    return sign + mantissa[0] + ('.' + frac if frac else '') + tail
+
+
+def _exponent_tail(exp):
+    """Хвост экспоненциальной записи: e+56 или e-20"""
+    return ('e+' if exp >= 0 else 'e-') + str(-exp if exp < 0 else exp)
+
+
+def _coerce(x):
+    """Приводит int/float к FixedDecimal для смешанных операций"""
+    if isinstance(x, FixedDecimal):
+        return x
+    if isinstance(x, int):
+        return FixedDecimal.from_int(x)
+    return FixedDecimal.from_float(x)
@@ -3,10 +3,18 @@
 # Author: Tony DiCola (original GFX author Phil Burgess)
 # License: MIT License (https://opensource.org/licenses/MIT)
 
+from array import array
+
+# Capacity of the preallocated coordinate buffers used by the batched
+# primitives (points for pixels, x/y/width triples for spans).
+BATCH_POINTS = 64
+BATCH_SPANS = 32
+
 
 class GFX:
 
-    def __init__(self, width, height, pixel, hline=None, vline=None):
+    def __init__(self, width, height, pixel, hline=None, vline=None,
+                 line=None, rect=None, fill_rect=None, buffer=None):
         # Create an instance of the GFX drawing class.  You must pass in the
         # following parameters:
         #  - width = The width of the drawing area in pixels.
@@ -22,6 +30,15 @@ class GFX:
         #  - vline = A function to quickly draw a vertical line on the display.
         #            This should take at least an x, y, and height paraemter and
         #            any number of optional color or other parameters.
+        #  - line, rect, fill_rect = Native versions of the primitives with the
+        #            same parameters.  When given they replace the Python
+        #            implementations below (see from_framebuf).
+        #  - buffer = The MONO_VLSB frame buffer bytes behind pixel.  When
+        #            given, pixels() (and spans() without a native hline)
+        #            write into it directly instead of calling pixel.
+        #  line, circle, fill_circle, triangle and fill_triangle take a single
+        #  color parameter and draw through the batched pixels() and spans()
+        #  calls, so there is no *args/**kwargs forwarding per pixel.
         self.width = width
         self.height = height
         self._pixel = pixel
@@ -35,6 +52,31 @@ class GFX:
             self.vline = self._slow_vline
         else:
             self.vline = vline
+        # Native primitives shadow the Python methods on this instance.
+        if line is not None:
+            self.line = line
+        if rect is not None:
+            self.rect = rect
+        if fill_rect is not None:
+            self.fill_rect = fill_rect
+        self._buffer = buffer
+        self._direct_spans = hline is None and buffer is not None
+        # Coordinate buffers are allocated once and reused by every draw.
+        # (2 bytes per short: 2 shorts per point, 3 shorts per span).
+        self._points = array('h', bytes(2 * 2 * BATCH_POINTS))
+        self._spans = array('h', bytes(2 * 3 * BATCH_SPANS))
+
+    @classmethod
+    def from_framebuf(cls, fb, width, height, buffer=None):
+        # Create a GFX that draws into a framebuf.FrameBuffer (or a display
+        # driver derived from it, like SSD1306).  pixel, hline, vline, line,
+        # rect and fill_rect go straight to the C implementations in framebuf,
+        # and the filled shapes below are drawn as runs of native hline calls.
+        # The color parameter is required by framebuf.  buffer is the
+        # MONO_VLSB bytes of fb (like SSD1306.buffer) for pixels().
+        return cls(width, height, fb.pixel, fb.hline, fb.vline,
+                   line=fb.line, rect=fb.rect, fill_rect=fb.fill_rect,
+                   buffer=buffer)
 
     def _slow_hline(self, x0, y0, width, *args, **kwargs):
         # Slow implementation of a horizontal line using pixel drawing.
@@ -54,6 +96,59 @@ class GFX:
         for i in range(height):
             self._pixel(x0, y0+i, *args, **kwargs)
 
+    def pixels(self, points, count=None, color=1):
+        # Batched pixel drawing.  points is a flat array('h') of x, y pairs
+        # and count the number of pairs to draw (all of them by default).
+        # Pixels outside the drawing area are skipped.
+        if count is None:
+            count = len(points) // 2
+        end = 2 * count
+        buf = self._buffer
+        if buf is None:
+            pixel = self._pixel
+            for i in range(0, end, 2):
+                pixel(points[i], points[i+1], color)
+            return
+        width = self.width
+        height = self.height
+        for i in range(0, end, 2):
+            x = points[i]
+            y = points[i+1]
+            if 0 <= x < width and 0 <= y < height:
+                if color:
+                    buf[(y >> 3) * width + x] |= 1 << (y & 7)
+                else:
+                    buf[(y >> 3) * width + x] &= ~(1 << (y & 7))
+
+    def spans(self, spans, count=None, color=1):
+        # Batched horizontal span drawing.  spans is a flat array('h') of
+        # x, y, width triples and count the number of triples to draw.
+        if count is None:
+            count = len(spans) // 3
+        end = 3 * count
+        if not self._direct_spans:
+            hline = self.hline
+            for i in range(0, end, 3):
+                hline(spans[i], spans[i+1], spans[i+2], color)
+            return
+        buf = self._buffer
+        width = self.width
+        for i in range(0, end, 3):
+            y = spans[i+1]
+            if y < 0 or y >= self.height:
+                continue
+            x0 = max(spans[i], 0)
+            x1 = min(spans[i] + spans[i+2], width)
+            base = (y >> 3) * width
+            mask = 1 << (y & 7)
+            if color:
+                for x in range(base + x0, base + x1):
+                    buf[x] |= mask
+            else:
+                mask ^= 0xFF
+                for x in range(base + x0, base + x1):
+                    buf[x] &= mask
+
     def rect(self, x0, y0, width, height, *args, **kwargs):
         # Rectangle drawing function.  Will draw a single pixel wide rectangle
         # starting in the upper left x0, y0 position and width, height pixels in
@@ -74,7 +169,7 @@ class GFX:
         for i in range(x0, x0+width):
             self.vline(i, y0, height, *args, **kwargs)
 
-    def line(self, x0, y0, x1, y1, *args, **kwargs):
+    def line(self, x0, y0, x1, y1, color=1):
         # Line drawing function.  Will draw a single pixel wide line starting at
         # x0, y0 and ending at x1, y1.
         steep = abs(y1 - y0) > abs(x1 - x0)
@@ -92,29 +187,47 @@ class GFX:
             ystep = 1
         else:
             ystep = -1
+        points = self._points
+        limit = len(points)
+        n = 0
         while x0 <= x1:
             if steep:
-                self._pixel(y0, x0, *args, **kwargs)
+                points[n] = y0
+                points[n+1] = x0
             else:
-                self._pixel(x0, y0, *args, **kwargs)
+                points[n] = x0
+                points[n+1] = y0
+            n += 2
+            if n == limit:
+                self.pixels(points, n // 2, color)
+                n = 0
             err -= dy
             if err < 0:
                 y0 += ystep
                 err += dx
             x0 += 1
+        if n:
+            self.pixels(points, n // 2, color)
 
-    def circle(self, x0, y0, radius, *args, **kwargs):
+    def circle(self, x0, y0, radius, color=1):
         # Circle drawing function.  Will draw a single pixel wide circle with
         # center at x0, y0 and the specified radius.
+        points = self._points
+        limit = len(points) - 16
+        points[0] = x0
+        points[1] = y0 + radius
+        points[2] = x0
+        points[3] = y0 - radius
+        points[4] = x0 + radius
+        points[5] = y0
+        points[6] = x0 - radius
+        points[7] = y0
+        n = 8
         f = 1 - radius
         ddF_x = 1
         ddF_y = -2 * radius
         x = 0
         y = radius
-        self._pixel(x0, y0 + radius, *args, **kwargs)
-        self._pixel(x0, y0 - radius, *args, **kwargs)
-        self._pixel(x0 + radius, y0, *args, **kwargs)
-        self._pixel(x0 - radius, y0, *args, **kwargs)
         while x < y:
             if f >= 0:
                 y -= 1
@@ -123,24 +236,46 @@ class GFX:
             x += 1
             ddF_x += 2
             f += ddF_x
-            self._pixel(x0 + x, y0 + y, *args, **kwargs)
-            self._pixel(x0 - x, y0 + y, *args, **kwargs)
-            self._pixel(x0 + x, y0 - y, *args, **kwargs)
-            self._pixel(x0 - x, y0 - y, *args, **kwargs)
-            self._pixel(x0 + y, y0 + x, *args, **kwargs)
-            self._pixel(x0 - y, y0 + x, *args, **kwargs)
-            self._pixel(x0 + y, y0 - x, *args, **kwargs)
-            self._pixel(x0 - y, y0 - x, *args, **kwargs)
-
-    def fill_circle(self, x0, y0, radius, *args, **kwargs):
+            if n > limit:
+                self.pixels(points, n // 2, color)
+                n = 0
+            points[n] = x0 + x
+            points[n+1] = y0 + y
+            points[n+2] = x0 - x
+            points[n+3] = y0 + y
+            points[n+4] = x0 + x
+            points[n+5] = y0 - y
+            points[n+6] = x0 - x
+            points[n+7] = y0 - y
+            points[n+8] = x0 + y
+            points[n+9] = y0 + x
+            points[n+10] = x0 - y
+            points[n+11] = y0 + x
+            points[n+12] = x0 + y
+            points[n+13] = y0 - x
+            points[n+14] = x0 - y
+            points[n+15] = y0 - x
+            n += 16
+        self.pixels(points, n // 2, color)
+
+    def fill_circle(self, x0, y0, radius, color=1):
         # Filled circle drawing function.  Will draw a filled circule with
-        # center at x0, y0 and the specified radius.
-        self.vline(x0, y0 - radius, 2*radius + 1, *args, **kwargs)
+        # center at x0, y0 and the specified radius.  Every row of the circle
+        # is drawn exactly once as a horizontal span (as in the current
+        # Adafruit fillCircleHelper, turned on its side).
+        spans = self._spans
+        limit = len(spans)
+        spans[0] = x0 - radius
+        spans[1] = y0
+        spans[2] = 2*radius + 1
+        n = 3
         f = 1 - radius
         ddF_x = 1
         ddF_y = -2 * radius
         x = 0
         y = radius
+        px = x
+        py = y
         while x < y:
             if f >= 0:
                 y -= 1
@@ -149,19 +284,37 @@ class GFX:
             x += 1
             ddF_x += 2
             f += ddF_x
-            self.vline(x0 + x, y0 - y, 2*y + 1, *args, **kwargs)
-            self.vline(x0 + y, y0 - x, 2*x + 1, *args, **kwargs)
-            self.vline(x0 - x, y0 - y, 2*y + 1, *args, **kwargs)
-            self.vline(x0 - y, y0 - x, 2*x + 1, *args, **kwargs)
+            if n > limit - 12:
+                self.spans(spans, n // 3, color)
+                n = 0
+            if x < y + 1:
+                spans[n] = x0 - y
+                spans[n+1] = y0 + x
+                spans[n+2] = 2*y + 1
+                spans[n+3] = x0 - y
+                spans[n+4] = y0 - x
+                spans[n+5] = 2*y + 1
+                n += 6
+            if y != py:
+                spans[n] = x0 - px
+                spans[n+1] = y0 + py
+                spans[n+2] = 2*px + 1
+                spans[n+3] = x0 - px
+                spans[n+4] = y0 - py
+                spans[n+5] = 2*px + 1
+                n += 6
+                py = y
+            px = x
+        self.spans(spans, n // 3, color)
 
-    def triangle(self, x0, y0, x1, y1, x2, y2, *args, **kwargs):
+    def triangle(self, x0, y0, x1, y1, x2, y2, color=1):
         # Triangle drawing function.  Will draw a single pixel wide triangle
         # around the points (x0, y0), (x1, y1), and (x2, y2).
-        self.line(x0, y0, x1, y1, *args, **kwargs)
-        self.line(x1, y1, x2, y2, *args, **kwargs)
-        self.line(x2, y2, x0, y0, *args, **kwargs)
+        self.line(x0, y0, x1, y1, color)
+        self.line(x1, y1, x2, y2, color)
+        self.line(x2, y2, x0, y0, color)
 
-    def fill_triangle(self, x0, y0, x1, y1, x2, y2, *args, **kwargs):
+    def fill_triangle(self, x0, y0, x1, y1, x2, y2, color=1):
         # Filled triangle drawing function.  Will draw a filled triangle around
         # the points (x0, y0), (x1, y1), and (x2, y2).
         if y0 > y1:
@@ -173,6 +326,8 @@ class GFX:
         if y0 > y1:
             y0, y1 = y1, y0
             x0, x1 = x1, x0
+        spans = self._spans
+        limit = len(spans)
         a = 0
         b = 0
         y = 0
@@ -188,7 +343,7 @@ class GFX:
                 a = x2
             elif x2 > b:
                 b = x2
-            self.hline(a, y0, b-a+1, *args, **kwargs)
+            self.hline(a, y0, b-a+1, color)
             return
         dx01 = x1 - x0
         dy01 = y1 - y0
@@ -208,6 +363,7 @@ class GFX:
             last = y1
         else:
             last = y1-1
+        n = 0
         for y in range(y0, last+1):
             a = x0 + sa // dy01
             b = x0 + sb // dy02
@@ -215,7 +371,13 @@ class GFX:
             sb += dx02
             if a > b:
                 a, b = b, a
-            self.hline(a, y, b-a+1, *args, **kwargs)
+            spans[n] = a
+            spans[n+1] = y
+            spans[n+2] = b-a+1
+            n += 3
+            if n == limit:
+                self.spans(spans, n // 3, color)
+                n = 0
         sa = dx12 * (y - y1)
         sb = dx02 * (y - y0)
         while y <= y2:
@@ -225,5 +387,13 @@ class GFX:
             sb += dx02
             if a > b:
                 a, b = b, a
-            self.hline(a, y, b-a+1, *args, **kwargs)
+            spans[n] = a
+            spans[n+1] = y
+            spans[n+2] = b-a+1
+            n += 3
+            if n == limit:
+                self.spans(spans, n // 3, color)
+                n = 0
             y += 1
+        if n:
+            self.spans(spans, n // 3, color)
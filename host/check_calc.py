@@ -0,0 +1,87 @@
+# Проверка вычислений calc_parser по таблице (выражение -> ожидаемый ответ)
+# во всех режимах чисел, где поведение должно быть закреплено: ошибки для
+# слишком больших чисел вместо долгого счета и одинаковые ответы режимов.
+# Каждое выражение считается и целиком (evaluate_expression), и по символам
+# (LiveParser, как превью при вводе); на одно выражение - не больше MAX_SECONDS.
+# Отдельно превью проверяется так, как его считает main.update_preview:
+# выражение не меняется, число набирается по символу и стирается Backspace.
+# Запуск (из корня проекта): python host/check_calc.py
+
+import sys
+import time
+
+import hostenv
+
+hostenv.install()
+
+from calc_parser import evaluate_expression, set_number_mode, LiveParser, factorial  # noqa: E402
+
+MAX_SECONDS = 1.0  # Предел времени на выражение (на ESP32 - в разы дольше)
+
+# (режимы, выражение, ожидаемый str(результат) или "Error")
+CASES = (
+    # Точные целые не растут без предела: квадраты и степени факториала
+    (("FLOAT", "FRAC", "DEC16"), "fact(1000)²²²²²²²²²²²²", "Error"),
+    (("FLOAT", "FRAC", "DEC16"), "((fact(1000)^16)^16)^16", "Error"),
+    (("FLOAT", "FRAC", "DEC16"), "fact(1000)*fact(1000)", "Error"),
+    (("FLOAT", "FRAC", "DEC16"), "fact(20)²", "5919012181389927685417441689600000000"),
+    (("FRAC",), "9^9^9", "Error"),
+    # Большие факториалы одинаковы в FLOAT и FRAC: точное целое (показывается
+    # как 1.585e+377); действия с обычными числами дают Error, частное
+    # двух таких целых - float
+    (("FLOAT", "FRAC"), "fact(201)", str(factorial(201))),
+    (("FLOAT", "FRAC"), "fact(1000)", str(factorial(1000))),
+    (("FLOAT", "FRAC"), "fact(201)+1", "Error"),
+    (("FLOAT", "FRAC"), "fact(201)/fact(200)", "201.0"),
+    (("FLOAT", "FRAC"), "fact(170)", str(factorial(170))),
+    (("FLOAT", "FRAC"), "0.79.9", "Error"),
+    (("FLOAT", "FRAC"), "1e5.2", "Error"),
+)
+
+# Превью в режиме FLOAT: (выражение, набранное число, число после Backspace,
+# ожидаемый str(превью) или None)
+PREVIEWS = (
+    ("2*", "21", "21", "42.0"),
+    ("2*", "0.79.9", "0.79.9", None),
+    ("2*", "0.79.9", "0.79", "1.58"),
+    ("1+", "1e5.2", "1e5.2", None),
+    ("1+", "1e5.2", "1e5", "100001.0"),
+    ("", "0.79.9", "0.79.9", None),
+)
+
+
+def main():
+    failures = []
+    for modes, text, expected in CASES:
+        for mode in modes:
+            set_number_mode(mode)
+            started = time.perf_counter()
+            value = evaluate_expression(text)
+            parser = LiveParser()
+            parser.sync(text)
+            parser.value()
+            seconds = time.perf_counter() - started
+            if str(value) != expected:
+                failures.append("%s %s: %s, expected %s" % (mode, text, value, expected))
+            if seconds > MAX_SECONDS:
+                failures.append("%s %s: %.1f s" % (mode, text, seconds))
+    set_number_mode("FLOAT")
+    for head, typed, kept, expected in PREVIEWS:
+        parser = LiveParser()
+        for i in range(1, len(typed) + 1):
+            parser.sync(head, typed[:i])
+        for i in range(len(typed) - 1, len(kept) - 1, -1):
+            parser.sync(head, typed[:i])
+        value = parser.value()
+        if (value if value is None else str(value)) != expected:
+            failures.append("preview %s%s -> %s: %s, expected %s" % (head, typed, kept, value, expected))
+        if parser.text != head + kept:
+            failures.append("preview %s%s -> %s: text %r" % (head, typed, kept, parser.text))
+    print("%d cases, %d failures" % (len(CASES) + len(PREVIEWS), len(failures)))
+    for failure in failures:
+        print("FAIL", failure)
+    return failures
+
+
+if __name__ == "__main__":
+    sys.exit(1 if main() else 0)
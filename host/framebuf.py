@@ -0,0 +1,181 @@
+# Замена модуля framebuf для запуска калькулятора на компьютере
+# Поддерживается формат MONO_VLSB (как у SSD1306) и все методы, которые
+# используют программа и драйвер дисплея. Рисование - на чистом Python,
+# результат в буфере побайтно совпадает с форматом устройства.
+# Встроенный шрифт - классический 5x7 в ячейке 8x8 (на плате шрифт
+# framebuf другой, но размер символа тот же).
+
+MONO_VLSB = 0
+RGB565 = 1
+GS4_HMSB = 2
+MONO_HLSB = 3
+MONO_HMSB = 4
+GS2_HMSB = 5
+GS8 = 6
+
+# Столбцы глифов для символов 32..127 (бит 0 - верхняя строка)
+FONT = (
+    b'\x00\x00\x00\x00\x00', b'\x00\x00\x5f\x00\x00', b'\x00\x07\x00\x07\x00', b'\x14\x7f\x14\x7f\x14',  #  !"#
+    b'\x24\x2a\x7f\x2a\x12', b'\x23\x13\x08\x64\x62', b'\x36\x49\x56\x20\x50', b'\x00\x08\x07\x03\x00',  # $%&'
+    b'\x00\x1c\x22\x41\x00', b'\x00\x41\x22\x1c\x00', b'\x2a\x1c\x7f\x1c\x2a', b'\x08\x08\x3e\x08\x08',  # ()*+
+    b'\x00\x80\x70\x30\x00', b'\x08\x08\x08\x08\x08', b'\x00\x00\x60\x60\x00', b'\x20\x10\x08\x04\x02',  # ,-./
+    b'\x3e\x51\x49\x45\x3e', b'\x00\x42\x7f\x40\x00', b'\x72\x49\x49\x49\x46', b'\x21\x41\x49\x4d\x33',  # 0123
+    b'\x18\x14\x12\x7f\x10', b'\x27\x45\x45\x45\x39', b'\x3c\x4a\x49\x49\x31', b'\x41\x21\x11\x09\x07',  # 4567
+    b'\x36\x49\x49\x49\x36', b'\x46\x49\x49\x29\x1e', b'\x00\x00\x14\x00\x00', b'\x00\x40\x34\x00\x00',  # 89:;
+    b'\x00\x08\x14\x22\x41', b'\x14\x14\x14\x14\x14', b'\x00\x41\x22\x14\x08', b'\x02\x01\x59\x09\x06',  # <=>?
+    b'\x3e\x41\x5d\x59\x4e', b'\x7c\x12\x11\x12\x7c', b'\x7f\x49\x49\x49\x36', b'\x3e\x41\x41\x41\x22',  # @ABC
+    b'\x7f\x41\x41\x41\x3e', b'\x7f\x49\x49\x49\x41', b'\x7f\x09\x09\x09\x01', b'\x3e\x41\x41\x51\x73',  # DEFG
+    b'\x7f\x08\x08\x08\x7f', b'\x00\x41\x7f\x41\x00', b'\x20\x40\x41\x3f\x01', b'\x7f\x08\x14\x22\x41',  # HIJK
+    b'\x7f\x40\x40\x40\x40', b'\x7f\x02\x1c\x02\x7f', b'\x7f\x04\x08\x10\x7f', b'\x3e\x41\x41\x41\x3e',  # LMNO
+    b'\x7f\x09\x09\x09\x06', b'\x3e\x41\x51\x21\x5e', b'\x7f\x09\x19\x29\x46', b'\x26\x49\x49\x49\x32',  # PQRS
+    b'\x03\x01\x7f\x01\x03', b'\x3f\x40\x40\x40\x3f', b'\x1f\x20\x40\x20\x1f', b'\x3f\x40\x38\x40\x3f',  # TUVW
+    b'\x63\x14\x08\x14\x63', b'\x03\x04\x78\x04\x03', b'\x61\x59\x49\x4d\x43', b'\x00\x7f\x41\x41\x41',  # XYZ[
+    b'\x02\x04\x08\x10\x20', b'\x00\x41\x41\x41\x7f', b'\x04\x02\x01\x02\x04', b'\x40\x40\x40\x40\x40',  # \]^_
+    b'\x00\x03\x07\x08\x00', b'\x20\x54\x54\x78\x40', b'\x7f\x28\x44\x44\x38', b'\x38\x44\x44\x44\x28',  # `abc
+    b'\x38\x44\x44\x28\x7f', b'\x38\x54\x54\x54\x18', b'\x00\x08\x7e\x09\x02', b'\x18\xa4\xa4\x9c\x78',  # defg
+    b'\x7f\x08\x04\x04\x78', b'\x00\x44\x7d\x40\x00', b'\x20\x40\x40\x3d\x00', b'\x7f\x10\x28\x44\x00',  # hijk
+    b'\x00\x41\x7f\x40\x00', b'\x7c\x04\x78\x04\x78', b'\x7c\x08\x04\x04\x78', b'\x38\x44\x44\x44\x38',  # lmno
+    b'\xfc\x18\x24\x24\x18', b'\x18\x24\x24\x18\xfc', b'\x7c\x08\x04\x04\x08', b'\x48\x54\x54\x54\x24',  # pqrs
+    b'\x04\x04\x3f\x44\x24', b'\x3c\x40\x40\x20\x7c', b'\x1c\x20\x40\x20\x1c', b'\x3c\x40\x30\x40\x3c',  # tuvw
+    b'\x44\x28\x10\x28\x44', b'\x4c\x90\x90\x90\x7c', b'\x44\x64\x54\x4c\x44', b'\x00\x08\x36\x41\x00',  # xyz{
+    b'\x00\x00\x77\x00\x00', b'\x00\x41\x36\x08\x00', b'\x02\x01\x02\x04\x02', b'\x7f\x7f\x7f\x7f\x7f',  # |}~ и прочие
+)
+
+
+class FrameBuffer:
+    """Буфер кадра MONO_VLSB: байт - столбец из 8 точек, бит 0 - верхняя"""
+
+    def __init__(self, buffer, width, height, format, stride=None):
+        if format != MONO_VLSB:
+            raise ValueError("host framebuf supports MONO_VLSB only")
+        self.buffer = buffer
+        self.width = width
+        self.height = height
+        self.stride = width if stride is None else stride
+        if len(buffer) < ((height + 7) // 8) * self.stride:
+            raise ValueError("buffer too small")
+
+    def pixel(self, x, y, c=None):
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return
+        i = (y >> 3) * self.stride + x
+        if c is None:
+            return (self.buffer[i] >> (y & 7)) & 1
+        if c:
+            self.buffer[i] |= 1 << (y & 7)
+        else:
+            self.buffer[i] &= ~(1 << (y & 7)) & 0xFF
+
+    def fill(self, c):
+        value = 0xFF if c else 0
+        buf = self.buffer
+        for i in range(((self.height + 7) // 8) * self.stride):
+            buf[i] = value
+
+    def fill_rect(self, x, y, w, h, c):
+        # Отсечение по краям, затем запись столбцов байтами по страницам
+        x0 = max(x, 0)
+        y0 = max(y, 0)
+        x1 = min(x + w, self.width)
+        y1 = min(y + h, self.height)
+        if x0 >= x1 or y0 >= y1:
+            return
+        buf = self.buffer
+        stride = self.stride
+        y = y0
+        while y < y1:
+            page = y >> 3
+            bottom = min(y1, (page + 1) * 8)
+            mask = (0xFF << (y & 7)) & (0xFF >> (8 - (bottom - page * 8)))
+            base = page * stride
+            if c:
+                for i in range(base + x0, base + x1):
+                    buf[i] |= mask
+            else:
+                mask ^= 0xFF
+                for i in range(base + x0, base + x1):
+                    buf[i] &= mask
+            y = bottom
+
+    def hline(self, x, y, w, c):
+        self.fill_rect(x, y, w, 1, c)
+
+    def vline(self, x, y, h, c):
+        self.fill_rect(x, y, 1, h, c)
+
+    def rect(self, x, y, w, h, c, f=False):
+        if f:
+            self.fill_rect(x, y, w, h, c)
+            return
+        self.fill_rect(x, y, w, 1, c)
+        self.fill_rect(x, y + h - 1, w, 1, c)
+        self.fill_rect(x, y, 1, h, c)
+        self.fill_rect(x + w - 1, y, 1, h, c)
+
+    def line(self, x1, y1, x2, y2, c):
+        # Брезенхем, как в framebuf: все точки от (x1, y1) до (x2, y2)
+        dx = abs(x2 - x1)
+        dy = -abs(y2 - y1)
+        sx = 1 if x1 < x2 else -1
+        sy = 1 if y1 < y2 else -1
+        err = dx + dy
+        while True:
+            self.pixel(x1, y1, c)
+            if x1 == x2 and y1 == y2:
+                break
+            e2 = 2 * err
+            if e2 >= dy:
+                err += dy
+                x1 += sx
+            if e2 <= dx:
+                err += dx
+                y1 += sy
+
+    def text(self, s, x, y, c=1):
+        for ch in s:
+            code = ord(ch)
+            if code < 32 or code > 127:
+                code = 127
+            glyph = FONT[code - 32]
+            for col in range(5):
+                bits = glyph[col]
+                row = 0
+                while bits:
+                    if bits & 1:
+                        self.pixel(x + 1 + col, y + row, c)
+                    bits >>= 1
+                    row += 1
+            x += 8
+
+    def scroll(self, xstep, ystep):
+        # Сдвиг содержимого; освободившиеся точки остаются как были
+        width = self.width
+        height = self.height
+        old = [[self.pixel(x, y) for x in range(width)] for y in range(height)]
+        for y in range(height):
+            sy = y - ystep
+            if 0 <= sy < height:
+                for x in range(width):
+                    sx = x - xstep
+                    if 0 <= sx < width:
+                        self.pixel(x, y, old[sy][sx])
+
+    def blit(self, fbuf, x, y, key=-1, palette=None):
+        # Точки цвета key в источнике прозрачны; palette переводит цвета
+        for sy in range(fbuf.height):
+            ty = y + sy
+            if ty < 0 or ty >= self.height:
+                continue
+            for sx in range(fbuf.width):
+                tx = x + sx
+                if tx < 0 or tx >= self.width:
+                    continue
+                c = fbuf.pixel(sx, sy)
+                if c == key:
+                    continue
+                if palette is not None:
+                    c = palette.pixel(c, 0)
+                self.pixel(tx, ty, c)
+
+
+FrameBuffer1 = FrameBuffer
@@ -0,0 +1,58 @@
+# Окружение для запуска модулей калькулятора на компьютере (CPython)
+# install() добавляет в sys.path папку host (замены machine, framebuf,
+# micropython) и корень проекта, а в модуль time - функции MicroPython
+# (ticks_us, ticks_ms, ticks_diff, ticks_add, sleep_us, sleep_ms).
+# Время идет по настоящим часам или по виртуальным (VirtualClock).
+
+import os
+import sys
+import time
+
+HOST_DIR = os.path.dirname(os.path.abspath(__file__))
+ROOT_DIR = os.path.dirname(HOST_DIR)
+
+
+class RealClock:
+    """Настоящее время компьютера"""
+
+    def ticks_us(self):
+        return time.perf_counter_ns() // 1000
+
+    def sleep_us(self, us):
+        time.sleep(us / 1000000)
+
+
+class VirtualClock:
+    """Виртуальное время: паузы не ждут, а только сдвигают счетчик"""
+
+    def __init__(self):
+        self.now_us = 0
+
+    def ticks_us(self):
+        return self.now_us
+
+    def sleep_us(self, us):
+        self.now_us += us
+
+    def advance_us(self, us):
+        self.now_us += us
+
+
+clock = RealClock()  # Текущие часы (меняются в install)
+
+
+def install(new_clock=None):
+    """Готовит окружение; возвращает часы, по которым идет time"""
+    global clock
+    for path in (ROOT_DIR, HOST_DIR):
+        if path not in sys.path:
+            sys.path.insert(0, path)
+    if new_clock is not None:
+        clock = new_clock
+    time.ticks_us = lambda: clock.ticks_us()
+    time.ticks_ms = lambda: clock.ticks_us() // 1000
+    time.ticks_diff = lambda a, b: a - b
+    time.ticks_add = lambda a, b: a + b
+    time.sleep_us = lambda us: clock.sleep_us(us)
+    time.sleep_ms = lambda ms: clock.sleep_us(ms * 1000)
+    return clock
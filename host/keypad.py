@@ -0,0 +1,48 @@
+# Модель клавиатуры калькулятора для запуска на компьютере
+# Матрица: строки - выходы, столбцы - входы с подтяжкой. Столбец читается
+# как 0, если нажата клавиша на пересечении со строкой, выставленной в 0.
+# Навигационные кнопки замыкают свой вход на землю. Уровни входов меняются
+# через Pin.drive, поэтому срабатывают и обработчики прерываний.
+
+
+class Keypad:
+    """Нажатые клавиши матрицы и навигационные кнопки на выводах machine.Pin"""
+
+    def __init__(self, rows, cols, nav_buttons):
+        self.rows = rows            # Выходы строк
+        self.cols = cols            # Входы столбцов
+        self.nav = nav_buttons      # Имя -> вход кнопки
+        self.pressed = set()        # Нажатые клавиши матрицы (строка, столбец)
+        for row in rows:
+            row.listener = self._update
+        self._update()
+
+    def _update(self, pin=None):
+        """Пересчитывает уровни столбцов по строкам и нажатым клавишам"""
+        for c, col in enumerate(self.cols):
+            level = 1
+            for r, row in enumerate(self.rows):
+                if row.level == 0 and (r, c) in self.pressed:
+                    level = 0
+                    break
+            col.drive(level)
+
+    def press(self, row, col):
+        self.pressed.add((row, col))
+        self._update()
+
+    def release(self, row, col):
+        self.pressed.discard((row, col))
+        self._update()
+
+    def press_nav(self, name):
+        self.nav[name].drive(0)
+
+    def release_nav(self, name):
+        self.nav[name].drive(1)
+
+    def release_all(self):
+        self.pressed.clear()
+        self._update()
+        for pin in self.nav.values():
+            pin.drive(1)
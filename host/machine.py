@@ -0,0 +1,171 @@
+# Замена модуля machine для запуска калькулятора на компьютере
+# Pin хранит уровень на выводе, Timer запоминает обработчик (вызывать его
+# должен тот, кто управляет временем), I2C и SoftI2C передают записанные
+# байты эмуляторам устройств. По адресу 0x3c подключен эмулятор SSD1306.
+
+from ssd1306_emu import SSD1306Emulator
+
+DISPLAY_ADDR = 0x3c  # Адрес дисплея на шине
+
+
+class Pin:
+    """Вывод GPIO: уровень можно читать и задавать из программы и снаружи"""
+    IN = 1
+    OUT = 3
+    OPEN_DRAIN = 7
+    PULL_UP = 2
+    PULL_DOWN = 1
+    IRQ_FALLING = 2
+    IRQ_RISING = 1
+
+    pins = {}  # Номер -> последний созданный Pin (для тестов и эмуляции)
+
+    def __init__(self, id, mode=-1, pull=-1, value=None):
+        self.id = id
+        self.mode = mode
+        self.pull = pull
+        self.level = 1 if pull == Pin.PULL_UP else 0
+        if value is not None:
+            self.level = 1 if value else 0
+        self.handler = None
+        self.trigger = 0
+        self.listener = None  # Вызывается при смене уровня выхода программой
+        Pin.pins[id] = self
+
+    def init(self, mode=-1, pull=-1, value=None):
+        if mode != -1:
+            self.mode = mode
+        if pull != -1:
+            self.pull = pull
+        if value is not None:
+            self.level = 1 if value else 0
+
+    def value(self, x=None):
+        if x is None:
+            return self.level
+        old = self.level
+        self.level = 1 if x else 0
+        if self.listener is not None and old != self.level:
+            self.listener(self)
+
+    def __call__(self, x=None):
+        return self.value(x)
+
+    def on(self):
+        self.value(1)
+
+    def off(self):
+        self.value(0)
+
+    def irq(self, handler=None, trigger=IRQ_FALLING | IRQ_RISING):
+        self.handler = handler
+        self.trigger = trigger
+
+    def drive(self, level):
+        """Внешний сигнал на входе: меняет уровень и вызывает обработчик IRQ"""
+        old = self.level
+        self.level = 1 if level else 0
+        if self.handler is None or old == self.level:
+            return
+        if (self.level and self.trigger & Pin.IRQ_RISING) or \
+                (not self.level and self.trigger & Pin.IRQ_FALLING):
+            self.handler(self)
+
+
+class Timer:
+    """Таймер: хранит период и обработчик; fire() вызывает обработчик"""
+    ONE_SHOT = 0
+    PERIODIC = 1
+
+    def __init__(self, id=-1, **kwargs):
+        self.id = id
+        self.period = 0
+        self.mode = Timer.PERIODIC
+        self.callback = None
+        if kwargs:
+            self.init(**kwargs)
+
+    def init(self, mode=PERIODIC, period=-1, callback=None, freq=-1):
+        self.mode = mode
+        self.period = period if period != -1 else (1000 // freq if freq > 0 else 0)
+        self.callback = callback
+
+    def deinit(self):
+        self.callback = None
+
+    def fire(self):
+        """Срабатывание таймера (для эмуляции времени)"""
+        if self.callback is not None:
+            self.callback(self)
+
+
+class I2C:
+    """Шина I2C: записи передаются устройствам по адресу"""
+
+    def __init__(self, id=-1, scl=None, sda=None, freq=400000, timeout=50000):
+        self.id = id
+        self.freq = freq
+        self.devices = {DISPLAY_ADDR: SSD1306Emulator()}
+        self.bytes_written = 0  # Байтов на шине, включая байт адреса
+        self.on_transfer = None  # Вызывается с числом байтов транзакции
+        self._pending = None    # Байты между start() и stop()
+
+    @property
+    def display(self):
+        """Эмулятор дисплея на адресе 0x3c"""
+        return self.devices[DISPLAY_ADDR]
+
+    def scan(self):
+        return sorted(self.devices)
+
+    def _deliver(self, addr, payload):
+        device = self.devices.get(addr)
+        if device is None:
+            raise OSError(19)  # ENODEV: устройство не ответило
+        self.bytes_written += 1 + len(payload)
+        device.i2c_write(bytes(payload))
+        if self.on_transfer is not None:
+            self.on_transfer(1 + len(payload))
+
+    def writeto(self, addr, buf, stop=True):
+        self._deliver(addr, buf)
+        return len(buf)
+
+    def writevto(self, addr, vector, stop=True):
+        payload = bytearray()
+        for buf in vector:
+            payload += buf
+        self._deliver(addr, payload)
+        return len(payload)
+
+    def readfrom(self, addr, nbytes, stop=True):
+        return bytes(nbytes)
+
+    def readfrom_into(self, addr, buf, stop=True):
+        for i in range(len(buf)):
+            buf[i] = 0
+
+    # Примитивные операции (как у SoftI2C): первый байт после start() - адрес
+    def start(self):
+        self._pending = bytearray()
+
+    def write(self, buf):
+        self._pending += buf
+        return len(buf)
+
+    def stop(self):
+        data = self._pending
+        self._pending = None
+        if data:
+            self._deliver(data[0] >> 1, data[1:])
+
+
+class SoftI2C(I2C):
+    """Программный I2C: для эмуляции не отличается от аппаратного"""
+
+    def __init__(self, scl=None, sda=None, freq=400000, timeout=50000):
+        super().__init__(-1, scl, sda, freq, timeout)
+
+
+def freq(hz=None):
+    return 240000000
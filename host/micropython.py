@@ -0,0 +1,24 @@
+# Замена модуля micropython для запуска на компьютере
+
+def const(x):
+    return x
+
+
+def native(f):
+    return f
+
+
+def viper(f):
+    return f
+
+
+def schedule(func, arg):
+    func(arg)
+
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+
+def mem_info(verbose=False):
+    pass
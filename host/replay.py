@@ -0,0 +1,263 @@
+# Прогон сценариев нажатий через настоящий путь опроса клавиатуры main.py
+# main.py загружается с заменами machine (Pin, Timer, I2C) и работает
+# в виртуальном времени: таймер опроса срабатывает каждые 50 мс, паузы
+# sleep_us/sleep_ms только сдвигают часы, передача по I2C занимает время
+# по частоте шины. Клавиши нажимаются на модели матрицы (keypad.Keypad) и
+# проходят через fast_scan_matrix, debounce_keys и handle_key_events.
+# После каждого сценария проверяются expression и result. События из
+# очереди main.key_queue записываются и подаются повторно без сканирования,
+# все события сценария за один вызов handle_key_events: итог должен совпасть.
+# Вывод: нажатий в секунду (время процессора компьютера), перцентили
+# задержки от нажатия до кадра на дисплее (виртуальное время) и
+# процессорного времени на одно нажатие. Для опроса каждый такт и для
+# простоя с прерываниями (main.KEYPAD_IDLE) - время ожидания sleep_us и
+# процессорное время на такт без нажатий, задержка от нажатия до обработки.
+# Запуск (из корня проекта): python host/replay.py [повторов]
+
+import sys
+import time
+
+import hostenv
+
+clock = hostenv.install(hostenv.VirtualClock())
+
+import main  # noqa: E402 (после install: нужны замены machine и framebuf)
+from keypad import Keypad  # noqa: E402
+
+HOLD_TICKS = 3      # Сколько опросов клавиша удерживается
+GAP_TICKS = 2       # Сколько опросов клавиша отпущена перед следующей
+TIMEOUT_TICKS = 40  # Дольше этого кадр с нажатием не ждем
+BITS_PER_BYTE = 9   # 8 бит и ACK на шине I2C
+IDLE_TICKS = 200    # Тактов без нажатий в замере простоя
+WAKE_KEYS = "1 2 3 4 5 6 7 8 9 0 C" # Нажатия для замера задержки после простоя
+
+# Сценарии: (клавиши, ожидаемое expression, ожидаемый result).
+# Последнее число остается в current_input, в expression - то, что перед ним.
+# None - не проверять. Навигационные кнопки - с префиксом "nav:",
+# "4&5" - наложение: 5 нажимается, пока 4 еще удерживается,
+# "BS~20" - удержание 20 тактов (автоповтор и долгое нажатие)
+CASES = (
+    ("C 1 2 + 3 4 =", "12+", "46"),
+    ("C 2 ^ 1 0 =", "2^", "1024"),
+    ("C ( 1 + 2 ) * 3 =", "(1+2)*", "9"),
+    ("C 0 . 1 + 0 . 2 =", "0.1+", "0.3"),
+    ("C 1 2 3 BS * 2 nav:enter", "12*", "24"),
+    ("C 9 SHIFT sqrt SHIFT", "sqrt(9)", "3"),
+    ("C 1 / 0 =", None, "Error"),
+    ("C 7 - 1 0 =", "7-", "-3"),
+    ("C 2 * ( 3 + 4 ) =", "2*(3+4)", "14"),
+    ("C 4&5 6 + 1&2&3 =", "456+", "579"),
+    ("C 7 7 + 7 =", "77+", "84"),
+    ("C 1 + 2 3 4 5 6 BS~20 =", "1+", "3"),
+    ("C 1 2 + 3 BS~40 4 =", "", "4"),
+    ("C 2 0 0 SHIFT ! + x = SHIFT", None, "Error"),
+)
+
+timer = None      # Таймер опроса, созданный main.init_keyboard_timer()
+keypad = None     # Модель клавиатуры на выводах main
+period_us = 0     # Период таймера
+next_tick = 0     # Время следующего срабатывания таймера
+scan_us = 0       # Виртуальное время внутри scan_keyboard (ожидание sleep_us)
+scan_cpu_ns = 0   # Процессорное время внутри scan_keyboard
+
+
+def setup():
+    """Таймер, клавиатура и время передачи по I2C"""
+    global timer, keypad, period_us, next_tick
+    timer = main.init_keyboard_timer()
+    period_us = timer.period * 1000
+    next_tick = clock.now_us + period_us
+    main.init_keypad_irq()
+    keypad = Keypad(main.rows, main.cols, main.nav_buttons)
+    freq = main.i2c.freq
+    main.i2c.on_transfer = lambda n: clock.sleep_us(n * BITS_PER_BYTE * 1000000 // freq)
+    main.update_display()  # Первый кадр, как в main.main()
+
+
+def run_until(end_us, watch=None):
+    """Прежний главный цикл main.main() (USE_ASYNCIO = False) до момента end_us.
+    watch = [версия, время кадра, время обработки]: когда состояние стало
+    новее версии и когда кадр с ним передан целиком"""
+    global next_tick, scan_us, scan_cpu_ns
+    while clock.now_us < end_us:
+        if clock.now_us >= next_tick:
+            timer.fire()
+            next_tick += period_us
+        if main.scan_flag[0] == 0:
+            if not main.flush_display():
+                time.sleep_ms(1)
+        else:
+            main.scan_flag[0] = 0
+            started = clock.now_us
+            cpu = time.perf_counter_ns()
+            main.scan_keyboard()
+            scan_cpu_ns += time.perf_counter_ns() - cpu
+            scan_us += clock.now_us - started
+        if watch is not None and main.state_version > watch[0]:
+            if watch[2] is None:
+                watch[2] = clock.now_us
+            if watch[1] is None and main.drawn_version == main.state_version \
+                    and not main.flushing:
+                watch[1] = clock.now_us
+
+
+def find_key(key):
+    """(строка, столбец) клавиши в текущей раскладке"""
+    keymap = main.keymap_shift if main.shift_mode else main.keymap_normal
+    for row, keys in enumerate(keymap):
+        if key in keys:
+            return row, keys.index(key)
+    raise KeyError(key)
+
+
+def tap(key, handled=False):
+    """Нажимает и отпускает клавишу. Возвращает задержку до кадра (мкс) или None;
+    handled=True - задержку до обработки нажатия"""
+    start = clock.now_us
+    watch = [main.state_version, None, None]
+    if key.startswith("nav:"):
+        keypad.press_nav(key[4:])
+        run_until(start + HOLD_TICKS * period_us, watch)
+        keypad.release_nav(key[4:])
+    elif "~" in key:
+        name, ticks = key.split("~")
+        row, col = find_key(name)
+        keypad.press(row, col)
+        run_until(start + int(ticks) * period_us, watch)
+        keypad.release(row, col)
+    elif "&" in key and len(key) > 1:
+        # Наложение: каждая следующая клавиша нажимается через такт,
+        # все отпускаются после удержания последней
+        held = [find_key(name) for name in key.split("&")]
+        for row, col in held:
+            keypad.press(row, col)
+            run_until(clock.now_us + period_us, watch)
+        run_until(clock.now_us + HOLD_TICKS * period_us, watch)
+        for row, col in held:
+            keypad.release(row, col)
+    else:
+        row, col = find_key(key)
+        keypad.press(row, col)
+        run_until(start + HOLD_TICKS * period_us, watch)
+        keypad.release(row, col)
+    released = clock.now_us
+    run_until(released + GAP_TICKS * period_us, watch)
+    if watch[1] is None:
+        run_until(released + TIMEOUT_TICKS * period_us, watch)
+    done = watch[2] if handled else watch[1]
+    return None if done is None else done - start
+
+
+def percentile(values, p):
+    """Перцентиль p (0-100) по ближайшему рангу"""
+    ordered = sorted(values)
+    if not ordered:
+        return 0
+    rank = max(1, -(-p * len(ordered) // 100))
+    return ordered[rank - 1]
+
+
+def check(keys, expression, result, failures, prefix=""):
+    """Сравнивает expression и result с ожидаемыми"""
+    if expression is not None and main.expression != expression:
+        failures.append("%s%s: expression %r, expected %r" % (prefix, keys, main.expression, expression))
+    if result is not None and str(main.result) != result:
+        failures.append("%s%s: result %r, expected %r" % (prefix, keys, main.result, result))
+
+
+def replay(rounds=1):
+    """Прогоняет сценарии rounds раз. Возвращает (ошибки, задержки, время CPU,
+    записанные события очереди по сценариям первого прогона)"""
+    failures = []
+    latencies = []
+    cpu_us = []
+    recorded = []
+    for round_index in range(rounds):
+        for keys, expression, result in CASES:
+            if round_index == 0:
+                main.key_queue.log = []
+            for key in keys.split():
+                started = time.perf_counter_ns()
+                latency = tap(key)
+                cpu_us.append((time.perf_counter_ns() - started) // 1000)
+                if latency is None:
+                    failures.append("%s: key %s did not reach the display" % (keys, key))
+                else:
+                    latencies.append(latency)
+            if round_index == 0:
+                recorded.append(main.key_queue.log)
+                main.key_queue.log = None
+            check(keys, expression, result, failures)
+    return failures, latencies, cpu_us, recorded
+
+
+def replay_queue(recorded):
+    """Подает записанные события в очередь и обрабатывает их без сканирования:
+    все события сценария (пока помещаются) - за один вызов handle_key_events.
+    Возвращает (ошибки, событий)"""
+    failures = []
+    events = 0
+    for (keys, expression, result), log in zip(CASES, recorded):
+        i = 0
+        while i < len(log):
+            i = main.key_queue.replay(log, i)
+            main.handle_key_events()
+        events += len(log)
+        check(keys, expression, result, failures, "queue replay ")
+    return failures, events
+
+
+def measure_idle(idle):
+    """Такт без нажатий и задержка нажатия для опроса (idle=False) или простоя.
+    Возвращает (мкс ожидания на такт, мкс CPU на такт, задержки обработки)"""
+    global scan_us, scan_cpu_ns
+    main.KEYPAD_IDLE = idle
+    if main.keypad_idle and not idle:
+        main.leave_keypad_idle()
+    run_until(clock.now_us + 2 * period_us)  # Переход в простой (или из него)
+    scan_us = 0
+    scan_cpu_ns = 0
+    run_until(clock.now_us + IDLE_TICKS * period_us)
+    busy = scan_us / IDLE_TICKS
+    cpu = scan_cpu_ns / 1000 / IDLE_TICKS
+    wake = []
+    for key in WAKE_KEYS.split():
+        # Нажатия в разных местах периода таймера
+        run_until(clock.now_us + period_us * (len(wake) % 7 + 3) // 7)
+        latency = tap(key, True)
+        if latency is not None:
+            wake.append(latency)
+    return busy, cpu, wake
+
+
+def report_idle():
+    print("keypad       wait us/tick  CPU us/tick  press->handled ms p50   max")
+    for name, idle in (("polling", False), ("idle + IRQ", True)):
+        busy, cpu, wake = measure_idle(idle)
+        print("%-12s %12.0f %12.1f %22.1f %5.1f" % (
+            name, busy, cpu, percentile(wake, 50) / 1000, percentile(wake, 100) / 1000))
+    main.KEYPAD_IDLE = True
+
+
+def report(latencies, cpu_us):
+    total_s = sum(cpu_us) / 1000000
+    print("keystrokes: %d, %.0f keystrokes/s (host CPU)" % (len(cpu_us), len(cpu_us) / max(total_s, 1e-9)))
+    print("                    p50      p90      p99      max")
+    print("latency, ms     %8.1f %8.1f %8.1f %8.1f" % tuple(
+        percentile(latencies, p) / 1000 for p in (50, 90, 99, 100)))
+    print("host CPU, us    %8d %8d %8d %8d" % tuple(
+        percentile(cpu_us, p) for p in (50, 90, 99, 100)))
+
+
+if __name__ == "__main__":
+    setup()
+    failures, latencies, cpu_us, recorded = replay(int(sys.argv[1]) if len(sys.argv) > 1 else 5)
+    report(latencies, cpu_us)
+    queue_failures, events = replay_queue(recorded)
+    failures += queue_failures
+    print("queue replay: %d events, %d cases, overflow %d" % (
+        events, len(recorded), main.key_queue.overflow))
+    report_idle()
+    for failure in failures:
+        print("FAIL", failure)
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,96 @@
+# Прогон асинхронного главного цикла main.py (main.start_tasks) на CPython
+# asyncio в настоящем времени. Выводы - замены machine.Pin, клавиши
+# нажимаются на модели матрицы (keypad.Keypad), прерывания от столбцов будят
+# опрос из простоя. До первого нажатия на дисплее уже должен быть кадр.
+# После сценариев проверяются expression и result, память эмулятора
+# дисплея сверяется с теневой копией драйвера, а затем секунду
+# ничего не нажимается: считается, сколько раз просыпались задачи и сколько
+# процессорного времени ушло (прежний цикл просыпался бы ~1000 раз в секунду).
+# Запуск (из корня проекта): python host/run_async.py
+
+import asyncio
+import sys
+import time
+
+import hostenv
+
+hostenv.install()
+
+import main  # noqa: E402 (после install: нужны замены machine и framebuf)
+from keypad import Keypad  # noqa: E402
+
+HOLD_S = 0.15   # Сколько клавиша удерживается
+GAP_S = 0.1     # Пауза между клавишами
+SETTLE_S = 0.3  # Ожидание последнего кадра (и превью) после сценария
+IDLE_S = 1.0    # Замер простоя
+
+# Сценарии: (клавиши, ожидаемое expression, ожидаемый result)
+CASES = (
+    ("C 1 2 + 3 4 =", "12+", "46"),
+    ("C ( 1 + 2 ) * 3 =", "(1+2)*", "9"),
+    ("C 7 - 1 0 =", "7-", "-3"),
+)
+PREVIEW_KEYS = "C 2 * 2 1"  # После них превью должно стать 42
+PREVIEW = "42"
+
+
+def find_key(key):
+    """(строка, столбец) клавиши в текущей раскладке"""
+    keymap = main.keymap_shift if main.shift_mode else main.keymap_normal
+    for row, keys in enumerate(keymap):
+        if key in keys:
+            return row, keys.index(key)
+    raise KeyError(key)
+
+
+async def type_keys(keypad, keys):
+    for key in keys.split():
+        row, col = find_key(key)
+        keypad.press(row, col)
+        await asyncio.sleep(HOLD_S)
+        keypad.release(row, col)
+        await asyncio.sleep(GAP_S)
+    await asyncio.sleep(SETTLE_S)
+
+
+async def run():
+    failures = []
+    main.init_keypad_irq()
+    keypad = Keypad(main.rows, main.cols, main.nav_buttons)
+    tasks = main.start_tasks()
+    await asyncio.sleep(SETTLE_S)
+    if not any(main.i2c.display.frame()):
+        failures.append("display is blank before the first key press")
+    for keys, expression, result in CASES:
+        await type_keys(keypad, keys)
+        if main.expression != expression:
+            failures.append("%s: expression %r, expected %r" % (keys, main.expression, expression))
+        if str(main.result) != result:
+            failures.append("%s: result %r, expected %r" % (keys, main.result, result))
+    await type_keys(keypad, PREVIEW_KEYS)
+    if main.preview != PREVIEW:
+        failures.append("%s: preview %r, expected %r" % (PREVIEW_KEYS, main.preview, PREVIEW))
+    if main.i2c.display.frame() != bytes(main.oled.shadow):
+        failures.append("display RAM differs from the driver shadow copy")
+    if not main.keypad_idle:
+        failures.append("keypad did not return to idle")
+
+    wakeups = main.task_wakeups
+    cpu = time.process_time()
+    await asyncio.sleep(IDLE_S)
+    cpu = time.process_time() - cpu
+    print("idle %.1f s: %d task wakeups, %.1f ms CPU" % (
+        IDLE_S, main.task_wakeups - wakeups, cpu * 1000))
+    print("last latency %.1f ms, max %.1f ms" % (
+        main.last_latency_us / 1000, main.max_latency_us / 1000))
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return failures
+
+
+if __name__ == "__main__":
+    failures = asyncio.run(run())
+    for failure in failures:
+        print("FAIL", failure)
+    sys.exit(1 if failures else 0)
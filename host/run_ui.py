@@ -0,0 +1,105 @@
+# Запуск интерфейса калькулятора на компьютере с эмулятором дисплея
+# main.py импортируется без изменений (с заменами machine и framebuf),
+# нажатия клавиш подаются сценарием, кадры рисует update_display, а байты,
+# переданные по I2C, разбирает эмулятор SSD1306. Для каждого кадра
+# сохраняются PBM и PNG и выводится, сколько байтов ушло по шине.
+# Память эмулятора сверяется с теневой копией драйвера: при расхождении
+# скрипт завершается с кодом 1 (подходит для CI).
+# Запуск (из корня проекта): python host/run_ui.py [папка_для_кадров]
+# Без папки кадры пишутся во временную папку (ее путь выводится).
+
+import os
+import sys
+import tempfile
+
+import hostenv
+
+hostenv.install()
+
+import main  # noqa: E402 (после install: нужны замены machine и framebuf)
+
+PNG_SCALE = 4  # Увеличение PNG, чтобы точки было видно
+
+# Сценарий: (имя кадра, клавиши). Клавиши матрицы - как в раскладке,
+# навигационные кнопки - с префиксом "nav:"
+SCRIPT = (
+    ("start", ()),
+    ("typing", ("1", "2", "+", "3", "4")),
+    ("result", ("=",)),
+    ("scientific", ("C", "9", "SHIFT", "sqrt")),
+    ("big", ("SHIFT", "C", "2", "0", "SHIFT", "!")),
+    ("menu", ("MENU",)),
+    ("menu_down", ("nav:down", "nav:down")),
+    ("back", ("nav:up", "nav:up", "nav:enter")),
+    ("plot", ("C", "SHIFT", "x", "sin", "SHIFT", "*", "SHIFT", "x", "=")),
+    ("plot_zoom", ("nav:down",)),
+    ("plot_exit", ("nav:enter",)),
+)
+
+
+def find_key(key):
+    """(строка, столбец) клавиши в текущей раскладке"""
+    keymap = main.keymap_shift if main.shift_mode else main.keymap_normal
+    for row, keys in enumerate(keymap):
+        if key in keys:
+            return row, keys.index(key)
+    raise KeyError(key)
+
+
+def press(key):
+    """Нажатие и отпускание одной клавиши: события в очереди и состояние
+    после устранения дребезга, как их оставил бы debounce_keys"""
+    if key.startswith("nav:"):
+        bit = main.NAV_NAMES.index(key[4:])
+        code = main.KEY_NAV + bit
+        main.nav_keys[0] = 1 << bit
+    else:
+        row, col = find_key(key)
+        code = row * len(main.cols) + col
+        main.matrix_keys[0] = 1 << code
+    now = main.time.ticks_ms()
+    main.key_queue.put(now, code, True)
+    main.handle_key_events()
+    main.matrix_keys[0] = 0
+    main.nav_keys[0] = 0
+    main.key_queue.put(now, code, False)
+    main.handle_key_events()
+
+
+def render():
+    """Рисует кадр, если состояние изменилось, и передает его целиком"""
+    if main.state_version != main.drawn_version:
+        main.update_display()
+    while main.flush_display():
+        pass
+
+
+def main_run(out_dir):
+    os.makedirs(out_dir, exist_ok=True)
+    display = main.i2c.display
+    main.update_display()  # Первый кадр, как в main.main()
+    failures = 0
+    print("frame        bus bytes  data bytes")
+    for name, keys in SCRIPT:
+        bus = display.bus_bytes
+        data = display.data_bytes
+        for key in keys:
+            press(key)
+        render()
+        if display.frame() != bytes(main.oled.shadow):
+            print("%s: display RAM differs from the driver shadow copy" % name)
+            failures += 1
+        display.save(os.path.join(out_dir, name + ".pbm"))
+        display.save(os.path.join(out_dir, name + ".png"), PNG_SCALE)
+        print("%-12s %9d %11d" % (name, display.bus_bytes - bus, display.data_bytes - data))
+    print("total bus bytes: %d, transactions: %d" % (display.bus_bytes, display.transactions))
+    return failures
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        out_dir = sys.argv[1]
+    else:
+        out_dir = tempfile.mkdtemp(prefix="calc_frames_")
+        print("frames: %s" % out_dir)
+    sys.exit(1 if main_run(out_dir) else 0)
@@ -0,0 +1,178 @@
+# Эмулятор контроллера SSD1306 на шине I2C
+# Разбирает байты, которые драйвер ssd1306.SSD1306_I2C отправляет по шине
+# (управляющий байт, команды, данные), и ведет копию памяти дисплея.
+# Кадр сохраняется как изображение 128x64 в форматах PBM и PNG.
+
+import struct
+import zlib
+
+# Команда -> количество байтов параметров (остальные команды без параметров)
+PARAMS = {
+    0x20: 1,  # SET_MEM_ADDR
+    0x21: 2,  # SET_COL_ADDR
+    0x22: 2,  # SET_PAGE_ADDR
+    0x81: 1,  # SET_CONTRAST
+    0x8d: 1,  # SET_CHARGE_PUMP
+    0xa8: 1,  # SET_MUX_RATIO
+    0xd3: 1,  # SET_DISP_OFFSET
+    0xd5: 1,  # SET_DISP_CLK_DIV
+    0xd9: 1,  # SET_PRECHARGE
+    0xda: 1,  # SET_COM_PIN_CFG
+    0xdb: 1,  # SET_VCOM_DESEL
+}
+
+
+class SSD1306Emulator:
+    """Память и состояние SSD1306, которые меняются байтами с шины I2C"""
+
+    def __init__(self, width=128, height=64):
+        self.width = width
+        self.height = height
+        self.pages = height // 8
+        self.ram = bytearray(self.pages * width)  # Память дисплея (MONO_VLSB)
+        self.on = False          # Дисплей включен (0xaf)
+        self.inverted = False    # Инверсия (0xa7)
+        self.contrast = 0x7f
+        self.col_start = 0       # Окно записи: столбцы и страницы
+        self.col_end = width - 1
+        self.page_start = 0
+        self.page_end = self.pages - 1
+        self.col = 0             # Текущий адрес записи
+        self.page = 0
+        self.command = None      # Команда, ждущая параметров
+        self.params = []
+        self.transactions = 0    # Транзакций на шине
+        self.bus_bytes = 0       # Байтов на шине (с байтом адреса)
+        self.data_bytes = 0      # Байтов данных в память дисплея
+
+    # ===== ШИНА =====
+    def i2c_write(self, payload):
+        """Одна транзакция записи: байты после адреса устройства"""
+        self.transactions += 1
+        self.bus_bytes += 1 + len(payload)
+        i = 0
+        n = len(payload)
+        while i < n:
+            control = payload[i]
+            i += 1
+            last = not (control & 0x80)  # Co=0: дальше до конца только данные/команды
+            is_data = control & 0x40     # D/C#
+            if last:
+                chunk = payload[i:]
+                i = n
+            else:
+                chunk = payload[i:i + 1]
+                i += 1
+            if is_data:
+                self.write_data(chunk)
+            else:
+                for cmd in chunk:
+                    self.write_command(cmd)
+
+    # ===== КОМАНДЫ И ДАННЫЕ =====
+    def write_command(self, byte):
+        if self.command is not None:
+            self.params.append(byte)
+            if len(self.params) == PARAMS[self.command]:
+                self._apply(self.command, self.params)
+                self.command = None
+            return
+        if byte in PARAMS:
+            self.command = byte
+            self.params = []
+            return
+        self._apply(byte, ())
+
+    def _apply(self, cmd, params):
+        if cmd == 0x21:
+            self.col_start, self.col_end = params
+            self.col = self.col_start
+        elif cmd == 0x22:
+            self.page_start, self.page_end = params
+            self.page = self.page_start
+        elif cmd == 0x81:
+            self.contrast = params[0]
+        elif cmd == 0xae or cmd == 0xaf:
+            self.on = cmd == 0xaf
+        elif cmd == 0xa6 or cmd == 0xa7:
+            self.inverted = cmd == 0xa7
+
+    def write_data(self, data):
+        """Запись в память в режиме горизонтальной адресации (SET_MEM_ADDR 0)"""
+        ram = self.ram
+        width = self.width
+        for byte in data:
+            ram[self.page * width + self.col] = byte
+            self.col += 1
+            if self.col > self.col_end:
+                self.col = self.col_start
+                self.page += 1
+                if self.page > self.page_end:
+                    self.page = self.page_start
+        self.data_bytes += len(data)
+
+    # ===== ИЗОБРАЖЕНИЕ =====
+    def frame(self):
+        """Снимок памяти дисплея (bytes в формате MONO_VLSB)"""
+        return bytes(self.ram)
+
+    def lit(self, x, y):
+        """Светится ли точка (с учетом включения и инверсии)"""
+        if not self.on:
+            return False
+        bit = (self.ram[(y >> 3) * self.width + x] >> (y & 7)) & 1
+        return bool(bit) != self.inverted
+
+    def rows(self):
+        """Изображение построчно: список строк из 0 и 1"""
+        return [[1 if self.lit(x, y) else 0 for x in range(self.width)]
+                for y in range(self.height)]
+
+    def to_pbm(self):
+        """Изображение в формате PBM (P4): 1 - черная точка, поэтому
+        светящиеся точки записываются нулями (белые на черном фоне)"""
+        out = bytearray(b"P4\n%d %d\n" % (self.width, self.height))
+        for row in self.rows():
+            for x in range(0, self.width, 8):
+                byte = 0
+                for bit in range(8):
+                    if x + bit < self.width and not row[x + bit]:
+                        byte |= 0x80 >> bit
+                out.append(byte)
+        return bytes(out)
+
+    def to_png(self, scale=1):
+        """Изображение в формате PNG (1 бит на точку), увеличенное в scale раз"""
+        raw = bytearray()
+        for row in self.rows():
+            line = bytearray()
+            byte = 0
+            bits = 0
+            for value in row:
+                for _ in range(scale):
+                    byte = (byte << 1) | value
+                    bits += 1
+                    if bits == 8:
+                        line.append(byte)
+                        byte = 0
+                        bits = 0
+            if bits:
+                line.append(byte << (8 - bits))
+            for _ in range(scale):
+                raw.append(0)  # Фильтр строки: без фильтра
+                raw += line
+        header = struct.pack(">IIBBBBB", self.width * scale, self.height * scale, 1, 0, 0, 0, 0)
+        return (b"\x89PNG\r\n\x1a\n" + _chunk(b"IHDR", header) +
+                _chunk(b"IDAT", zlib.compress(bytes(raw), 9)) + _chunk(b"IEND", b""))
+
+    def save(self, path, scale=1):
+        """Сохраняет изображение: формат по расширению (.pbm или .png)"""
+        data = self.to_pbm() if path.endswith(".pbm") else self.to_png(scale)
+        with open(path, "wb") as f:
+            f.write(data)
+
+
+def _chunk(kind, data):
+    """Блок PNG: длина, тип, данные, CRC"""
+    return (struct.pack(">I", len(data)) + kind + data +
+            struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF))
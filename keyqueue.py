@@ -0,0 +1,68 @@
+# Очередь событий клавиатуры фиксированного размера (кольцевой буфер)
+# Сканер кладет события (время, код клавиши, нажатие/отпускание, флаги), а
+# обработчики забирают их по порядку. Память выделяется один раз при
+# создании, put() и pop() ничего не выделяют, поэтому put() можно вызывать
+# из таймера или прерывания. Переполнение не теряет старые события:
+# новое событие отбрасывается и учитывается в счетчике overflow.
+
+from array import array
+
+KEY_PRESSED = 0x80  # Флаг нажатия в событии (без него - отпускание)
+KEY_REPEAT = 0x40   # Повтор удерживаемой клавиши (keyrepeat)
+KEY_LONG = 0x20     # Долгое нажатие (keyrepeat)
+KEY_CODE = 0x1F     # Маска кода клавиши в событии (коды 0..31)
+
+
+class KeyQueue:
+    """Кольцевой буфер событий: байт события (код | флаги) и время"""
+
+    def __init__(self, size=32):
+        self.size = size                      # Вместимость очереди
+        self.events = bytearray(size)         # Код клавиши и флаги
+        self.times = array('L', [0] * size)   # Время события (ticks_ms)
+        self.head = 0       # Индекс самого старого события
+        self.count = 0      # Сколько событий в очереди
+        self.overflow = 0   # Сколько событий отброшено из-за переполнения
+        self.time = 0       # Время события, которое последним вернул pop()
+        self.log = None     # Список для записи событий (для тестов), None - не писать
+
+    def put(self, time, code, pressed, flags=0):
+        """Добавляет событие (flags - KEY_REPEAT или KEY_LONG).
+        Возвращает False, если очередь полна"""
+        if self.count == self.size:
+            self.overflow += 1
+            return False
+        i = self.head + self.count
+        if i >= self.size:
+            i -= self.size
+        self.events[i] = (code | flags | KEY_PRESSED) if pressed else code
+        self.times[i] = time
+        self.count += 1
+        if self.log is not None:
+            self.log.append((time, code, bool(pressed), flags))
+        return True
+
+    def pop(self):
+        """Забирает самое старое событие: байт события или -1, если очередь пуста.
+        Время события остается в self.time"""
+        if not self.count:
+            return -1
+        i = self.head
+        self.time = self.times[i]
+        self.head = i + 1 if i + 1 < self.size else 0
+        self.count -= 1
+        return self.events[i]
+
+    def clear(self):
+        """Очищает очередь (счетчик переполнений сохраняется)"""
+        self.head = 0
+        self.count = 0
+
+    def replay(self, entries, start=0):
+        """Кладет записанные события entries[start:] (кортежи из log), пока есть
+        место. Возвращает индекс первого не поместившегося события"""
+        i = start
+        while i < len(entries) and self.count < self.size:
+            self.put(*entries[i])
+            i += 1
+        return i
@@ -0,0 +1,69 @@
+# Автоповтор и долгое нажатие клавиш
+# Работает по тактам сканирования: press()/release() вызываются при
+# подтвержденном нажатии и отпускании, tick() - в каждом такте, пока клавиша
+# удерживается. Повторяется только последняя нажатая клавиша (как на обычной
+# клавиатуре). Первый повтор - через delay мс, дальше интервал уменьшается
+# на accel мс за повтор, но не меньше min_interval. Долгое нажатие срабатывает
+# один раз через long_press мс удержания и останавливает повтор.
+# События кладутся в очередь KeyQueue с флагами KEY_REPEAT и KEY_LONG.
+# Все состояние - целые числа, в тактах ничего не выделяется.
+
+import time
+from keyqueue import KEY_REPEAT, KEY_LONG
+
+
+class KeyRepeat:
+    """Автоповтор и долгое нажатие для клавиш из масок repeat_mask и long_mask
+    (бит = код клавиши в очереди событий)"""
+
+    def __init__(self, queue, repeat_mask=0, long_mask=0, delay=500,
+                 interval=200, min_interval=50, accel=25, long_press=1000):
+        self.queue = queue                # Очередь, куда кладутся события
+        self.repeat_mask = repeat_mask    # Клавиши с автоповтором
+        self.long_mask = long_mask        # Клавиши с долгим нажатием
+        self.delay = delay                # Задержка перед первым повтором, мс
+        self.interval = interval          # Начальный интервал повтора, мс
+        self.min_interval = min_interval  # Самый короткий интервал, мс
+        self.accel = accel                # Уменьшение интервала за повтор, мс
+        self.long_press = long_press      # Удержание для долгого нажатия, мс
+        self.key = -1        # Удерживаемая клавиша (-1 - нет)
+        self.pressed_at = 0  # Время нажатия
+        self.next_at = 0     # Время следующего повтора
+        self.step = 0        # Текущий интервал повтора
+        self.long_done = False  # Долгое нажатие уже сработало
+
+    def press(self, code, now):
+        """Подтвержденное нажатие: следим за этой клавишей"""
+        if not (self.repeat_mask | self.long_mask) >> code & 1:
+            self.key = -1  # Новая клавиша без повтора прерывает повтор старой
+            return
+        self.key = code
+        self.pressed_at = now
+        self.next_at = time.ticks_add(now, self.delay)
+        self.step = self.interval
+        self.long_done = False
+
+    def release(self, code):
+        """Подтвержденное отпускание"""
+        if code == self.key:
+            self.key = -1
+
+    def tick(self, now):
+        """Такт сканирования: кладет в очередь повторы и долгое нажатие"""
+        code = self.key
+        if code < 0:
+            return
+        if self.long_mask >> code & 1 and not self.long_done and \
+                time.ticks_diff(now, self.pressed_at) >= self.long_press:
+            self.long_done = True
+            self.queue.put(now, code, True, KEY_LONG)
+            return
+        if self.long_done or not self.repeat_mask >> code & 1:
+            return
+        if time.ticks_diff(now, self.next_at) >= 0:
+            self.queue.put(now, code, True, KEY_REPEAT)
+            self.next_at = time.ticks_add(now, self.step)
+            if self.step - self.accel >= self.min_interval:
+                self.step -= self.accel
+            else:
+                self.step = self.min_interval
@@ -0,0 +1,78 @@
+# Ограниченный LRU-кэш (least recently used) для ESP32
+# Ограничение одновременно по количеству записей и по оценке занятых байт.
+# Самая давно использованная запись вытесняется первой.
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ucollections import OrderedDict
+
+
+class LRUCache:
+    """LRU-кэш с лимитом записей и байт, счетчиками попаданий и промахов"""
+
+    def __init__(self, max_entries=32, max_bytes=4096):
+        self.max_entries = max_entries  # Максимум записей
+        self.max_bytes = max_bytes      # Максимум байт (оценка размера записей)
+        self.hits = 0                   # Сколько раз значение нашлось в кэше
+        self.misses = 0                 # Сколько раз значения не было
+        self.bytes = 0                  # Текущий занятый объем
+        self._data = OrderedDict()      # ключ -> (значение, размер), старые в начале
+
+    def get(self, key, default=None):
+        """Возвращает значение по ключу и помечает его как недавно использованное"""
+        item = self._data.pop(key, None)
+        if item is None:
+            self.misses += 1
+            return default
+        self._data[key] = item  # Переносим в конец (самое свежее)
+        self.hits += 1
+        return item[0]
+
+    def put(self, key, value, size=0):
+        """Сохраняет значение. size - оценка размера записи в байтах"""
+        old = self._data.pop(key, None)
+        if old is not None:
+            self.bytes -= old[1]
+        if size > self.max_bytes or self.max_entries <= 0:
+            return  # Запись больше всего бюджета - не кэшируем
+        self._data[key] = (value, size)
+        self.bytes += size
+        self._trim()
+
+    def _trim(self):
+        """Вытесняет старые записи, пока не уложимся в лимиты"""
+        data = self._data
+        while data and (len(data) > self.max_entries or self.bytes > self.max_bytes):
+            oldest = next(iter(data))
+            self.bytes -= data.pop(oldest)[1]
+
+    def configure(self, max_entries=None, max_bytes=None):
+        """Меняет лимиты кэша (лишние записи сразу вытесняются)"""
+        if max_entries is not None:
+            self.max_entries = max_entries
+        if max_bytes is not None:
+            self.max_bytes = max_bytes
+        self._trim()
+
+    def clear(self):
+        """Полностью очищает кэш и сбрасывает счетчики"""
+        self._data = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self):
+        """Возвращает статистику кэша в виде словаря"""
+        return {
+            'entries': len(self._data),
+            'bytes': self.bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
+
+    def __len__(self):
+        return len(self._data)
+
+    def __contains__(self, key):
+        return key in self._data
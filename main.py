@@ -1,19 +1,40 @@
 # Импортируем необходимые модули
-from machine import Pin, SoftI2C, Timer  # Для работы с пинами, I2C и таймерами
+from machine import Pin, I2C, SoftI2C, Timer  # Для работы с пинами, I2C и таймерами
 import ssd1306  # Для работы с OLED дисплеем
 import time  # Для работы со временем
-import math  # Для математических функций
-import re  # Для регулярных выражений
-from calc_parser import evaluate_expression  # Наш парсер математических выражений
+from calc_parser import evaluate_expression, LiveParser  # Наш парсер математических выражений
+from calc_parser import NUMBER_MODES, set_number_mode, get_number_mode  # Режимы чисел
+from calc_parser import CalcError  # Ошибка разбора выражения (для графиков)
+from fixedpoint import FixedDecimal, format_scaled  # Десятичные числа с фиксированной точкой
+from rational import Rational  # Точные дроби
+from tiles import TileCache, STYLE_BOX, STYLE_LARGE  # Готовые надписи для blit
+from tiles import STYLE_BIG2, STYLE_BIG3  # Результат крупным шрифтом
+import bigfont  # Крупные цифры для результата
+from gfx import GFX  # Графические примитивы (линии для графиков)
+from plot import Plot, ZOOM_FACTOR, PAN_COLUMNS  # График функции y = f(x)
+from keyqueue import KeyQueue, KEY_PRESSED, KEY_LONG, KEY_CODE  # Очередь событий клавиатуры
+from keyrepeat import KeyRepeat  # Автоповтор и долгое нажатие
+try:
+    import asyncio  # Кооперативные задачи главного цикла
+except ImportError:
+    import uasyncio as asyncio  # Старые версии MicroPython
 
 # ВЕРСИЯ 7.1 - ИСПРАВЛЕННО ОТОБРАЖЕНИЕ КОНСТАНТ
 
 # ===== НАСТРОЙКА ДИСПЛЕЯ =====
 # Создаем I2C интерфейс на пинах 47 (SCL) и 21 (SDA)
-i2c = SoftI2C(scl=Pin(47), sda=Pin(21))
+I2C_HARDWARE = True  # True - аппаратный I2C, False - программный SoftI2C
+I2C_FREQ = 400000    # Частота шины I2C в Гц (SSD1306 рассчитан на 400 кГц)
+if I2C_HARDWARE:
+    i2c = I2C(0, scl=Pin(47), sda=Pin(21), freq=I2C_FREQ)
+else:
+    i2c = SoftI2C(scl=Pin(47), sda=Pin(21), freq=I2C_FREQ)
 W = 128  # Ширина дисплея в пикселях
 H = 64   # Высота дисплея в пикселях
 oled = ssd1306.SSD1306_I2C(W, H, i2c)  # Создаем объект дисплея
+oled.diff = True  # show() сравнивает кадр с предыдущим и передает только изменения
+tiles = TileCache(32, 3072)  # Кэш надписей: до 32 штук и 3 КБ буферов
+gfx = GFX.from_framebuf(oled, W, H, oled.buffer)  # Линии графика рисуются методами framebuf
 
 # ===== НАСТРОЙКА GPIO =====
 # Создаем список пинов для строк матричной клавиатуры (выходы)
@@ -62,19 +83,97 @@ keymap_shift = [
     ['sin', 'cos', 'tan', 'log', 'ln', 'BS'],     # Ряд 1: тригонометрия, логарифмы, backspace
     ['pi', 'e', 'sqrt', '!', '(', ')'],           # Ряд 2: константы, корень, факториал, скобки
     ['1/x', 'x²', 'x³', '±', '=', 'SHIFT'],       # Ряд 3: обратное, квадрат, куб, смена знака, равно, переключение
-    ['0', '.', '%', '+', '^', 'MENU']             # Ряд 4: ноль, точка, процент, плюс, степень, меню
+    ['0', '.', 'x', '+', '^', 'MENU']             # Ряд 4: ноль, точка, переменная x, плюс, степень, меню
 ]
 
+# Научные клавиши -> шаблон вызова в выражении (разбирается calc_parser)
+SCIENTIFIC_TEMPLATES = {
+    'sin': "sin({})",    # Синус угла в градусах
+    'cos': "cos({})",    # Косинус угла в градусах
+    'tan': "tan({})",    # Тангенс угла в градусах
+    'log': "log({})",    # Десятичный логарифм
+    'ln': "ln({})",      # Натуральный логарифм
+    'sqrt': "sqrt({})",  # Квадратный корень
+    '!': "fact({})",     # Факториал
+    '1/x': "1/({})",     # Обратная величина
+    'x²': "({})²",       # Квадрат числа
+    'x³': "({})³",       # Куб числа
+    '±': "-({})",        # Смена знака
+}
+
+# Клавиши матрицы по номерам битов: бит (строка * 6 + столбец)
+MATRIX_KEYS = len(rows) * len(cols)  # 24 клавиши
+keys_normal = tuple(key for row in keymap_normal for key in row)
+keys_shift = tuple(key for row in keymap_shift for key in row)
+KEY_BS = keys_normal.index('BS')  # Backspace - на одном месте в обеих раскладках
+
+# Навигационные кнопки по номерам битов (код в очереди событий - KEY_NAV + бит)
+KEY_NAV = MATRIX_KEYS
+NAV_NAMES = ('up', 'down', 'left', 'right', 'enter')
+NAV_UP = 1
+NAV_DOWN = 2
+NAV_LEFT = 4
+NAV_RIGHT = 8
+NAV_ENTER = 16
+KEY_ENTER = KEY_NAV + 4  # Код ENTER в очереди событий
+nav_pins = tuple(nav_buttons[name] for name in NAV_NAMES)
+
 # ===== ГЛОБАЛЬНЫЕ ПЕРЕМЕННЫЕ =====
-stable_matrix_keys = []  # Стабильное состояние клавиш матрицы (после устранения дребезга)
-last_matrix_keys = []    # Предыдущее состояние клавиш матрицы
-stable_nav_keys = []     # Стабильное состояние навигационных кнопок
-last_nav_keys = []       # Предыдущее состояние навигационных кнопок
-pressed_keys_history = set()  # История нажатых клавиш (для обнаружения новых нажатий)
-pressed_nav_history = set()   # История нажатых навигационных кнопок
+# Состояние клавиатуры - битовые маски: [стабильное состояние, клавиши,
+# у которых счетчик дребезга еще не дошел до края]. Для каждой клавиши
+# свой интегрирующий счетчик: +1 за сканирование с нажатием, -1 без него;
+# клавиша нажата, когда счетчик дошел до DEBOUNCE_SCANS, и отпущена на 0
+DEBOUNCE_SCANS = 2                  # Сканирований подряд для смены состояния
+matrix_keys = [0, 0]                # Клавиши матрицы (24 бита)
+nav_keys = [0, 0]                   # Навигационные кнопки (5 бит)
+matrix_counts = bytearray(MATRIX_KEYS)  # Счетчики дребезга клавиш матрицы
+nav_counts = bytearray(len(NAV_NAMES))  # ... и навигационных кнопок
+# Нажатия и отпускания после устранения дребезга: сканер кладет их в очередь
+# со временем, handle_key_events забирает по порядку. Два быстрых нажатия
+# между вызовами handle_key_events не сливаются в одно
+key_queue = KeyQueue(32)
 
+# Автоповтор по тактам сканирования: BS и стрелки повторяются при удержании
+# (интервал сокращается на REPEAT_ACCEL_MS за повтор), долгое BS - очистка
+REPEAT_DELAY_MS = 500     # Удержание до первого повтора
+REPEAT_INTERVAL_MS = 200  # Первый интервал между повторами
+REPEAT_MIN_MS = 50        # Самый короткий интервал (не меньше такта опроса)
+REPEAT_ACCEL_MS = 25      # Ускорение: на сколько сокращается интервал
+LONG_PRESS_MS = 1500      # Долгое нажатие BS
+key_repeat = KeyRepeat(
+    key_queue,
+    (1 << KEY_BS) | (NAV_UP | NAV_DOWN | NAV_LEFT | NAV_RIGHT) << KEY_NAV,
+    1 << KEY_BS,
+    REPEAT_DELAY_MS, REPEAT_INTERVAL_MS, REPEAT_MIN_MS, REPEAT_ACCEL_MS, LONG_PRESS_MS)
+
+SCAN_PERIOD_MS = 50       # Период опроса клавиатуры
 scan_flag = bytearray(1)  # Флаг для синхронизации сканирования клавиатуры
-display_tick = 0          # Счетчик для обновления дисплея
+
+# Простой клавиатуры: пока ничего не нажато, все строки держатся в 0 и
+# нажатие любой клавиши дает спад на столбце (или на навигационной кнопке).
+# Прерывание по спаду будит сканирование, а до него такты таймера пропускаются
+KEYPAD_IDLE = True        # False - сканировать матрицу каждый такт, как раньше
+keypad_idle = False       # Клавиатура сейчас в простое
+wake_flag = bytearray(1)  # Было прерывание от клавиши в простое
+
+# Асинхронный главный цикл: задачи опроса клавиатуры, обработки событий,
+# вывода на дисплей и вычисления превью ждут событий или своего срока,
+# а между ними процессор спит. События создает start_tasks()
+USE_ASYNCIO = True    # False - прежний цикл, опрашивающий scan_flag
+wake_event = None     # Прерывание от клавиши в простое (из обработчика IRQ)
+key_event = None      # В key_queue появились события
+display_event = None  # Состояние изменилось - нужен новый кадр
+eval_event = None     # Выражение изменилось - нужно пересчитать превью
+task_wakeups = 0      # Сколько раз просыпались задачи (для оценки простоя)
+
+# Перерисовка по изменениям: обработчики увеличивают версию состояния,
+# а экран перерисовывается, только если версия отличается от нарисованной
+state_version = 0    # Версия состояния калькулятора, меню и "О программе"
+drawn_version = 0    # Версия, которая сейчас на экране (первый кадр - main или start_tasks)
+changed_at = 0       # Время (мкс) первого изменения, которого еще нет на экране
+flushing = False     # Кадр с изменениями еще передается на дисплей
+last_latency_us = 0  # Задержка от нажатия до вывода на экран (последняя)
+max_latency_us = 0   # ... и максимальная
 
 # Переменные калькулятора
 expression = ""      # Полное математическое выражение (например: "789+1")
@@ -83,8 +182,14 @@ result = ""          # Результат вычислений
 shift_mode = False   # Режим научного калькулятора (True - научный, False - базовый)
 menu_mode = False    # Режим меню (True - открыто меню, False - калькулятор)
 menu_position = 0    # Текущая позиция в меню
-last_nav_action = 0  # Время последнего нажатия навигационной кнопки
 reset_on_next_input = False  # Флаг сброса при следующем вводе
+live_parser = LiveParser()   # Инкрементальный разбор выражения по мере ввода
+preview = ""                 # Предварительный результат под выражением
+
+# Режим графика функции
+plot_mode = False    # Показывается график функции от x
+plot = Plot(W, H)    # График на весь экран
+MENU_SIZE = 5        # Количество пунктов меню
 
 # Режим "О программе"
 about_mode = False   # Режим просмотра информации о программе
@@ -104,62 +209,89 @@ E = 2.718281828459045   # Число e с 15 знаками после запя
 DEBUG = False  # Режим отладки (вывод дополнительной информации)
 
 # ===== ФУНКЦИИ ДЛЯ РАБОТЫ С ДИСПЛЕЕМ =====
+# Постоянные надписи (меню, страницы, индикатор режима, результат) выводятся
+# из кэша готовых тайлов одним blit, а не рисуются заново каждый кадр
 def center_text(text, y):
     """Выравнивает текст по центру экрана на заданной высоте y"""
     x = (W - len(text) * 8) // 2  # Вычисляем позицию x для центрирования (8 пикселей на символ)
     if x < 0:  # Если текст слишком длинный, начинаем с левого края
         x = 0
-    oled.text(text, x, y)  # Выводим текст на дисплей
+    tiles.draw(oled, text, x, y)  # Выводим текст на дисплей
 
 def draw_inverted_box(text, x, y):
     """Рисует текст в инвертированном прямоугольнике (белый фон, черный текст)"""
-    width = len(text) * 8 + 4  # Ширина прямоугольника (8 пикселей на символ + отступы)
-    height = 10  # Высота прямоугольника
-    # Рисуем белый прямоугольник (заливаем область)
-    oled.fill_rect(x, y, width, height, 1)
-    # Рисуем черный текст поверх белого прямоугольника
-    oled.text(text, x + 2, y + 1, 0)
+    # Прямоугольник шириной 8 пикселей на символ + 4, высотой 10
+    tiles.draw(oled, text, x, y, STYLE_BOX)
+
+def large_result_style(text):
+    """Самый крупный стиль результата, при котором текст помещается по ширине"""
+    if bigfont.supports(text):
+        for style in (STYLE_BIG3, STYLE_BIG2):
+            if tiles.width(text, style) <= W:
+                return style
+    return STYLE_LARGE  # Обычный шрифт 8x8 (до 16 символов)
 
 def draw_large_inverted_result(text, y):
     """Рисует крупный инвертированный результат по центру экрана"""
-    text_width = len(text) * 8  # Ширина текста в пикселях
-    box_width = text_width + 8  # Ширина прямоугольника с отступами
-    box_height = 14  # Высота прямоугольника
+    style = large_result_style(text)
+    if style == STYLE_LARGE and len(text) > 16:
+        text = text[-16:]  # Обычным шрифтом помещаются последние 16 символов
+    box_width = tiles.width(text, style)  # Ширина текста с отступами
     x_pos = (W - box_width) // 2  # Позиция x для центрирования
-    
-    # Рисуем белый прямоугольник
-    oled.fill_rect(x_pos, y, box_width, box_height, 1)
-    # Рисуем черный текст поверх с отступами
-    oled.text(text, x_pos + 4, y + 3, 0)
+    # Белый прямоугольник с черным текстом внутри
+    tiles.draw(oled, text, x_pos, y, style)
+
+def draw_inverted_input(text, y):
+    """Рисует набираемое число черным текстом в белом прямоугольнике (без кэша)"""
+    box_width = len(text) * 8 + 8  # Ширина текста с отступами (как STYLE_LARGE)
+    x_pos = (W - box_width) // 2  # Позиция x для центрирования
+    oled.fill_rect(x_pos, y, box_width, 14, 1)  # Белый прямоугольник
+    oled.text(text, x_pos + 4, y + 3, 0)  # Черный текст с отступами
+
+def mark_changed():
+    """Отмечает изменение состояния: экран будет перерисован в этом же цикле"""
+    global state_version, changed_at
+    if state_version == drawn_version and not flushing:
+        changed_at = time.ticks_us()  # Отсюда считаем задержку до вывода
+    state_version += 1
 
 def update_display():
     """Обновляет содержимое дисплея в зависимости от текущего режима"""
+    global drawn_version, flushing
+    if state_version != drawn_version:
+        flushing = True  # Задержку посчитаем, когда кадр будет передан
+    drawn_version = state_version
     oled.fill(0)  # Очищаем дисплей (заполняем черным)
     
-    if about_mode:
+    if plot_mode:
+        # Режим графика: оси и кривая на весь экран
+        plot.draw(gfx)
+        
+    elif about_mode:
         # Режим "О программе"
         page = about_pages[about_page]  # Получаем текущую страницу
         for i, line in enumerate(page):
             if i < 4:  # Выводим до 4 строк на странице
                 center_text(line, 5 + i * 12)  # Центрируем каждую строку
         # Отображаем номер страницы и подсказку по управлению
-        oled.text(f"Page {about_page + 1}/{len(about_pages)}", 0, 55)
-        oled.text("UP/DOWN=MENU", 70, 55)
+        tiles.draw(oled, f"Page {about_page + 1}/{len(about_pages)}", 0, 55)
+        tiles.draw(oled, "UP/DOWN=MENU", 70, 55)
         
     elif menu_mode:
         # Режим меню
         center_text("MAIN MENU", 0)  # Заголовок меню по центру
-        menu_items = ["Basic Calc", "Scientific", "Settings", "About"]  # Пункты меню
+        # Пункты меню (в пункте настроек показываем текущий режим чисел)
+        menu_items = ["Basic Calc", "Scientific", "Num: " + get_number_mode(), "Plot", "About"]
         
         # Отображаем все пункты меню
         for i, item in enumerate(menu_items):
             if i == menu_position:
                 # Текущий выбранный пункт выделяем стрелкой
-                oled.text(f"> {item}", 10, 15 + i * 10)
+                tiles.draw(oled, f"> {item}", 10, 11 + i * 9)
             else:
                 # Остальные пункты без выделения
-                oled.text(f"  {item}", 10, 15 + i * 10)
-        oled.text("ENTER=Select", 0, 55)  # Подсказка внизу экрана
+                tiles.draw(oled, f"  {item}", 10, 11 + i * 9)
+        tiles.draw(oled, "ENTER=Select", 0, 56)  # Подсказка внизу экрана
         
     else:
         # ОСНОВНОЙ РЕЖИМ КАЛЬКУЛЯТОРА (в стиле Windows Calculator)
@@ -181,6 +313,11 @@ def update_display():
                 display_expr = "..." + display_expr[-17:]  # Показываем последние 17 символов
             oled.text(display_expr, 0, 2)  # Выводим выражение в верхней части
         
+        # Предварительный результат под выражением (пока не нажато "=")
+        if preview:
+            preview_text = "=" + preview[-15:]
+            oled.text(preview_text, W - len(preview_text) * 8, 12)
+        
         # 2. Основное поле - инвертированный результат или обычный текущий ввод
         display_text = result if result else current_input  # Что показывать: результат или ввод
         
@@ -190,9 +327,14 @@ def update_display():
                 display_text = display_text[-16:]  # Показываем последние 16 символов
             
             # ИНВЕРТИРОВАННЫЙ РЕЗУЛЬТАТ ДЛЯ ВСЕХ РЕЖИМОВ
-            if result or (not expression and current_input != "0" and current_input != "Error"):
+            if result or (not expression and reset_on_next_input
+                          and current_input != "0" and current_input != "Error"):
                 # Показываем результат вычислений ИЛИ прямое вычисление научной функции
-                draw_large_inverted_result(display_text, 22)  # Крупный инвертированный текст
+                draw_large_inverted_result(display_text, 22)  # Готовая надпись из кэша
+            elif not expression and current_input != "0" and current_input != "Error":
+                # Набираемое первое число - тот же белый прямоугольник, но без кэша:
+                # каждое нажатие дает новую строку, и ее тайл больше не понадобится
+                draw_inverted_input(display_text, 22)
             else:
                 # Текущий ввод в выражении - обычный текст по центру
                 text_width = len(display_text) * 8
@@ -203,74 +345,116 @@ def update_display():
         mode_text = "S" if shift_mode else "B"  # S - научный, B - базовый
         draw_inverted_box(mode_text, W - 12, H - 10)  # Маленький инвертированный квадрат
     
+    # Снимок кадра передается на дисплей по одной странице между
+    # сканированиями клавиатуры (см. flush_display), а не одним блоком
+    oled.begin_flush()
+
+def flush_display():
+    """Передает на дисплей следующую страницу кадра. False - передавать нечего"""
+    global flushing, last_latency_us, max_latency_us
     try:
-        oled.show()  # Обновляем дисплей (выводим буфер на экран)
+        if oled.flush_step():
+            return True
     except OSError:
-        pass  # Игнорируем ошибки вывода (например, если дисплей отключен)
+        oled.clear_dirty()  # Игнорируем ошибки вывода (например, если дисплей отключен)
+    
+    # Задержка от нажатия клавиши до пикселей на экране
+    if flushing:
+        flushing = False
+        last_latency_us = time.ticks_diff(time.ticks_us(), changed_at)
+        if last_latency_us > max_latency_us:
+            max_latency_us = last_latency_us
+        if DEBUG:
+            print(f"Latency: {last_latency_us} us (max {max_latency_us} us)")
+    return False
 
 # ===== СКАНИРОВАНИЕ КЛАВИАТУРЫ =====
 def fast_scan_matrix():
-    """Быстро сканирует матричную клавиатуру и возвращает нажатые клавиши"""
-    pressed_keys = []  # Список нажатых клавиш
+    """Быстро сканирует матричную клавиатуру: маска нажатых клавиш (бит строка*6+столбец)"""
+    pressed = 0  # Маска нажатых клавиш
+    bit = 1      # Бит текущей клавиши
     
     # Проходим по всем строкам матрицы
-    for row_num, row_pin in enumerate(rows):
+    for row_pin in rows:
         row_pin.value(0)  # Активируем текущую строку (устанавливаем в 0)
         time.sleep_us(80)  # Короткая задержка для стабилизации
         
         # Проверяем все столбцы в активированной строке
-        for col_num, col_pin in enumerate(cols):
+        for col_pin in cols:
             if col_pin.value() == 0:  # Если клавиша нажата (сигнал 0)
-                time.sleep_us(50)  # Задержка для устранения дребезга
-                if col_pin.value() == 0:  # Подтверждаем нажатие
-                    # Определяем символ клавиши в зависимости от режима
-                    if shift_mode:
-                        key_char = keymap_shift[row_num][col_num]  # Научный режим
-                    else:
-                        key_char = keymap_normal[row_num][col_num]  # Базовый режим
-                    pressed_keys.append((row_num, col_num, key_char))  # Добавляем в список
+                pressed |= bit  # Дребезг отсеивают счетчики в debounce_keys
+            bit <<= 1
         
         row_pin.value(1)  # Деактивируем строку
         time.sleep_us(40)  # Короткая задержка
     
-    return pressed_keys  # Возвращаем список нажатых клавиш
+    return pressed  # Возвращаем маску нажатых клавиш
 
 def fast_scan_nav():
-    """Сканирует навигационные кнопки и возвращает нажатые"""
-    pressed_nav = []  # Список нажатых навигационных кнопок
-    for name, button in nav_buttons.items():  # Проходим по всем кнопкам
-        try:
-            if button.value() == 0:  # Если кнопка нажата
-                time.sleep_us(50)  # Задержка для устранения дребезга
-                if button.value() == 0:  # Подтверждаем нажатие
-                    pressed_nav.append(name)  # Добавляем имя кнопки в список
-        except:
-            pass  # Игнорируем ошибки чтения (для надежности работы)
-    return pressed_nav  # Возвращаем список нажатых кнопок
+    """Сканирует навигационные кнопки: маска нажатых (NAV_UP, NAV_DOWN, ...)"""
+    pressed = 0
+    bit = 1
+    for button in nav_pins:  # Проходим по всем кнопкам
+        if button.value() == 0:  # Если кнопка нажата
+            pressed |= bit
+        bit <<= 1
+    return pressed
+
+def debounce_mask(raw, keys, counts):
+    """Обновляет счетчики дребезга по маске raw и состояние keys = [маска, ожидающие].
+    Возвращает маску клавиш, которые нажались или отпустились"""
+    state = keys[0]
+    work = (raw ^ state) | keys[1]  # Клавиши, у которых что-то меняется
+    if not work:
+        return 0  # Обычный случай: ничего не нажимали и не отпускали
+    changed = state
+    pending = 0
+    bit = 1
+    for i in range(len(counts)):
+        if work & bit:
+            count = counts[i]
+            if raw & bit:
+                if count < DEBOUNCE_SCANS:
+                    count += 1
+                if count == DEBOUNCE_SCANS:
+                    state |= bit  # Нажатие подтверждено
+            else:
+                if count > 0:
+                    count -= 1
+                if count == 0:
+                    state &= ~bit  # Отпускание подтверждено
+            counts[i] = count
+            if 0 < count < DEBOUNCE_SCANS:
+                pending |= bit
+        bit <<= 1
+    keys[0] = state
+    keys[1] = pending
+    return changed ^ state
+
+def queue_changes(now, changed, state, code):
+    """Кладет в очередь события клавиш из маски changed (code - код первого бита)"""
+    while changed:
+        if changed & 1:
+            key_queue.put(now, code, state & 1)
+            if state & 1:
+                key_repeat.press(code, now)
+            else:
+                key_repeat.release(code)
+        changed >>= 1
+        state >>= 1
+        code += 1
 
 def debounce_keys(current_matrix, current_nav):
-    """Устраняет дребезг контактов, сравнивая текущее и предыдущее состояние"""
-    global last_matrix_keys, last_nav_keys, stable_matrix_keys, stable_nav_keys
-    
-    # Преобразуем текущие и предыдущие состояния в множества для сравнения
-    current_set = set((r, c, k) for r, c, k in current_matrix)
-    last_set = set((r, c, k) for r, c, k in last_matrix_keys)
-    
-    # Если текущее состояние совпадает с предыдущим - клавиши стабильны
-    if current_set == last_set:
-        stable_matrix_keys = current_matrix
-    else:
-        stable_matrix_keys = []  # Иначе - состояние нестабильно
-    
-    # Аналогично для навигационных кнопок
-    if set(current_nav) == set(last_nav_keys):
-        stable_nav_keys = current_nav
-    else:
-        stable_nav_keys = []
-    
-    # Сохраняем текущее состояние как предыдущее для следующего вызова
-    last_matrix_keys = current_matrix
-    last_nav_keys = current_nav
+    """Устраняет дребезг контактов (у каждой клавиши свой счетчик) и
+    кладет подтвержденные нажатия, отпускания и повторы в очередь событий"""
+    changed_matrix = debounce_mask(current_matrix, matrix_keys, matrix_counts)
+    changed_nav = debounce_mask(current_nav, nav_keys, nav_counts)
+    if changed_matrix | changed_nav:
+        now = time.ticks_ms()
+        queue_changes(now, changed_matrix, matrix_keys[0], 0)
+        queue_changes(now, changed_nav, nav_keys[0], KEY_NAV)
+    if key_repeat.key >= 0:
+        key_repeat.tick(time.ticks_ms())  # Удерживается клавиша с повтором
 
 # ===== ВСПОМОГАТЕЛЬНЫЕ ФУНКЦИИ =====
 def round_result(value):
@@ -279,6 +463,15 @@ def round_result(value):
     if isinstance(value, str) and value == "Error":
         return "Error"
     
+    # Точные режимы (DEC, FRAC): погрешности float нет - в десятичную
+    # запись переводим только здесь, при выводе на экран
+    if isinstance(value, (FixedDecimal, Rational)):
+        return value.format(16)
+    
+    # Большие точные целые (например, 100!) показываем как 9.332621544e+157
+    if isinstance(value, int) and len(str(value)) > 16:
+        return format_scaled(value, 0, 16)
+    
     try:
         # Преобразуем значение в число, если оно строковое
         if isinstance(value, str):
@@ -311,9 +504,16 @@ def round_result(value):
 def handle_digit_input(digit):
     """Обрабатывает ввод цифр"""
     global current_input, reset_on_next_input, result
+    mark_changed()
     
     # Если текущий ввод "0" или "Error", или нужен сброс - заменяем текущий ввод
-    if current_input == "0" or current_input == "Error" or reset_on_next_input:
+    if 'x' in current_input and not reset_on_next_input:
+        # После переменной число становится множителем: x5 = x*5
+        if current_input[-1] == 'x':
+            current_input += '*'
+        current_input += digit
+        result = ""
+    elif current_input == "0" or current_input == "Error" or reset_on_next_input:
         current_input = digit
         reset_on_next_input = False
         result = ""  # Сбрасываем результат при новом вводе
@@ -326,6 +526,7 @@ def handle_digit_input(digit):
 def handle_decimal_point():
     """Обрабатывает ввод десятичной точки"""
     global current_input, reset_on_next_input, result
+    mark_changed()
     
     # Если текущий ввод "0" или нужен сброс - начинаем с "0."
     if current_input == "0" or current_input == "Error" or reset_on_next_input:
@@ -340,6 +541,7 @@ def handle_decimal_point():
 def handle_backspace():
     """Обрабатывает удаление последнего символа (Backspace)"""
     global current_input, expression, reset_on_next_input, result
+    mark_changed()
     
     if current_input == "Error":
         # Если была ошибка - полностью сбрасываем калькулятор
@@ -359,6 +561,7 @@ def handle_backspace():
 def handle_clear():
     """Обрабатывает полную очистку калькулятора (C)"""
     global current_input, expression, reset_on_next_input, result
+    mark_changed()
     current_input = "0"
     expression = ""
     result = ""
@@ -367,6 +570,7 @@ def handle_clear():
 def handle_operation(op):
     """Обрабатывает ввод математических операций (+, -, *, /)"""
     global current_input, expression, reset_on_next_input, result
+    mark_changed()
     
     if current_input != "Error":  # Если нет ошибки
         reset_on_next_input = False
@@ -393,9 +597,26 @@ def handle_operation(op):
             # Просто добавляем оператор к выражению
             expression += op
 
+def update_preview():
+    """Обновляет предварительный результат после нажатия клавиши"""
+    global preview
+    
+    # Превью нужно только пока выражение набирается и результата еще нет
+    if result or not expression or current_input == "Error":
+        preview = ""
+        return
+    
+    # Превью считаем по тому же тексту, что виден в верхней строке.
+    # Разбираем только добавленные/удаленные символы: пока expression не
+    # менялось, сравнивается лишь вводимое число
+    live_parser.sync(expression, current_input if current_input != "0" else "")
+    value = live_parser.value()
+    preview = "" if value is None else round_result(value)
+
 def handle_equals():
     """Обрабатывает вычисление выражения (=)"""
     global current_input, expression, reset_on_next_input, result
+    mark_changed()
     
     # Если есть выражение или текущий ввод не "0"
     if (expression or current_input != "0") and current_input != "Error":
@@ -405,6 +626,11 @@ def handle_equals():
         if current_input != "0" or (expression and expression[-1] in ['+', '-', '*', '/', '^', '(']):
             full_expression += current_input
         
+        # Выражение с переменной x не вычисляется, а строится его график
+        if 'x' in full_expression:
+            start_plot(full_expression)
+            return
+        
         # Вычисляем результат с помощью нашего парсера
         calculated_result = evaluate_expression(full_expression)
         
@@ -418,6 +644,7 @@ def handle_equals():
 def handle_percent():
     """ПРОСТАЯ РЕАЛИЗАЦИЯ ПРОЦЕНТА: x% = x / 100 (вариант A)"""
     global current_input, reset_on_next_input, result
+    mark_changed()
     try:
         value = float(current_input)  # Преобразуем текущий ввод в число
         # Просто делим на 100 - это самый понятный и надежный способ
@@ -438,6 +665,7 @@ def handle_power():
 def handle_parenthesis(parenthesis):
     """Обрабатывает ввод скобок"""
     global current_input, expression, reset_on_next_input, result
+    mark_changed()
     
     reset_on_next_input = False
     result = ""  # Сбрасываем результат
@@ -465,12 +693,14 @@ def handle_parenthesis(parenthesis):
 def handle_shift():
     """Переключает между базовым и научным режимом"""
     global shift_mode, reset_on_next_input
+    mark_changed()
     shift_mode = not shift_mode  # Инвертируем режим
     reset_on_next_input = False
 
 def handle_menu():
     """Открывает/закрывает главное меню"""
     global menu_mode, menu_position, reset_on_next_input
+    mark_changed()
     menu_mode = not menu_mode  # Инвертируем состояние меню
     menu_position = 0  # Сбрасываем позицию в меню на первую
     reset_on_next_input = False
@@ -478,110 +708,138 @@ def handle_menu():
 def handle_scientific_function(func):
     """Обрабатывает научные функции (sin, cos, tan, log, и т.д.)"""
     global current_input, reset_on_next_input, result, expression
+    mark_changed()
     
-    try:
+    if current_input == "Error":
+        result = "Error"
+        reset_on_next_input = False
+        return
+    
+    # Функция встраивается в выражение, если оно ждет операнд ("2+" или "2*(")
+    continues = expression and expression[-1] in ['+', '-', '*', '/', '^', '('] and not reset_on_next_input
+    
+    if func in ['pi', 'e']:
         # ОСОБАЯ ОБРАБОТКА ДЛЯ КОНСТАНТ pi и e
-        if func in ['pi', 'e']:
-            # Для констант создаем выражение вида "pi" или "e"
+        if continues:
+            expression += func  # Константа становится частью выражения
+        else:
+            # Отдельная константа - показываем укороченное значение
             expression = func
-            if func == 'pi':
-                result = "3.14159265359"  # 13 знаков (укороченный pi)
-            elif func == 'e':
-                result = "2.71828182846"  # 12 знаков (укороченный e)
+            result = "3.14159265359" if func == 'pi' else "2.71828182846"
             reset_on_next_input = True
             current_input = "0"  # Сбрасываем ввод
             return
-            
-        # Для остальных функций преобразуем текущий ввод в число
+    else:
+        # Для остальных функций используем текущий ввод как аргумент
         input_value = current_input
         if current_input == "0" or current_input == "" or current_input == "-":
-            value = 0  # Если ввод пустой или "0", используем 0
-            input_value = "0"
-        else:
-            value = float(current_input)  # Преобразуем в число
-            
-        calculated_result = None  # Здесь будет результат вычисления
+            input_value = "0"  # Если ввод пустой или "0", используем 0
         
-        # Создаем выражение для отображения в верхней строке
-        if func == 'sin':
-            expression = f"sin({input_value})"  # Синус угла в градусах
-            calculated_result = math.sin(math.radians(value))  # Переводим в радианы и вычисляем
-        elif func == 'cos':
-            expression = f"cos({input_value})"  # Косинус угла в градусах
-            calculated_result = math.cos(math.radians(value))
-        elif func == 'tan':
-            expression = f"tan({input_value})"  # Тангенс угла в градусах
-            calculated_result = math.tan(math.radians(value))
-        elif func == 'log':
-            expression = f"log({input_value})"  # Десятичный логарифм
-            calculated_result = math.log10(value) if value > 0 else float('nan')  # Только для положительных чисел
-        elif func == 'ln':
-            expression = f"ln({input_value})"  # Натуральный логарифм
-            calculated_result = math.log(value) if value > 0 else float('nan')  # Только для положительных чисел
-        elif func == 'sqrt':  # ИЗМЕНИЛИ 'sqr' на 'sqrt' для ясности
-            expression = f"sqrt({input_value})"  # Квадратный корень
-            calculated_result = math.sqrt(value) if value >= 0 else float('nan')  # Только для неотрицательных
-        elif func == '!':
-            expression = f"fact({input_value})"  # Факториал
-            # ДОБАВИЛИ ОГРАНИЧЕНИЕ: факториал только для целых чисел от 0 до 20
-            if value >= 0 and value == int(value) and value <= 20:
-                calculated_result = math.factorial(int(value))
-            else:
-                result = "Error"  # Ошибка для дробных, отрицательных или слишком больших чисел
-                return
-        elif func == '1/x':
-            expression = f"1/({input_value})"  # Обратная величина
-            if value != 0:
-                calculated_result = 1 / value
-            else:
-                result = "Error"  # Деление на ноль
-                return
-        elif func == 'x²':
-            expression = f"({input_value})²"  # Квадрат числа
-            calculated_result = value ** 2
-        elif func == 'x³':
-            expression = f"({input_value})³"  # Куб числа
-            calculated_result = value ** 3
-        elif func == '±':
-            expression = f"-({input_value})"  # Смена знака
-            calculated_result = -value
+        # Текст вызова для выражения берем из таблицы шаблонов
+        call = SCIENTIFIC_TEMPLATES[func].format(input_value)
+        expression = expression + call if continues else call
         
-        # Если вычисление прошло успешно
-        if calculated_result is not None:
-            # Проверяем на NaN (Not a Number)
-            if calculated_result != calculated_result:  # Особенность NaN: он не равен самому себе
-                result = "Error"
-            else:
-                result = str(round_result(calculated_result))  # Округляем и преобразуем в строку
-            reset_on_next_input = True
-            current_input = "0"  # Сбрасываем ввод для следующей операции
-            
-    except Exception as e:
-        result = "Error"  # В случае любой ошибки
-        reset_on_next_input = False
+        if 'x' in expression:
+            # Функция от x вычисляется только при построении графика
+            result = ""
+            reset_on_next_input = False
+            current_input = "0"
+            return
+    
+    # Все выражение вычисляется одним скомпилированным проходом парсера
+    result = str(round_result(evaluate_expression(expression)))
+    reset_on_next_input = True
+    current_input = "0"  # Сбрасываем ввод для следующей операции
 
-# ===== ОБРАБОТКА МЕНЮ =====
-def handle_about_navigation():
-    """Обрабатывает навигацию в режиме 'О программе'"""
-    global about_page, about_mode, last_nav_action
+# ===== ГРАФИК ФУНКЦИИ =====
+def handle_variable():
+    """Добавляет в выражение переменную x (например, для sin(x)*x)"""
+    global current_input, expression, reset_on_next_input, result
+    mark_changed()
     
-    current_time = time.ticks_ms()
-    # Защита от слишком быстрых нажатий (не чаще чем раз в 300 мс)
-    if time.ticks_diff(current_time, last_nav_action) > 300:
-        nav_keys = fast_scan_nav()  # Сканируем навигационные кнопки
-        if 'up' in nav_keys:
-            about_page = (about_page - 1) % len(about_pages)  # Предыдущая страница
-            last_nav_action = current_time
-        elif 'down' in nav_keys:
-            about_page = (about_page + 1) % len(about_pages)  # Следующая страница
-            last_nav_action = current_time
-        elif 'enter' in nav_keys:
-            about_mode = False  # Выход из режима "О программе"
-            last_nav_action = current_time
+    if current_input == "Error":
+        return
+    if reset_on_next_input:
+        # После результата начинаем новое выражение
+        expression = ""
+        current_input = "0"
+    
+    # x становится текущим операндом, как набранное число
+    if current_input == "0":
+        current_input = "x"
+    elif current_input == "-":
+        current_input = "-x"
+    elif len(current_input) < 18:
+        current_input += '*x'  # 2x = 2*x
+    result = ""
+    reset_on_next_input = False
+
+def start_plot(text):
+    """Компилирует функцию от x и открывает ее график"""
+    global plot_mode, result, reset_on_next_input
+    mark_changed()
+    try:
+        plot.set_function(text)  # Все 128 столбцов считаются одним проходом
+    except (CalcError, ValueError, OverflowError):
+        result = "Error"
+        reset_on_next_input = True
+        return
+    plot_mode = True
+
+def handle_plot_key(code):
+    """Навигация по графику: LEFT/RIGHT - сдвиг, UP/DOWN - масштаб, ENTER - выход.
+    code - код нажатой клавиши из очереди событий"""
+    global plot_mode
+    if code < KEY_NAV:
+        # C, = и MENU тоже закрывают график
+        keymap = keys_shift if shift_mode else keys_normal
+        if keymap[code] in ('C', '=', 'MENU'):
+            plot_mode = False
+            mark_changed()
+        return
+    nav = 1 << (code - KEY_NAV)
+    if nav & NAV_LEFT:
+        plot.pan(-PAN_COLUMNS)  # Считаются только открывшиеся столбцы
+    elif nav & NAV_RIGHT:
+        plot.pan(PAN_COLUMNS)
+    elif nav & NAV_UP:
+        plot.zoom(1 / ZOOM_FACTOR)  # Приближение
+    elif nav & NAV_DOWN:
+        plot.zoom(ZOOM_FACTOR)  # Отдаление
+    elif nav & NAV_ENTER:
+        plot_mode = False  # Возврат к выражению
+    mark_changed()
+
+# ===== ОБРАБОТКА МЕНЮ =====
+def handle_about_navigation(nav):
+    """Обрабатывает навигацию в режиме 'О программе' (nav - бит нажатой кнопки)"""
+    global about_page, about_mode
+    if nav & NAV_UP:
+        about_page = (about_page - 1) % len(about_pages)  # Предыдущая страница
+        mark_changed()
+    elif nav & NAV_DOWN:
+        about_page = (about_page + 1) % len(about_pages)  # Следующая страница
+        mark_changed()
+    elif nav & NAV_ENTER:
+        about_mode = False  # Выход из режима "О программе"
+        mark_changed()
+
+def handle_menu_navigation(nav):
+    """Обрабатывает навигацию по главному меню (nav - бит нажатой кнопки)"""
+    global menu_position
+    if nav & NAV_UP:
+        menu_position = (menu_position - 1) % MENU_SIZE  # Вверх по меню
+        mark_changed()
+    elif nav & NAV_DOWN:
+        menu_position = (menu_position + 1) % MENU_SIZE  # Вниз по меню
+        mark_changed()
+    elif nav & NAV_ENTER:
+        handle_menu_selection()  # Выбор текущего пункта
 
 def handle_menu_selection():
     """Обрабатывает выбор пункта в главном меню"""
     global menu_mode, about_mode, shift_mode, menu_position, about_page
+    mark_changed()
     
     if menu_position == 0:
         # "Basic Calc" - базовый режим калькулятора
@@ -592,99 +850,276 @@ def handle_menu_selection():
         shift_mode = True
         menu_mode = False
     elif menu_position == 2:
-        # "Settings" - настройки (пока не реализовано)
-        menu_mode = False
+        # "Settings" - переключаем режим чисел: FLOAT -> DEC16 -> DEC32 -> DEC64 -> FRAC
+        next_mode = NUMBER_MODES[(NUMBER_MODES.index(get_number_mode()) + 1) % len(NUMBER_MODES)]
+        set_number_mode(next_mode)
+        live_parser.reset()  # Превью пересчитается в новом режиме
     elif menu_position == 3:
+        # "Plot" - график текущего выражения с x (или предыдущего графика)
+        menu_mode = False
+        text = expression + (current_input if current_input != "0" else "")
+        if 'x' not in text:
+            text = plot.text or "x"
+        start_plot(text)
+    elif menu_position == 4:
         # "About" - информация о программе
         about_mode = True
         about_page = 0  # Начинаем с первой страницы
 
 def handle_key_events():
     """Обрабатывает все события клавиатуры и навигации"""
-    global pressed_keys_history, pressed_nav_history, menu_position, last_nav_action
+    # Нажатия и повторы из очереди - по порядку, каждое в режиме на момент нажатия
+    typed = False  # Были нажатия клавиш калькулятора
+    while True:
+        event = key_queue.pop()
+        if event < 0:
+            break
+        if not event & KEY_PRESSED:
+            continue  # Отпускания пока ничего не делают
+        code = event & KEY_CODE
+        if plot_mode:
+            # Режим графика - навигация сдвигает и масштабирует график
+            handle_plot_key(code)
+        elif about_mode:
+            # Режим "О программе" - только навигационные кнопки
+            if code >= KEY_NAV:
+                handle_about_navigation(1 << (code - KEY_NAV))
+        elif menu_mode:
+            # Режим меню - только навигационные кнопки
+            if code >= KEY_NAV:
+                handle_menu_navigation(1 << (code - KEY_NAV))
+        elif event & KEY_LONG:
+            # Долгое нажатие BS - полная очистка
+            if code == KEY_BS:
+                handle_clear()
+                typed = True
+        elif code < KEY_NAV:
+            # ОСНОВНОЙ РЕЖИМ КАЛЬКУЛЯТОРА - раскладка на момент нажатия
+            handle_key((keys_shift if shift_mode else keys_normal)[code])
+            typed = True
+        elif code == KEY_ENTER:
+            handle_equals()  # ENTER работает как =
     
-    # Получаем текущие нажатые клавиши
-    current_keys = set([key for _, _, key in stable_matrix_keys])
-    current_nav = set(stable_nav_keys)
-
-    # Находим новые нажатия (которые не были нажаты в предыдущем цикле)
-    new_key_presses = current_keys - pressed_keys_history
-
-    # Обработка в зависимости от текущего режима
-    if about_mode:
-        # Режим "О программе" - обрабатываем навигацию
-        handle_about_navigation()
-                
-    elif menu_mode:
-        # Режим меню - обрабатываем навигацию по меню
-        current_time = time.ticks_ms()
-        for nav in current_nav:
-            # Защита от слишком быстрых нажатий
-            if time.ticks_diff(current_time, last_nav_action) > 300:
-                if nav == 'up':
-                    menu_position = (menu_position - 1) % 4  # Вверх по меню
-                    last_nav_action = current_time
-                elif nav == 'down':
-                    menu_position = (menu_position + 1) % 4  # Вниз по меню
-                    last_nav_action = current_time
-                elif nav == 'enter':
-                    handle_menu_selection()  # Выбор текущего пункта
-                    last_nav_action = current_time
-                
+    # Пересчитываем предварительный результат после нажатий (в асинхронном
+    # цикле - в задаче eval_task, уже после кадра с нажатием)
+    if typed:
+        if eval_event is None:
+            update_preview()
+        else:
+            eval_event.set()
+
+def handle_key(key):
+    """Обрабатывает нажатие одной клавиши в режиме калькулятора"""
+    if key in '0123456789':  # Цифры
+        handle_digit_input(key)
+    elif key == '.':  # Десятичная точка
+        handle_decimal_point()
+    elif key == 'C':  # Очистка
+        handle_clear()
+    elif key == 'BS':  # Backspace
+        handle_backspace()
+    elif key in '+-*/':  # Основные операции
+        handle_operation(key)
+    elif key == '=':  # Вычисление
+        handle_equals()
+    elif key == '%':  # Проценты (ТЕПЕРЬ ПРОСТАЯ РЕАЛИЗАЦИЯ)
+        handle_percent()
+    elif key == '^':  # Степень
+        handle_power()
+    elif key in '()':  # Скобки
+        handle_parenthesis(key)
+    elif key == 'SHIFT':  # Переключение режима
+        handle_shift()
+    elif key == 'MENU':  # Открытие меню
+        handle_menu()
+    elif key == 'x':  # Переменная для графика функции
+        handle_variable()
     else:
-        # ОСНОВНОЙ РЕЖИМ КАЛЬКУЛЯТОРА - обрабатываем нажатия клавиш
-        for key in new_key_presses:
-            if key in '0123456789':  # Цифры
-                handle_digit_input(key)
-            elif key == '.':  # Десятичная точка
-                handle_decimal_point()
-            elif key == 'C':  # Очистка
-                handle_clear()
-            elif key == 'BS':  # Backspace
-                handle_backspace()
-            elif key in ['+', '-', '*', '/']:  # Основные операции
-                handle_operation(key)
-            elif key == '=':  # Вычисление
-                handle_equals()
-            elif key == '%':  # Проценты (ТЕПЕРЬ ПРОСТАЯ РЕАЛИЗАЦИЯ)
-                handle_percent()
-            elif key == '^':  # Степень
-                handle_power()
-            elif key in ['(', ')']:  # Скобки
-                handle_parenthesis(key)
-            elif key == 'SHIFT':  # Переключение режима
-                handle_shift()
-            elif key == 'MENU':  # Открытие меню
-                handle_menu()
-            else:
-                # Все остальные клавиши - научные функции
-                handle_scientific_function(key)
+        # Все остальные клавиши - научные функции
+        handle_scientific_function(key)
 
-        # Обработка навигационных кнопок в основном режиме
-        for nav in stable_nav_keys:
-            if nav == 'enter':
-                handle_equals()  # ENTER работает как =
+def scan_keys():
+    """Сканирование с устранением дребезга: события попадают в key_queue.
+    False - клавиатура в простое и ее никто не будил"""
+    if keypad_idle:
+        if not wake_flag[0]:
+            return False  # Простой: ни одна клавиша не нажата, сканировать нечего
+        leave_keypad_idle()
+    
+    # Сканируем клавиатуру и навигационные кнопки и устраняем дребезг
+    debounce_keys(fast_scan_matrix(), fast_scan_nav())
+    
+    # Все отпущено (события отпускания уже в очереди) - до прерывания не сканируем
+    if KEYPAD_IDLE and not (matrix_keys[0] | matrix_keys[1] | nav_keys[0] | nav_keys[1]):
+        enter_keypad_idle()
+    return True
 
-    # Сохраняем текущее состояние для следующего цикла
-    pressed_keys_history = current_keys
-    pressed_nav_history = current_nav
+def scan_keyboard():
+    """Один цикл опроса по таймеру: сканирование, события и перерисовка"""
+    if not scan_keys():
+        return
+    # Обрабатываем события клавиш
+    handle_key_events()
+    
+    # Перерисовываем дисплей только если состояние изменилось:
+    # в простое нет ни отрисовки, ни передачи по I2C
+    if state_version != drawn_version:
+        update_display()
 
 # ===== ТАЙМЕР =====
 def timer_irq(t):
     """Прерывание таймера - устанавливает флаг сканирования"""
     scan_flag[0] = 1
 
+def key_edge_irq(pin):
+    """Прерывание по спаду на столбце или кнопке: будит клавиатуру из простоя"""
+    if keypad_idle:
+        wake_keypad()
+
+def wake_keypad():
+    """Будит сканирование из простоя"""
+    wake_flag[0] = 1
+    scan_flag[0] = 1  # Первое сканирование - сразу, не дожидаясь таймера
+    if wake_event is not None:
+        wake_event.set()  # Будим задачу keypad_task
+
+def enter_keypad_idle():
+    """Переводит клавиатуру в простой: все строки в 0, ждем прерывания"""
+    global keypad_idle
+    wake_flag[0] = 0
+    keypad_idle = True
+    for row_pin in rows:
+        row_pin.value(0)  # Нажатие любой клавиши замкнет свой столбец на 0
+    # Спад между последним сканированием и keypad_idle = True прерывание
+    # пропустило, а удерживаемая кнопка нового спада не даст: проверяем сами
+    for pin in cols:
+        if pin.value() == 0:
+            wake_keypad()
+            return
+    for pin in nav_pins:
+        if pin.value() == 0:
+            wake_keypad()
+            return
+
+def leave_keypad_idle():
+    """Возвращает строки в 1 для обычного сканирования матрицы"""
+    global keypad_idle
+    keypad_idle = False
+    wake_flag[0] = 0
+    for row_pin in rows:
+        row_pin.value(1)
+
+def init_keypad_irq():
+    """Включает прерывания по спаду на столбцах и навигационных кнопках"""
+    for pin in cols:
+        pin.irq(trigger=Pin.IRQ_FALLING, handler=key_edge_irq)
+    for pin in nav_buttons.values():
+        pin.irq(trigger=Pin.IRQ_FALLING, handler=key_edge_irq)
+
 def init_keyboard_timer():
     """Инициализирует таймер для регулярного сканирования клавиатуры"""
     keyboard_timer = Timer(0)  # Создаем таймер 0
-    keyboard_timer.init(period=50, mode=Timer.PERIODIC, callback=timer_irq)  # Период 50 мс
+    keyboard_timer.init(period=SCAN_PERIOD_MS, mode=Timer.PERIODIC, callback=timer_irq)  # Период 50 мс
     return keyboard_timer
 
+# ===== АСИНХРОННЫЕ ЗАДАЧИ =====
+if hasattr(asyncio, 'sleep_ms'):
+    sleep_ms = asyncio.sleep_ms
+else:
+    def sleep_ms(ms):
+        """asyncio.sleep_ms для CPython (запуск на компьютере)"""
+        return asyncio.sleep(ms / 1000)
+
+def new_irq_event():
+    """Событие, которое можно выставлять из обработчика прерывания"""
+    if hasattr(asyncio, 'ThreadSafeFlag'):
+        return asyncio.ThreadSafeFlag()
+    return asyncio.Event()  # CPython: "прерывания" приходят из того же потока
+
+async def keypad_task():
+    """Опрос клавиатуры раз в SCAN_PERIOD_MS; в простое ждет прерывания"""
+    global task_wakeups
+    while True:
+        if keypad_idle:
+            await wake_event.wait()  # Ни таймера, ни опроса, пока нет нажатия
+            wake_event.clear()
+            task_wakeups += 1
+        try:
+            scan_keys()
+        except Exception as e:
+            print(f"Error: {e}")
+        if key_queue.count:
+            key_event.set()
+        await sleep_ms(SCAN_PERIOD_MS)
+        task_wakeups += 1
+
+async def events_task():
+    """Обработка событий из key_queue"""
+    global task_wakeups
+    while True:
+        await key_event.wait()
+        key_event.clear()
+        task_wakeups += 1
+        try:
+            handle_key_events()
+        except Exception as e:
+            print(f"Error: {e}")
+        if state_version != drawn_version:
+            display_event.set()
+
+async def display_task():
+    """Рисует кадр и передает его по одной странице, уступая другим задачам"""
+    global task_wakeups
+    while True:
+        await display_event.wait()
+        display_event.clear()
+        task_wakeups += 1
+        # Изменения во время передачи попадут в следующий кадр
+        try:
+            while state_version != drawn_version:
+                update_display()
+                while flush_display():
+                    await asyncio.sleep(0)
+        except Exception as e:
+            print(f"Error: {e}")
+
+async def eval_task():
+    """Пересчет превью после кадра с нажатием (вычисление может быть долгим)"""
+    global task_wakeups
+    while True:
+        await eval_event.wait()
+        eval_event.clear()
+        task_wakeups += 1
+        old = preview
+        try:
+            update_preview()
+        except Exception as e:
+            print(f"Error: {e}")
+        if preview != old:
+            mark_changed()
+            display_event.set()
+
+def start_tasks():
+    """Создает события и задачи главного цикла (вызывать внутри asyncio).
+    Возвращает список задач"""
+    global wake_event, key_event, display_event, eval_event
+    wake_event = new_irq_event()
+    key_event = asyncio.Event()
+    display_event = asyncio.Event()
+    eval_event = asyncio.Event()
+    mark_changed()  # Первый кадр: версия уходит вперед нарисованной
+    display_event.set()
+    return [asyncio.create_task(task()) for task in
+            (keypad_task, events_task, display_task, eval_task)]
+
+async def main_async():
+    """Главный цикл на asyncio: задачи работают, пока работает программа"""
+    init_keypad_irq()
+    await asyncio.gather(*start_tasks())
+
 # ===== ГЛАВНАЯ ФУНКЦИЯ =====
 def main():
     """Главная функция программы"""
-    global display_tick
-    
     # Выводим информацию о версии при запуске
     print("=" * 50)
     print("CALCULATOR v7.1 - FIXED CONSTANTS DISPLAY")
@@ -697,39 +1132,34 @@ def main():
     print("=" * 50)
     print("KEY IMPROVEMENTS:")
     print("- Simple percent: x% = x/100")
-    print("- Factorial limited to 0-20")
+    print("- Exact factorial 0-1000 (memoized)")
+    print("- Function plots: x key, = draws y = f(x)")
     print("- 'sqr' renamed to 'sqrt' for clarity")
     print("=" * 50)
     
-    # Инициализируем таймер клавиатуры
+    if USE_ASYNCIO:
+        asyncio.run(main_async())
+        return
+    
+    # Инициализируем таймер клавиатуры и прерывания для простоя
     init_keyboard_timer()
+    init_keypad_irq()
     # Первоначальное обновление дисплея
     update_display()
     
     # Главный цикл программы
     while True:
-        # Ждем флага сканирования от таймера
+        # Ждем флага сканирования от таймера, а пока ждем - передаем кадр
+        # на дисплей по одной странице, чтобы сканирование не стояло
         if scan_flag[0] == 0:
-            time.sleep_ms(1)  # Короткая пауза для экономии энергии
+            if not flush_display():
+                time.sleep_ms(1)  # Короткая пауза для экономии энергии
             continue
 
         scan_flag[0] = 0  # Сбрасываем флаг
 
         try:
-            # Сканируем клавиатуру и навигационные кнопки
-            current_matrix = fast_scan_matrix()
-            current_nav = fast_scan_nav()
-            # Устраняем дребезг контактов
-            debounce_keys(current_matrix, current_nav)
-            # Обрабатываем события клавиш
-            handle_key_events()
-            
-            # Обновляем дисплей каждые 3 цикла (примерно 150 мс)
-            display_tick += 1
-            if display_tick >= 3:
-                update_display()
-                display_tick = 0
-                
+            scan_keyboard()
         except Exception as e:
             print(f"Error: {e}")  # Выводим ошибки в консоль
             time.sleep_ms(50)  # Защита от забивания консоли при бесконечных ошибках
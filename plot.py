@@ -0,0 +1,127 @@
+# График функции y = f(x) на экране калькулятора
+# Выражение с переменной x компилируется один раз, а значения для всех
+# столбцов экрана считаются одним пакетным проходом (calc_parser.run_batch).
+# При сдвиге графика уже посчитанные точки сдвигаются вместе с ним,
+# и считаются только открывшиеся столбцы.
+
+from calc_parser import compile_function, run_batch
+
+DEFAULT_RANGE = 10.0  # Начальный диапазон x: от -10 до 10
+ZOOM_FACTOR = 2.0     # Во сколько раз меняется диапазон x при масштабировании
+PAN_COLUMNS = 16      # На сколько столбцов сдвигается график за одно нажатие
+Y_LIMIT = 1e300       # Предел автомасштаба, если hi - lo не помещается в float
+
+
+def _finite(y):
+    """True для обычного числа (не nan и не бесконечность)"""
+    return y - y == 0  # Для nan и бесконечностей разность дает nan
+
+
+class Plot:
+    """График функции: диапазон x, значения по столбцам и отрисовка через GFX"""
+
+    def __init__(self, width, height):
+        self.width = width      # Ширина области графика (столбцов)
+        self.height = height    # Высота области графика
+        self.text = ""          # Текст функции
+        self.program = None     # Скомпилированная функция
+        self.x_min = -DEFAULT_RANGE
+        self.x_max = DEFAULT_RANGE
+        self.samples = []       # Значения y для каждого столбца (nan - нет значения)
+        self.computed = 0       # Сколько столбцов посчитано всего (для оценки экономии)
+
+    def set_function(self, text):
+        """Задает функцию и сбрасывает диапазон. CalcError - если текст с ошибкой"""
+        self.program = compile_function(text)
+        self.text = text
+        self.x_min = -DEFAULT_RANGE
+        self.x_max = DEFAULT_RANGE
+        self._sample_all()
+
+    def step(self):
+        """Шаг по x между соседними столбцами"""
+        return (self.x_max - self.x_min) / (self.width - 1)
+
+    def _xs(self, first, count):
+        """Значения x для столбцов first .. first + count - 1"""
+        step = self.step()
+        x_min = self.x_min
+        return [x_min + (first + i) * step for i in range(count)]
+
+    def _sample_all(self):
+        self.samples = run_batch(self.program, self._xs(0, self.width))
+        self.computed += self.width
+
+    def pan(self, columns):
+        """Сдвигает видимую область на columns столбцов (вправо при columns > 0)"""
+        shift = self.step() * columns
+        self.x_min += shift
+        self.x_max += shift
+        count = -columns if columns < 0 else columns
+        if count >= self.width:
+            self._sample_all()  # Старые точки целиком ушли с экрана
+        elif columns > 0:
+            self.samples = self.samples[count:] + run_batch(
+                self.program, self._xs(self.width - count, count))
+            self.computed += count
+        elif columns < 0:
+            self.samples = run_batch(self.program, self._xs(0, count)) + \
+                self.samples[:self.width - count]
+            self.computed += count
+
+    def zoom(self, factor):
+        """Меняет диапазон x в factor раз относительно центра (factor < 1 - приближение)"""
+        center = (self.x_min + self.x_max) / 2
+        half = (self.x_max - self.x_min) / 2 * factor
+        self.x_min = center - half
+        self.x_max = center + half
+        self._sample_all()
+
+    def y_range(self):
+        """Автомасштаб: наименьшее и наибольшее конечное значение y"""
+        lo = None
+        hi = None
+        for y in self.samples:
+            if _finite(y):
+                if lo is None or y < lo:
+                    lo = y
+                if hi is None or y > hi:
+                    hi = y
+        if lo is None:
+            return -1.0, 1.0  # Нет ни одной точки
+        if not _finite(hi - lo):
+            # Разность переполнилась (например, x*10^307): урезаем диапазон,
+            # точки за ним draw прижимает к краю экрана
+            if lo < -Y_LIMIT:
+                lo = -Y_LIMIT
+            if hi > Y_LIMIT:
+                hi = Y_LIMIT
+        if hi - lo < 1e-9:
+            return lo - 1.0, hi + 1.0  # Постоянная функция - линия посередине
+        return lo, hi
+
+    def draw(self, gfx, color=1):
+        """Рисует оси и график отрезками gfx.line"""
+        lo, hi = self.y_range()
+        bottom = self.height - 1
+        scale = bottom / (hi - lo)
+        # Оси координат, если ноль попадает в видимую область
+        if self.x_min <= 0 <= self.x_max:
+            gfx.vline(int(-self.x_min / self.step() + 0.5), 0, self.height, color)
+        if lo <= 0 <= hi:
+            gfx.hline(0, bottom - int(-lo * scale + 0.5), self.width, color)
+        prev = None  # Строка предыдущей точки (None - разрыв)
+        for x, y in enumerate(self.samples):
+            if not _finite(y):
+                prev = None
+                continue
+            if y > hi:
+                y = hi
+            elif y < lo:
+                y = lo
+            row = bottom - int((y - lo) * scale + 0.5)
+            if prev is None:
+                gfx.line(x, row, x, row, color)  # Первая точка после разрыва
+            else:
+                gfx.line(x - 1, prev, x, row, color)
+            prev = row
@@ -0,0 +1,217 @@
+# Точные рациональные числа (дроби) на целых числах
+# Число хранится как несократимая дробь num/den с den > 0.
+# Чтобы числители и знаменатели не росли бесконечно, при выходе за
+# LIMIT_BITS бит результат переводится в обычный float.
+
+from fixedpoint import format_scaled, isqrt
+
+LIMIT_BITS = 128                # Предел размера числителя и знаменателя
+LIMIT = 1 << LIMIT_BITS
+MAX_EXPONENT_DIGITS = 400       # Предел для записи вида 1e400
+
+
+def gcd(a, b):
+    """Наибольший общий делитель (алгоритм Евклида)"""
+    if a < 0:
+        a = -a
+    while b:
+        a, b = b, a % b
+    return a
+
+
+def _bits(n):
+    """Число бит в |n| (int.bit_length есть не во всех сборках MicroPython)"""
+    if n < 0:
+        n = -n
+    bits = 0
+    while n > 0xFFFF:
+        n >>= 16
+        bits += 16
+    while n:
+        n >>= 1
+        bits += 1
+    return bits
+
+
+def _make(num, den):
+    """Создает сокращенную дробь или float, если числа стали слишком большими"""
+    if den < 0:
+        num, den = -num, -den
+    g = gcd(num, den)
+    if g > 1:
+        num //= g
+        den //= g
+    if num > LIMIT or -num > LIMIT or den > LIMIT:
+        return num / den  # Запасной вариант - float
+    return Rational(num, den)
+
+
+class Rational:
+    """Точная дробь num/den (всегда в сокращенном виде)"""
+    __slots__ = ('num', 'den')
+
+    def __init__(self, num, den=1):
+        self.num = num
+        self.den = den
+
+    # ===== СОЗДАНИЕ И ПРЕОБРАЗОВАНИЕ =====
+    @staticmethod
+    def from_text(text):
+        """Точно разбирает строку вида 12.5, .5, 5., 1e-05"""
+        exp = 0
+        for mark in 'eE':
+            if mark in text:
+                text, exp_text = text.split(mark)
+                exp = int(exp_text)
+        if '.' in text:
+            whole, frac = text.split('.')
+        else:
+            whole, frac = text, ''
+        if not (whole or frac):
+            raise ValueError("empty number")
+        exp -= len(frac)
+        if exp > MAX_EXPONENT_DIGITS or exp < -MAX_EXPONENT_DIGITS:
+            return float(whole + '.' + frac + 'e' + str(exp + len(frac)))
+        mantissa = int((whole + frac) or '0')
+        if exp >= 0:
+            return _make(mantissa * 10 ** exp, 1)
+        return _make(mantissa, 10 ** -exp)
+
+    @staticmethod
+    def from_int(n):
+        """Создает число из целого. Больше LIMIT - остается точным int, как
+        в режиме FLOAT (float не вместил бы факториалы больше 170!)"""
+        if n > LIMIT or -n > LIMIT:
+            return n
+        return Rational(n)
+
+    def to_float(self):
+        """Приблизительное значение в виде float"""
+        return self.num / self.den
+
+    def to_int(self):
+        """Целое значение, если дробь целая, иначе None"""
+        return self.num if self.den == 1 else None
+
+    # ===== АРИФМЕТИКА =====
+    # Смешанные операции с float дают float, с int - точную дробь
+    def __add__(self, other):
+        if isinstance(other, Rational):
+            return _make(self.num * other.den + other.num * self.den, self.den * other.den)
+        if isinstance(other, int):
+            return _make(self.num + other * self.den, self.den)
+        return self.to_float() + other
+
+    __radd__ = __add__
+
+    def __sub__(self, other):
+        return self + (-other)
+
+    def __rsub__(self, other):
+        return (-self) + other
+
+    def __mul__(self, other):
+        if isinstance(other, Rational):
+            return _make(self.num * other.num, self.den * other.den)
+        if isinstance(other, int):
+            return _make(self.num * other, self.den)
+        return self.to_float() * other
+
+    __rmul__ = __mul__
+
+    def __truediv__(self, other):
+        if isinstance(other, Rational):
+            if other.num == 0:
+                raise ZeroDivisionError()
+            return _make(self.num * other.den, self.den * other.num)
+        if isinstance(other, int):
+            if other == 0:
+                raise ZeroDivisionError()
+            return _make(self.num, self.den * other)
+        return self.to_float() / other
+
+    def __rtruediv__(self, other):
+        if self.num == 0:
+            raise ZeroDivisionError()
+        if isinstance(other, int):
+            return _make(other * self.den, self.num)
+        return other / self.to_float()
+
+    def __neg__(self):
+        return Rational(-self.num, self.den)
+
+    def sqrt(self):
+        """Квадратный корень: точный для полных квадратов, иначе float"""
+        a = isqrt(self.num)
+        b = isqrt(self.den)
+        if a * a == self.num and b * b == self.den:
+            return Rational(a, b)
+        return (self.num / self.den) ** 0.5
+
+    def power(self, n):
+        """Возведение в целую степень n (float, если результат слишком велик)"""
+        k = -n if n < 0 else n
+        # m ** k >= 2^((bits(m) - 1) * k): если это больше LIMIT, дробь заведомо
+        # не поместится, и степень не считаем (иначе 9^9^9 считалась бы часами)
+        if (_bits(self.num) - 1) * k > LIMIT_BITS or (_bits(self.den) - 1) * k > LIMIT_BITS:
+            return self.to_float() ** n
+        num = self.num ** k
+        den = self.den ** k
+        if n < 0:
+            if num == 0:
+                raise ZeroDivisionError()
+            num, den = den, num
+        return _make(num, den)
+
+    # ===== СРАВНЕНИЯ =====
+    def _cmp(self, other):
+        """Разность self - other как число для сравнения с нулем"""
+        if isinstance(other, Rational):
+            return self.num * other.den - other.num * self.den
+        if isinstance(other, int):
+            return self.num - other * self.den
+        return self.to_float() - other
+
+    def __eq__(self, other):
+        if not isinstance(other, (Rational, int, float)):
+            return False  # Например, сравнение со строкой "Error"
+        return self._cmp(other) == 0
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __lt__(self, other):
+        return self._cmp(other) < 0
+
+    def __le__(self, other):
+        return self._cmp(other) <= 0
+
+    def __gt__(self, other):
+        return self._cmp(other) > 0
+
+    def __ge__(self, other):
+        return self._cmp(other) >= 0
+
+    def __hash__(self):
+        return hash((self.num, self.den))
+
+    # ===== ВЫВОД =====
+    def format(self, width=16):
+        """Десятичная запись не длиннее width символов (перевод только здесь)"""
+        num = self.num
+        den = self.den
+        if den == 1 and len(str(num)) <= width:
+            return str(num)
+        # Знаков после запятой хватает на ширину экрана плюс ведущие нули
+        digits = width + 2 + max(len(str(den)) - len(str(-num if num < 0 else num)), 0)
+        scaled = num * 10 ** digits
+        q, r = divmod(-scaled if scaled < 0 else scaled, den)
+        if 2 * r >= den:
+            q += 1  # Округление половины от нуля
+        return format_scaled(-q if num < 0 else q, digits, width)
+
+    def __str__(self):
+        return str(self.num) if self.den == 1 else str(self.num) + '/' + str(self.den)
+
+    def __repr__(self):
+        return 'Rational(' + str(self) + ')'
@@ -23,6 +23,9 @@ SET_PRECHARGE       = const(0xd9)
 SET_VCOM_DESEL      = const(0xdb)
 SET_CHARGE_PUMP     = const(0x8d)
 
+# frame diffing: pages are compared in chunks of DIFF_CHUNK bytes
+DIFF_CHUNK          = const(16)
+
 
 class SSD1306:
     def __init__(self, width, height, external_vcc):
@@ -31,6 +34,29 @@ class SSD1306:
         self.external_vcc = external_vcc
         self.pages = self.height // 8
         self.buffer = bytearray(self.pages * self.width)
+        # Drawing goes to buffer; begin_flush() copies it to front in one step
+        # and only front is sent, so a frame is never sent half-drawn.
+        self.front = bytearray(len(self.buffer))
+        self.front_view = memoryview(self.front)
+        # Dirty column range per page: nothing to send while lo > hi.
+        # With partial=False show() sends the whole frame as before; with
+        # partial=True only the regions passed to mark_dirty() are sent.
+        # With diff=True show() finds the changed spans itself by comparing
+        # the frame with the shadow copy of what the display RAM holds.
+        # send_lo/send_hi hold what is left to send of the current snapshot.
+        self.dirty_lo = bytearray(self.pages)
+        self.dirty_hi = bytearray(self.pages)
+        self.send_lo = bytearray(self.pages)
+        self.send_hi = bytearray(self.pages)
+        self.flush_page = self.pages
+        self.partial = False
+        self.diff = False
+        self.diff_limit = len(self.buffer) // 2 # changed bytes above this: full flush
+        self.shadow = bytearray(len(self.buffer))
+        self.bytes_sent = 0 # bytes put on the bus, commands included
+        self.window = bytearray(6) # SET_COL_ADDR and SET_PAGE_ADDR of show_window
+        self.clear_dirty()
+        self.mark_all()
         fb = framebuf.FrameBuffer(self.buffer, self.width, self.height, framebuf.MONO_VLSB)
         self.framebuf = fb
         # Provide methods for accessing FrameBuffer graphics primitives. This is a
@@ -49,7 +75,7 @@ class SSD1306:
         self.init_display()
 
     def init_display(self):
-        for cmd in (
+        self.write_cmds(bytes((
             SET_DISP | 0x00, # off
             # address setting
             SET_MEM_ADDR, 0x00, # horizontal
@@ -70,11 +96,15 @@ class SSD1306:
             SET_NORM_INV, # not inverted
             # charge pump
             SET_CHARGE_PUMP, 0x10 if self.external_vcc else 0x14,
-            SET_DISP | 0x01): # on
-            self.write_cmd(cmd)
+            SET_DISP | 0x01))) # on
         self.fill(0)
         self.show()
 
+    def write_cmds(self, cmds):
+        # interfaces that can send several commands at once override this
+        for cmd in cmds:
+            self.write_cmd(cmd)
+
     def poweroff(self):
         self.write_cmd(SET_DISP | 0x00)
 
@@ -88,41 +118,169 @@ class SSD1306:
     def invert(self, invert):
         self.write_cmd(SET_NORM_INV | (invert & 1))
 
+    def mark_dirty(self, x, y, w, h):
+        # clip the rectangle and widen the dirty range of every page it touches
+        x0 = max(x, 0)
+        x1 = min(x + w, self.width) - 1
+        y0 = max(y, 0)
+        y1 = min(y + h, self.height) - 1
+        if x0 > x1 or y0 > y1:
+            return
+        for page in range(y0 >> 3, (y1 >> 3) + 1):
+            self.widen(self.dirty_lo, self.dirty_hi, page, x0, x1)
+
+    def widen(self, lo, hi, page, x0, x1):
+        if x0 < lo[page]:
+            lo[page] = x0
+        if x1 > hi[page]:
+            hi[page] = x1
+
+    def mark_all(self):
+        for page in range(self.pages):
+            self.dirty_lo[page] = 0
+            self.dirty_hi[page] = self.width - 1
+
+    def clear_dirty(self):
+        # forget both the marks and what is left of the frame being sent
+        for page in range(self.pages):
+            self.dirty_lo[page] = self.send_lo[page] = self.width
+            self.dirty_hi[page] = self.send_hi[page] = 0
+
+    def diff_frame(self):
+        # compare the snapshot with the shadow copy page by page, chunk by
+        # chunk, and add the changed column span of every page to the ranges
+        # to send; returns the number of bytes in those spans
+        buf = self.front
+        shadow = self.shadow
+        width = self.width
+        changed = 0
+        for page in range(self.pages):
+            start = page * width
+            end = start + width
+            if buf[start:end] == shadow[start:end]:
+                continue
+            lo = start
+            while buf[lo:lo + DIFF_CHUNK] == shadow[lo:lo + DIFF_CHUNK]:
+                lo += DIFF_CHUNK
+            while buf[lo] == shadow[lo]:
+                lo += 1
+            hi = end
+            while buf[hi - DIFF_CHUNK:hi] == shadow[hi - DIFF_CHUNK:hi]:
+                hi -= DIFF_CHUNK
+            while buf[hi - 1] == shadow[hi - 1]:
+                hi -= 1
+            self.widen(self.send_lo, self.send_hi, page, lo - start, hi - 1 - start)
+            changed += hi - lo
+        return changed
+
     def show(self):
-        x0 = 0
-        x1 = self.width - 1
-        if self.width == 64:
-            # displays with width of 64 pixels are shifted by 32
-            x0 += 32
-            x1 += 32
-        self.write_cmd(SET_COL_ADDR)
-        self.write_cmd(x0)
-        self.write_cmd(x1)
-        self.write_cmd(SET_PAGE_ADDR)
-        self.write_cmd(0)
-        self.write_cmd(self.pages - 1)
-        self.write_data(self.buffer)
+        self.begin_flush()
+        while self.flush_step(self.pages):
+            pass
+
+    def begin_flush(self):
+        # take a snapshot of the drawn frame and work out what to send; the
+        # transfer reads only the snapshot, so drawing into self.buffer may go
+        # on while flush_step() sends it. A flush in progress is restarted and
+        # the new frame replaces the old one.
+        self.front[:] = self.buffer
+        lo = self.send_lo
+        hi = self.send_hi
+        full = not (self.partial or self.diff)
+        if self.diff and self.diff_frame() > self.diff_limit:
+            full = True # one window is cheaper than many spans
+        for page in range(self.pages):
+            if full:
+                lo[page] = 0
+                hi[page] = self.width - 1
+            else:
+                self.widen(lo, hi, page, self.dirty_lo[page], self.dirty_hi[page])
+            self.dirty_lo[page] = self.width
+            self.dirty_hi[page] = 0
+        self.flush_page = 0
+
+    def flush_step(self, max_pages=1):
+        # send the next run of dirty pages of the snapshot, at most max_pages
+        # of them; returns False when there was nothing left to send
+        lo = self.send_lo
+        hi = self.send_hi
+        page = self.flush_page
+        while page < self.pages and lo[page] > hi[page]:
+            page += 1
+        if page >= self.pages:
+            self.flush_page = page
+            return False
+        x0 = lo[page]
+        x1 = hi[page]
+        # consecutive pages with the same column range share one window
+        end = page + 1
+        while end < self.pages and end - page < max_pages and lo[end] == x0 and hi[end] == x1:
+            end += 1
+        for p in range(page, end):
+            lo[p] = self.width
+            hi[p] = 0
+        self.flush_page = end
+        self.show_window(x0, x1, page, end - 1)
+        return True
+
+    def show_window(self, x0, x1, page0, page1):
+        # send columns x0..x1 of pages page0..page1 (horizontal addressing
+        # wraps inside the window, so the rows follow each other)
+        offset = 32 if self.width == 64 else 0 # 64 pixel wide displays are shifted by 32
+        window = self.window
+        window[0] = SET_COL_ADDR
+        window[1] = x0 + offset
+        window[2] = x1 + offset
+        window[3] = SET_PAGE_ADDR
+        window[4] = page0
+        window[5] = page1
+        self.write_cmds(window)
+        width = self.width
+        if x0 == 0 and x1 == width - 1:
+            self.send_span(page0 * width, (page1 + 1) * width)
+        else:
+            for page in range(page0, page1 + 1):
+                start = page * width
+                self.send_span(start + x0, start + x1 + 1)
+
+    def send_span(self, start, end):
+        # the shadow copy always matches what the display RAM holds
+        self.write_data(self.front_view[start:end])
+        self.shadow[start:end] = self.front_view[start:end]
 
 
 class SSD1306_I2C(SSD1306):
-    def __init__(self, width, height, i2c, addr=0x3c, external_vcc=False):
+    # i2c may be machine.I2C (hardware) or machine.SoftI2C; both have writevto.
+    # With batch=True consecutive commands go out in one transaction after a
+    # single control byte 0x00 (Co=0, D/C#=0), otherwise one per command.
+    def __init__(self, width, height, i2c, addr=0x3c, external_vcc=False, batch=True):
         self.i2c = i2c
         self.addr = addr
+        self.batch = batch
         self.temp = bytearray(2)
+        self.cmd_list = [b"\x00", None] # Co=0, D/C#=0
+        self.write_list = [b"\x40", None] # Co=0, D/C#=1
         super().__init__(width, height, external_vcc)
 
     def write_cmd(self, cmd):
         self.temp[0] = 0x80 # Co=1, D/C#=0
         self.temp[1] = cmd
         self.i2c.writeto(self.addr, self.temp)
+        self.bytes_sent += 3 # address, control byte, command
+
+    def write_cmds(self, cmds):
+        if not self.batch:
+            for cmd in cmds:
+                self.write_cmd(cmd)
+            return
+        self.cmd_list[1] = cmds
+        self.i2c.writevto(self.addr, self.cmd_list)
+        self.bytes_sent += 2 + len(cmds)
 
     def write_data(self, buf):
-        self.temp[0] = self.addr << 1
-        self.temp[1] = 0x40 # Co=0, D/C#=1
-        self.i2c.start()
-        self.i2c.write(self.temp)
-        self.i2c.write(buf)
-        self.i2c.stop()
+        self.write_list[1] = buf
+        self.i2c.writevto(self.addr, self.write_list)
+        self.bytes_sent += 2 + len(buf)
 
 
 class SSD1306_SPI(SSD1306):
@@ -150,6 +308,7 @@ class SSD1306_SPI(SSD1306):
         self.cs(0)
         self.spi.write(bytearray([cmd]))
         self.cs(1)
+        self.bytes_sent += 1
 
     def write_data(self, buf):
         self.spi.init(baudrate=self.rate, polarity=0, phase=0)
@@ -158,3 +317,4 @@ class SSD1306_SPI(SSD1306):
         self.cs(0)
         self.spi.write(buf)
         self.cs(1)
+        self.bytes_sent += len(buf)
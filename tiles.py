@@ -0,0 +1,77 @@
+# Кэш готовых изображений (тайлов) текста и виджетов экрана
+# Надпись в заданном стиле рисуется через framebuf.text один раз, а дальше
+# выводится на дисплей одним вызовом blit. Тайлы хранятся в LRU-кэше
+# с ограничением по количеству и по объему буферов.
+
+import framebuf
+import bigfont
+from lru import LRUCache
+
+# ===== СТИЛИ =====
+STYLE_TEXT = 0   # Белый текст, фон прозрачный (как oled.text)
+STYLE_BOX = 1    # Черный текст в белом прямоугольнике (индикатор режима)
+STYLE_LARGE = 2  # Черный текст в большом белом прямоугольнике (результат)
+STYLE_BIG2 = 3   # То же, но цифры крупного шрифта в 2 раза больше
+STYLE_BIG3 = 4   # То же, цифры в 3 раза больше
+
+# Стиль -> (отступ текста по x, отступ по y, высота тайла)
+STYLE_LAYOUT = ((0, 0, 8), (2, 1, 10), (4, 3, 14), (2, 3, 20), (2, 3, 27))
+STYLE_SCALE = (1, 1, 1, 2, 3)  # Увеличение шрифта (1 - обычный шрифт 8x8)
+TILE_OVERHEAD = 64  # Оценка памяти на объект FrameBuffer и запись кэша
+
+
+class TileCache:
+    """LRU-кэш тайлов framebuf.FrameBuffer по ключу (текст, стиль)"""
+
+    def __init__(self, max_entries=32, max_bytes=3072):
+        self._cache = LRUCache(max_entries, max_bytes)
+
+    def tile(self, text, style=STYLE_TEXT):
+        """Возвращает (FrameBuffer, ширина, высота) готовой надписи"""
+        key = (text, style)
+        tile = self._cache.get(key)
+        if tile is None:
+            tile = _render(text, style)
+            self._cache.put(key, tile, len(tile[3]) + TILE_OVERHEAD)
+        return tile
+
+    def width(self, text, style=STYLE_TEXT):
+        """Ширина надписи в пикселях (без отрисовки)"""
+        scale = STYLE_SCALE[style]
+        text_width = len(text) * 8 if scale == 1 else bigfont.width(text, scale)
+        return text_width + 2 * STYLE_LAYOUT[style][0]
+
+    def draw(self, target, text, x, y, style=STYLE_TEXT):
+        """Выводит надпись в target (FrameBuffer или дисплей) одним blit"""
+        fb, _, _, _ = self.tile(text, style)
+        # Обычный текст - с прозрачным черным фоном, прямоугольники - целиком
+        target.blit(fb, x, y, 0 if style == STYLE_TEXT else -1)
+
+    def clear(self):
+        """Очищает кэш тайлов"""
+        self._cache.clear()
+
+    def stats(self):
+        """Статистика кэша: записи, байты, попадания, промахи"""
+        return self._cache.stats()
+
+
+def _render(text, style):
+    """Рисует надпись в новом буфере. Возвращает (FrameBuffer, ширина, высота, буфер)"""
+    pad_x, pad_y, height = STYLE_LAYOUT[style]
+    scale = STYLE_SCALE[style]
+    text_width = len(text) * 8 if scale == 1 else bigfont.width(text, scale)
+    width = max(text_width + 2 * pad_x, 1)  # Пустая строка - пустой тайл
+    buf = bytearray(((height + 7) // 8) * width)
+    fb = framebuf.FrameBuffer(buf, width, height, framebuf.MONO_VLSB)
+    if style == STYLE_TEXT:
+        fb.text(text, 0, 0, 1)
+    elif scale > 1:
+        # Крупный шрифт рисуется только белым: рисуем и инвертируем тайл
+        bigfont.text(fb, text, pad_x, pad_y, scale)
+        for i in range(len(buf)):
+            buf[i] ^= 0xFF
+    else:
+        fb.fill(1)
+        fb.text(text, pad_x, pad_y, 0)
+    return (fb, width, height, buf)